@@ -0,0 +1,295 @@
+"""
+Answer Equivalence
+Rules that reduce free-text answers to a canonical form, so equivalent answers compare equal
+
+A canonicalizer tokenizes an answer and runs the enabled rules over the tokens:
+    numbers   "twenty-five" -> "25", "nineteenth" -> "19th", "1,000" -> "1000"
+    spelling  American to British spelling ("color" -> "colour", "organize" -> "organise")
+    articles  a leading "a", "an" or "the" is optional
+Hyphens and punctuation only separate words. Answer keys may list alternatives ("A/B")
+and optional words in parentheses ("(the) steam engine"); key_forms() expands them.
+
+The same tokenizer counts words for instructions such as "NO MORE THAN TWO WORDS AND/OR
+A NUMBER"; as in the test itself a hyphenated word counts as one word.
+"""
+import re
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+
+# Numbers keep their decimal point, digit grouping and fraction slash; ordinals keep their suffix
+TOKEN_RE = re.compile(r"\d+(?:[.,/]\d+)*(?:st|nd|rd|th)?|[^\W\d_]+(?:['’-][^\W\d_]+)*")
+# "A/B" alternatives, but not fractions or dates such as "3/4"
+ALTERNATIVE_RE = re.compile(r'\s*(?<!\d)/\s*|\s*/(?!\d)\s*')
+OPTIONAL_RE = re.compile(r'\(([^()]*)\)')
+MAX_OPTIONAL_GROUPS = 4
+
+WORD_LIMIT_RE = re.compile(
+    r'\b(ONE|TWO|THREE|FOUR|FIVE|SIX|\d+)\s+WORDS?\b(?:\s+ONLY)?'
+    r'(\s+AND\s*/\s*OR\s+(?:A|ONE)\s+NUMBER)?', re.IGNORECASE)
+NUMBER_ONLY_RE = re.compile(r'\b(?:A|ONE)\s+NUMBER\b', re.IGNORECASE)
+LIMIT_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word and number tokens; hyphenated words stay one token, punctuation separates"""
+    return TOKEN_RE.findall(text.lower().replace('’', "'")) if text else []
+
+
+def is_number_token(token: str) -> bool:
+    return token[0].isdigit()
+
+
+class WordLimit:
+    """A parsed "NO MORE THAN n WORDS [AND/OR A NUMBER]" instruction"""
+    __slots__ = ('max_words', 'allow_number')
+
+    def __init__(self, max_words: int, allow_number: bool = False):
+        self.max_words = max_words
+        self.allow_number = allow_number
+
+    def accepts(self, words: int, numbers: int) -> bool:
+        """words and numbers as counted by Canonicalizer.analyze()"""
+        if self.allow_number:
+            return words <= self.max_words and numbers <= 1
+        return words + numbers <= self.max_words
+
+    def __repr__(self):
+        return f"WordLimit({self.max_words}, allow_number={self.allow_number})"
+
+
+def parse_word_limit(instructions: str) -> Optional[WordLimit]:
+    """The word limit stated in a question group's instructions, if any"""
+    if not instructions:
+        return None
+    match = WORD_LIMIT_RE.search(instructions)
+    if match:
+        count = match.group(1).lower()
+        return WordLimit(int(count) if count.isdigit() else LIMIT_WORDS[count], bool(match.group(2)))
+    if NUMBER_ONLY_RE.search(instructions):
+        return WordLimit(0, allow_number=True)
+    return None
+
+
+EquivalenceRule = Callable[[List[str]], List[str]]
+EQUIVALENCE_RULES: Dict[str, EquivalenceRule] = {}
+DEFAULT_RULES = ('numbers', 'spelling', 'articles')
+
+
+def equivalence_rule(name: str):
+    """Register a token rule; plugin modules use this decorator at import time"""
+    def register(func: EquivalenceRule) -> EquivalenceRule:
+        EQUIVALENCE_RULES[name] = func
+        return func
+    return register
+
+
+UNITS = ['zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten',
+         'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen', 'seventeen',
+         'eighteen', 'nineteen']
+TENS = ['', '', 'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety']
+NUMBER_WORDS = {word: value for value, word in enumerate(UNITS)}
+NUMBER_WORDS.update({word: value * 10 for value, word in enumerate(TENS) if word})
+SCALES = {'hundred': 100, 'thousand': 1000, 'million': 1000000}
+ORDINAL_WORDS = {
+    'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5, 'sixth': 6, 'seventh': 7,
+    'eighth': 8, 'ninth': 9, 'tenth': 10, 'eleventh': 11, 'twelfth': 12, 'thirteenth': 13,
+    'fourteenth': 14, 'fifteenth': 15, 'sixteenth': 16, 'seventeenth': 17, 'eighteenth': 18,
+    'nineteenth': 19, 'twentieth': 20, 'thirtieth': 30, 'fortieth': 40, 'fiftieth': 50,
+    'sixtieth': 60, 'seventieth': 70, 'eightieth': 80, 'ninetieth': 90, 'hundredth': 100,
+    'thousandth': 1000,
+}
+
+
+def ordinal_suffix(value: int) -> str:
+    if 10 <= value % 100 <= 20:
+        return 'th'
+    return {1: 'st', 2: 'nd', 3: 'rd'}.get(value % 10, 'th')
+
+
+@equivalence_rule('numbers')
+def numbers_rule(tokens: List[str]) -> List[str]:
+    """Spelled-out cardinals and ordinals become digits; digit grouping commas are dropped
+
+    Number words only combine the way numbers are said: a unit after a tens word
+    ("twenty five") and anything smaller after a scale word ("two hundred and five").
+    Other runs ("two three", "nineteen ninety") stay separate numbers.
+    """
+    out: List[str] = []
+    total = current = 0
+    in_number = False
+    last = None  # 'tens' or 'scale' when the previous word was one, else 'word'
+
+    def close():
+        nonlocal total, current, in_number, last
+        if in_number:
+            out.append(str(total + current))
+        total = current = 0
+        in_number = False
+        last = None
+
+    def joins(value: int) -> bool:
+        """A word worth value (below 100) continues the current number"""
+        return in_number and (last == 'scale' or (1 <= value <= 9 and last == 'tens'))
+
+    def joins_scale(scale: int) -> bool:
+        if not in_number:
+            return True
+        if scale == 100:
+            return last != 'scale' and current < 100
+        return (last != 'scale' or current > 0) and total % (scale * 1000) == 0
+
+    def apply_scale(scale: int):
+        nonlocal total, current
+        if scale == 100:
+            current = max(current, 1) * scale
+        else:
+            total += max(current, 1) * scale
+            current = 0
+
+    for index, token in enumerate(tokens):
+        if token in NUMBER_WORDS:
+            value = NUMBER_WORDS[token]
+            if not joins(value):
+                close()
+            current += value
+            in_number = True
+            last = 'tens' if value >= 20 else 'word'
+        elif token in SCALES:
+            if not joins_scale(SCALES[token]):
+                close()
+            apply_scale(SCALES[token])
+            in_number = True
+            last = 'scale'
+        elif token in ORDINAL_WORDS:
+            value = ORDINAL_WORDS[token]
+            if value >= 100:
+                if in_number and joins_scale(value):
+                    apply_scale(value)
+                    value = 0
+                else:
+                    close()
+            elif not joins(value):
+                close()
+            value += total + current
+            total = current = 0
+            in_number = False
+            last = None
+            out.append(f"{value}{ordinal_suffix(value)}")
+        elif (token == 'and' and in_number and last == 'scale' and index + 1 < len(tokens)
+              and NUMBER_WORDS.get(tokens[index + 1], ORDINAL_WORDS.get(tokens[index + 1], 100)) < 100):
+            continue  # "one hundred and five"
+        else:
+            close()
+            out.append(token.replace(',', '') if token[0].isdigit() else token)
+    close()
+    return out
+
+
+# American form -> British form; -ize/-yze endings are handled by suffix below
+SPELLING_VARIANTS = {
+    'color': 'colour', 'colors': 'colours', 'colored': 'coloured', 'favor': 'favour',
+    'favorite': 'favourite', 'flavor': 'flavour', 'honor': 'honour', 'humor': 'humour',
+    'labor': 'labour', 'neighbor': 'neighbour', 'neighbors': 'neighbours',
+    'neighborhood': 'neighbourhood', 'behavior': 'behaviour', 'behaviors': 'behaviours',
+    'harbor': 'harbour', 'rumor': 'rumour', 'vapor': 'vapour', 'armor': 'armour',
+    'center': 'centre', 'centers': 'centres', 'theater': 'theatre', 'meter': 'metre',
+    'meters': 'metres', 'liter': 'litre', 'liters': 'litres', 'fiber': 'fibre',
+    'kilometer': 'kilometre', 'kilometers': 'kilometres', 'centimeter': 'centimetre',
+    'centimeters': 'centimetres', 'millimeter': 'millimetre', 'millimeters': 'millimetres',
+    'catalog': 'catalogue', 'dialog': 'dialogue', 'defense': 'defence', 'offense': 'offence',
+    'license': 'licence', 'gray': 'grey', 'tire': 'tyre', 'tires': 'tyres',
+    'aluminum': 'aluminium', 'jewelry': 'jewellery', 'traveled': 'travelled',
+    'traveling': 'travelling', 'traveler': 'traveller', 'travelers': 'travellers',
+    'modeling': 'modelling', 'labeled': 'labelled', 'canceled': 'cancelled',
+    'fueled': 'fuelled', 'fulfill': 'fulfil', 'enroll': 'enrol', 'skillful': 'skilful',
+    'aging': 'ageing', 'maneuver': 'manoeuvre', 'plow': 'plough', 'mold': 'mould',
+    'cozy': 'cosy', 'mustache': 'moustache', 'sulfur': 'sulphur', 'fetus': 'foetus',
+    'anemia': 'anaemia', 'archeology': 'archaeology', 'esthetic': 'aesthetic',
+    'program': 'programme', 'programs': 'programmes',
+}
+# Words where the -ise form is a different word
+IZE_EXCEPTIONS = frozenset({'prize', 'prizes', 'prized', 'prizing'})
+IZE_SUFFIX_RE = re.compile(r'(?<=\w{2})(i|y)z(e|es|ed|ing|ation|ations|er|ers)$')
+
+
+@lru_cache(maxsize=8192)
+def british_spelling(token: str) -> str:
+    variant = SPELLING_VARIANTS.get(token)
+    if variant is not None:
+        return variant
+    if token not in IZE_EXCEPTIONS:
+        return IZE_SUFFIX_RE.sub(r'\1s\2', token)
+    return token
+
+
+@equivalence_rule('spelling')
+def spelling_rule(tokens: List[str]) -> List[str]:
+    """American spellings are accepted for British ones and vice versa"""
+    return [british_spelling(token) for token in tokens]
+
+
+ARTICLES = frozenset({'a', 'an', 'the'})
+
+
+@equivalence_rule('articles')
+def articles_rule(tokens: List[str]) -> List[str]:
+    """A leading article is optional"""
+    if len(tokens) > 1 and tokens[0] in ARTICLES:
+        return tokens[1:]
+    return tokens
+
+
+def answer_alternatives(answer: str) -> List[str]:
+    """Expand "A/B" alternatives and "(optional) words" of an answer key into plain answers"""
+    expanded: List[str] = []
+    for alternative in ALTERNATIVE_RE.split(answer or ""):
+        groups = OPTIONAL_RE.findall(alternative)[:MAX_OPTIONAL_GROUPS]
+        parts = OPTIONAL_RE.split(alternative, maxsplit=len(groups))
+        # parts alternates text, optional, text, ...; try every keep/drop combination
+        for mask in range(1 << len(groups)):
+            pieces = [part if i % 2 == 0 or mask >> (i // 2) & 1 else ' '
+                      for i, part in enumerate(parts)]
+            expanded.append(''.join(pieces))
+    return expanded
+
+
+class Canonicalizer:
+    """A compiled rule pipeline; analyze() is memoized because cohorts repeat answers a lot"""
+
+    def __init__(self, rules: Sequence[str] = DEFAULT_RULES):
+        unknown = [name for name in rules if name not in EQUIVALENCE_RULES]
+        if unknown:
+            raise ValueError(f"Unknown equivalence rules: {', '.join(unknown)}")
+        self.rules: Tuple[str, ...] = tuple(rules)
+        self._pipeline = [EQUIVALENCE_RULES[name] for name in self.rules]
+        self.analyze = lru_cache(maxsize=65536)(self._analyze)
+
+    def _analyze(self, text: str) -> Tuple[str, int, int]:
+        """(canonical form, word count, number count) from a single tokenization"""
+        tokens = tokenize(text)
+        numbers = sum(1 for token in tokens if is_number_token(token))
+        words = len(tokens) - numbers
+        tokens = [part for token in tokens for part in token.split('-')]
+        for rule in self._pipeline:
+            tokens = rule(tokens)
+        return ' '.join(tokens), words, numbers
+
+    def canonical(self, text: str) -> str:
+        return self.analyze(text)[0]
+
+    def key_forms(self, answer: str) -> FrozenSet[str]:
+        """Every canonical form an answer key accepts"""
+        return frozenset(form for form in map(self.canonical, answer_alternatives(answer)) if form)
+
+
+_canonicalizers: Dict[Tuple[str, ...], Canonicalizer] = {}
+
+
+def get_canonicalizer(rules: Iterable[str] = DEFAULT_RULES) -> Canonicalizer:
+    """Shared canonicalizer per rule set, so its memo is reused across packages"""
+    rules = tuple(rules)
+    canonicalizer = _canonicalizers.get(rules)
+    if canonicalizer is None:
+        canonicalizer = _canonicalizers[rules] = Canonicalizer(rules)
+    return canonicalizer
@@ -0,0 +1,22 @@
+"""
+Application Paths
+Per-user data locations shared by the GUI modules and background services
+
+Everything lives under $IELTS_READING_HOME, or ~/.ielts_reading when it is unset.
+"""
+import os
+
+
+HOME_ENV = 'IELTS_READING_HOME'
+
+
+def app_home() -> str:
+    """Root directory for the application's own data"""
+    return os.environ.get(HOME_ENV) or os.path.join(os.path.expanduser('~'), '.ielts_reading')
+
+
+def data_dir(name: str) -> str:
+    """A named subdirectory of app_home(), created on first use"""
+    path = os.path.join(app_home(), name)
+    os.makedirs(path, exist_ok=True)
+    return path
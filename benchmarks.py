@@ -0,0 +1,603 @@
+"""
+Benchmarks
+Reproducible memory and timing measurements for the data paths that scale with cohort size
+
+Usage: python benchmarks.py [name ...] [--sessions N] [--answers N] [--stroke-points N]
+       [--diagram-elements N] [--grading-sessions N] [--store-attempts N]
+       [--paragraphs N] [--questions-per-type N] [--table-rows N] [--table-columns N]
+       [--flowchart-steps N] [--diagram-strokes N]
+       [--save-baseline FILE] [--baseline FILE] [--tolerance FRACTION]
+
+Tk benchmarks use the current display, or start Xvfb when there is none and it is installed;
+without either they are reported as skipped. With --baseline the run fails (exit status 1)
+when a timing or memory figure is worse than the stored one by more than the tolerance.
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+
+BENCHMARKS: Dict[str, Callable] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark function that takes the parsed args and returns a result dict"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def measure_memory(build: Callable):
+    """Return (object, peak bytes, retained bytes, seconds) of build()"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        built = build()
+        elapsed = time.perf_counter() - started
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return built, peak, retained, elapsed
+
+
+def synthetic_answers(sessions: int, answers: int):
+    """Yield (question_id, answer, timestamp) rows per session, like a real cohort"""
+    options = ["TRUE", "FALSE", "NOT GIVEN", "A", "B", "C", "D", None]
+    start = datetime(2024, 1, 1, 9, 0, 0)
+    for session in range(sessions):
+        yield [
+            (f"pkg_q{number}", options[(session + number) % len(options)],
+             start + timedelta(seconds=session * 60 + number * 7, milliseconds=number))
+            for number in range(1, answers + 1)
+        ]
+
+
+@benchmark('answer-memory')
+def bench_answer_memory(args) -> Dict:
+    """Memory of a cohort held as dataclasses, slotted records and AnswerSheets"""
+    from models import AnswerRecord
+    from compact_models import SlottedAnswerRecord, StringTable, AnswerSheet, to_epoch_ms
+
+    def dataclasses():
+        return [[AnswerRecord(qid, answer, ts) for qid, answer, ts in rows]
+                for rows in synthetic_answers(args.sessions, args.answers)]
+
+    def slotted():
+        return [[SlottedAnswerRecord(qid, answer, to_epoch_ms(ts)) for qid, answer, ts in rows]
+                for rows in synthetic_answers(args.sessions, args.answers)]
+
+    def sheets():
+        strings = StringTable()
+        cohort = []
+        for rows in synthetic_answers(args.sessions, args.answers):
+            sheet = AnswerSheet(strings)
+            for qid, answer, ts in rows:
+                sheet.append(qid, answer, ts)
+            cohort.append(sheet)
+        return cohort
+
+    report = {'sessions': args.sessions, 'answers': args.answers, 'variants': {}}
+    for label, build in (('dataclass', dataclasses), ('slotted', slotted), ('answer-sheet', sheets)):
+        cohort, peak, retained, elapsed = measure_memory(build)
+        report['variants'][label] = {
+            'retained_mb': round(retained / 1e6, 2),
+            'peak_mb': round(peak / 1e6, 2),
+            'bytes_per_answer': round(retained / (args.sessions * args.answers), 1),
+            'seconds': round(elapsed, 3),
+        }
+        del cohort
+    return report
+
+
+def recorded_stroke(count: int = 5000):
+    """A deterministic freehand stroke: a slow spiral sampled like 1-3 px mouse motion"""
+    points = []
+    for index in range(count):
+        angle = index * 0.01
+        radius = 40 + index * 0.05
+        jitter = ((index * 7919) % 5 - 2) * 0.3
+        points.append((round(450 + radius * math.cos(angle) + jitter),
+                       round(300 + radius * math.sin(angle) - jitter)))
+    return points
+
+
+@benchmark('stroke-replay')
+def bench_stroke_replay(args) -> Dict:
+    """Replay a recorded 5k-point stroke through the old full-coords path and StrokeBuilder"""
+    from diagram_tools import StrokeBuilder, flatten_points
+
+    stroke = recorded_stroke(args.stroke_points)
+    report = {'points': len(stroke), 'variants': {}}
+
+    def full_coords(send):
+        points = []
+        for point in stroke:
+            points.append(point)
+            send(flatten_points(points))
+        return points
+
+    def incremental(send):
+        builder = StrokeBuilder()
+        builder.start(*stroke[0])
+        for x, y in stroke[1:]:
+            segment = builder.add(x, y)
+            if segment:
+                send(segment)
+        committed = builder.finish(*stroke[-1])
+        send(flatten_points(committed))
+        return committed
+
+    canvas = None
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+        canvas = tk.Canvas(root, width=900, height=600)
+    except Exception:
+        root = None
+
+    for label, replay in (('full-coords', full_coords), ('incremental', incremental)):
+        sent = [0]
+
+        def send(coords):
+            sent[0] += len(coords)
+
+        started = time.perf_counter()
+        kept = replay(send)
+        elapsed = time.perf_counter() - started
+        row = {'coords_sent': sent[0], 'kept_points': len(kept), 'seconds': round(elapsed, 4)}
+
+        if canvas is not None:
+            item = canvas.create_line(0, 0, 1, 1)
+            if label == 'full-coords':
+                def send_to_canvas(coords):
+                    canvas.coords(item, *coords)
+            else:
+                def send_to_canvas(coords):
+                    canvas.create_line(*coords, tags='replay')
+            started = time.perf_counter()
+            replay(send_to_canvas)
+            root.update_idletasks()
+            row['tk_seconds'] = round(time.perf_counter() - started, 4)
+            canvas.delete('all')
+        report['variants'][label] = row
+
+    if root is not None:
+        root.destroy()
+    return report
+
+
+@benchmark('diagram-hit-test')
+def bench_diagram_hit_test(args) -> Dict:
+    """Pick elements on a crowded diagram through the grid index and by a linear scan"""
+    from diagram_tools import DiagramDocument, element_distance
+
+    count = args.diagram_elements
+    elements = []
+    for index in range(count):
+        x, y = (index * 37) % 1200, (index * 53) % 800
+        if index % 2:
+            elements.append({'kind': 'line', 'coords': [x, y, x + 30, y + 12], 'width': 2})
+        else:
+            elements.append({'kind': 'rect', 'coords': [x, y, x + 24, y + 18], 'width': 2})
+    document = DiagramDocument(elements)
+    probes = [((index * 97) % 1200, (index * 61) % 800) for index in range(1000)]
+
+    ordered = [(element_id, document.get(element_id)) for element_id in document.ids()]
+
+    def linear(x, y, tolerance=4.0):
+        best = None
+        for element_id, element in ordered:
+            if element_distance(element, x, y) <= tolerance:
+                best = element_id
+        return best
+
+    report = {'elements': count, 'probes': len(probes), 'variants': {}}
+    for label, pick in (('linear-scan', linear), ('grid-index', document.hit_test)):
+        started = time.perf_counter()
+        hits = sum(1 for x, y in probes if pick(x, y) is not None)
+        elapsed = time.perf_counter() - started
+        report['variants'][label] = {'hits': hits, 'ms_per_pick': round(elapsed / len(probes) * 1000, 4)}
+    return report
+
+
+def synthetic_package(questions: int = 40):
+    """A 40-question package, half of it free-text completion answers"""
+    from models import ReadingPackage, QuestionGroup, Question, QuestionType
+
+    package = ReadingPackage(package_id="bench")
+    answers = ["the industrial revolution", "twenty-five", "colour", "(steam) engine", "organisation"]
+    letters = QuestionGroup(type=QuestionType.TYPE1)
+    completion = QuestionGroup(type=QuestionType.TYPE11,
+                               explanation="Write NO MORE THAN THREE WORDS AND/OR A NUMBER.")
+    for number in range(questions):
+        if number % 2:
+            completion.questions.append(Question(answer=answers[number % len(answers)],
+                                                 question_id=f"bench_q{number}"))
+        else:
+            letters.questions.append(Question(answer="ABCD"[number % 4], question_id=f"bench_q{number}"))
+    package.question_groups = [letters, completion]
+    return package
+
+
+@benchmark('bulk-grading')
+def bench_bulk_grading(args) -> Dict:
+    """Grade a cohort with a per-comparison rule pass on both sides and with a compiled answer key"""
+    from models import AnswerRecord
+    from answer_equivalence import Canonicalizer
+    from grading import compile_answer_key, evaluate_answers
+
+    package = synthetic_package(args.answers)
+    responses = ["Industrial Revolution", "25", "color", "engine", "organization", "A", "B", "wrong answer"]
+    cohort = [[AnswerRecord(f"bench_q{number}", responses[(session + number) % len(responses)])
+               for number in range(args.answers)]
+              for session in range(args.grading_sessions)]
+
+    uncached = Canonicalizer()
+    uncached.analyze = uncached._analyze  # no memo: every comparison redoes the rule passes
+
+    def per_comparison(records):
+        correct = 0
+        lookup = {record.question_id: record.user_answer for record in records}
+        for qg in package.question_groups:
+            for question in qg.questions:
+                answer = lookup.get(question.question_id)
+                if answer and uncached.canonical(answer) in uncached.key_forms(question.answer):
+                    correct += 1
+        return correct
+
+    key = compile_answer_key(package)
+    report = {'sessions': len(cohort), 'questions': args.answers, 'variants': {}}
+    for label, grade in (('per-comparison', per_comparison),
+                         ('compiled-key', lambda records: evaluate_answers(package, records, answer_key=key))):
+        started = time.perf_counter()
+        for records in cohort:
+            grade(records)
+        elapsed = time.perf_counter() - started
+        report['variants'][label] = {'seconds': round(elapsed, 3),
+                                     'sessions_per_second': round(len(cohort) / elapsed)}
+    return report
+
+
+@benchmark('band-lookup')
+def bench_band_lookup(args) -> Dict:
+    """Band scores for a cohort's raw scores: rebuilt rules dict per call vs one compiled array"""
+    from models import IELTSScoringRules
+    from scoring import get_scoring_table
+
+    raw_scores = [(session * 7919) % 41 for session in range(args.sessions * 10)]
+    table = get_scoring_table()
+
+    def per_call_rules():
+        return [IELTSScoringRules.get_academic_rules().mapping.get(raw, 0.0) for raw in raw_scores]
+
+    def compiled_scalar():
+        band = table.band
+        return [band(raw) for raw in raw_scores]
+
+    report = {'scores': len(raw_scores), 'variants': {}}
+    for label, run in (('rules-per-call', per_call_rules), ('compiled-scalar', compiled_scalar),
+                       ('bands-for', lambda: table.bands_for(raw_scores))):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        report['variants'][label] = {'seconds': round(elapsed, 4),
+                                     'ns_per_score': round(elapsed / len(raw_scores) * 1e9)}
+    return report
+
+
+@benchmark('results-store')
+def bench_results_store(args) -> Dict:
+    """Trend queries and a one-question regrade against a store holding --store-attempts attempts"""
+    import copy
+    import os
+    import tempfile
+    from models import AnswerSession, EvaluationResult, FeedbackItem
+    from results_store import ResultsStore
+    from regrade import regrade_package
+
+    package = synthetic_package(args.answers)
+    question_ids = [q.question_id for qg in package.question_groups for q in qg.questions]
+    candidates = max(1, args.store_attempts // 50)
+    start = datetime(2024, 1, 1, 9, 0, 0)
+
+    def attempts():
+        for number in range(args.store_attempts):
+            feedback = [FeedbackItem(question_id, (number + index) % 3 != 0, "A", "A")
+                        for index, question_id in enumerate(question_ids)]
+            correct = sum(item.is_correct for item in feedback)
+            result = EvaluationResult(total_questions=len(feedback), correct_count=correct,
+                                      incorrect_count=len(feedback) - correct, band_score=6.5,
+                                      per_question_feedback=feedback)
+            yield result, AnswerSession(session_id=f"s{number}", candidate_id=f"c{number % candidates}",
+                                        package_id=package.package_id,
+                                        submitted_at=start + timedelta(minutes=number))
+
+    report = {'attempts': args.store_attempts, 'questions': len(question_ids), 'variants': {}}
+    with tempfile.TemporaryDirectory() as directory:
+        with ResultsStore(os.path.join(directory, 'results.sqlite3')) as store:
+            started = time.perf_counter()
+            store.record_many(attempts(), package)
+            report['variants']['insert'] = {'seconds': round(time.perf_counter() - started, 2)}
+
+            queries = (('accuracy-by-type', lambda candidate: store.accuracy_by_type(candidate, 10)),
+                       ('band-trend', lambda candidate: store.band_trend(candidate, 10)),
+                       ('question-accuracy', lambda candidate: store.question_accuracy(question_ids[0])))
+            for label, query in queries:
+                rounds = 200 if label != 'question-accuracy' else 5
+                started = time.perf_counter()
+                for number in range(rounds):
+                    query(f"c{number % candidates}")
+                elapsed = time.perf_counter() - started
+                report['variants'][label] = {'ms_per_query': round(elapsed / rounds * 1000, 3)}
+
+            corrected = copy.deepcopy(package)
+            corrected.question_groups[0].questions[0].answer = "B"
+            started = time.perf_counter()
+            regraded = regrade_package(store, package, corrected)
+            report['variants']['regrade'] = {'seconds': round(time.perf_counter() - started, 2),
+                                             'answers_checked': regraded.answers_checked,
+                                             'attempts_changed': regraded.attempts_changed}
+    return report
+
+
+def generated_package(args):
+    """The synthetic package described by the generator arguments"""
+    from models import QuestionType
+    from package_generator import generate_package
+
+    return generate_package(paragraphs=args.paragraphs,
+                            questions_per_type={question_type: args.questions_per_type
+                                                for question_type in QuestionType},
+                            table_rows=args.table_rows, table_columns=args.table_columns,
+                            flowchart_steps=args.flowchart_steps, diagram_strokes=args.diagram_strokes)
+
+
+def time_rounds(run: Callable, rounds: int) -> float:
+    """Best of several rounds, in seconds; the minimum is the least noisy estimate"""
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+@benchmark('package-io')
+def bench_package_io(args) -> Dict:
+    """Save and load a generated package as .json and .json.gz"""
+    from models import ReadingPackage
+
+    package = generated_package(args)
+    report = {'questions': sum(len(qg.questions) for qg in package.question_groups), 'variants': {}}
+    with tempfile.TemporaryDirectory() as directory:
+        for suffix in ('.json', '.json.gz'):
+            path = os.path.join(directory, 'package' + suffix)
+            save = time_rounds(lambda: package.save_to_file(path), 5)
+            load = time_rounds(lambda: ReadingPackage.load_from_file(path), 5)
+            report['variants'][suffix] = {'save_seconds': round(save, 4), 'load_seconds': round(load, 4),
+                                          'kb': round(os.path.getsize(path) / 1024)}
+    return report
+
+
+@benchmark('package-grading')
+def bench_package_grading(args) -> Dict:
+    """Grade a cohort against a generated package covering every question type"""
+    from models import AnswerRecord
+    from grading import compile_answer_key, evaluate_answers
+
+    package = generated_package(args)
+    questions = [q for qg in package.question_groups for q in qg.questions]
+    cohort = [[AnswerRecord(q.question_id, q.answer if (session + index) % 3 else "wrong")
+               for index, q in enumerate(questions)]
+              for session in range(args.grading_sessions // 5)]
+    key = time_rounds(lambda: compile_answer_key(package), 3)
+    answer_key = compile_answer_key(package)
+
+    def grade_cohort():
+        for records in cohort:
+            evaluate_answers(package, records, answer_key=answer_key)
+    elapsed = time_rounds(grade_cohort, 3)
+    return {'sessions': len(cohort), 'questions': len(questions),
+            'variants': {'compile-key': {'seconds': round(key, 4)},
+                         'grade-cohort': {'seconds': round(elapsed, 3),
+                                          'sessions_per_second': round(len(cohort) / elapsed)}}}
+
+
+@contextmanager
+def tk_root():
+    """A withdrawn Tk root, under a private Xvfb when there is no display; None when Tk cannot start"""
+    xvfb = None
+    display = os.environ.get('DISPLAY')
+    if not display and shutil.which('Xvfb'):
+        virtual = f":{100 + os.getpid() % 400}"
+        xvfb = subprocess.Popen(['Xvfb', virtual, '-screen', '0', '1600x1200x24', '-nolisten', 'tcp'],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.environ['DISPLAY'] = virtual
+        time.sleep(0.5)
+    root = None
+    try:
+        try:
+            import tkinter as tk
+            root = tk.Tk()
+            root.withdraw()
+        except Exception:
+            root = None
+        yield root
+    finally:
+        if root is not None:
+            root.destroy()
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+            if display is None:
+                os.environ.pop('DISPLAY', None)
+
+
+@contextmanager
+def scratch_app_home():
+    """Point app_home() at a temporary directory so windows do not write into the user's data"""
+    from app_paths import HOME_ENV
+
+    previous = os.environ.get(HOME_ENV)
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ[HOME_ENV] = directory
+        try:
+            yield directory
+        finally:
+            if previous is None:
+                os.environ.pop(HOME_ENV, None)
+            else:
+                os.environ[HOME_ENV] = previous
+
+
+@benchmark('exam-render')
+def bench_exam_render(args) -> Dict:
+    """Build the exam window for a generated package (Tk)"""
+    package = generated_package(args)
+    with scratch_app_home(), tk_root() as root:
+        if root is None:
+            return {'skipped': "no display and no Xvfb"}
+        import tkinter as tk
+        import exam_engine
+
+        showinfo = exam_engine.messagebox.showinfo
+        exam_engine.messagebox.showinfo = lambda *a, **k: None  # the modal "Package Loaded" box
+        try:
+            def render():
+                window = tk.Toplevel(root)
+                exam_engine.ExamEngineWindow(window, package=package)
+                window.update_idletasks()
+                window.destroy()
+            seconds = time_rounds(render, 3)
+        finally:
+            exam_engine.messagebox.showinfo = showinfo
+    return {'groups': len(package.question_groups), 'variants': {'build': {'seconds': round(seconds, 3)}}}
+
+
+@benchmark('result-render')
+def bench_result_render(args) -> Dict:
+    """Build the results window for a graded attempt on a generated package (Tk)"""
+    from models import AnswerRecord
+
+    package = generated_package(args)
+    answers = [AnswerRecord(q.question_id, q.answer if index % 2 else "wrong")
+               for index, q in enumerate(q for qg in package.question_groups for q in qg.questions)]
+    with scratch_app_home(), tk_root() as root:
+        if root is None:
+            return {'skipped': "no display and no Xvfb"}
+        import tkinter as tk
+        from result_engine import ResultEngineWindow
+
+        def render():
+            window = tk.Toplevel(root)
+            ResultEngineWindow(window, package, answers, record_statistics=False, record_history=False)
+            window.update_idletasks()
+            window.destroy()
+        seconds = time_rounds(render, 3)
+    return {'questions': len(answers), 'variants': {'build': {'seconds': round(seconds, 3)}}}
+
+
+# Report figures where lower is better, with the smallest increase that counts as a regression
+# (timer noise on sub-millisecond figures is far larger than any tolerance)
+BASELINE_METRICS = {
+    'seconds': 0.002, 'save_seconds': 0.002, 'load_seconds': 0.002, 'tk_seconds': 0.002,
+    'ms_per_query': 0.05, 'ns_per_score': 20, 'retained_mb': 0.1, 'peak_mb': 0.1, 'bytes_per_answer': 1,
+}
+
+
+def baseline_figures(reports: Dict[str, Dict]) -> Dict[str, float]:
+    """{"benchmark/variant/metric": value} for every comparable figure"""
+    figures = {}
+    for name, report in reports.items():
+        for label, row in report.get('variants', {}).items():
+            for metric, value in row.items():
+                if metric in BASELINE_METRICS:
+                    figures[f"{name}/{label}/{metric}"] = value
+    return figures
+
+
+def find_regressions(figures: Dict[str, float], baseline: Dict[str, float],
+                     tolerance: float) -> List[str]:
+    """Figures worse than the baseline by more than tolerance (a fraction); new figures are ignored"""
+    regressions = []
+    for key, value in sorted(figures.items()):
+        reference = baseline.get(key)
+        if reference is None or value - reference <= BASELINE_METRICS[key.rsplit('/', 1)[1]]:
+            continue
+        if value > reference * (1 + tolerance):
+            regressions.append(f"{key}: {value} (baseline {reference}, +{(value / reference - 1) * 100:.0f}%)"
+                               if reference else f"{key}: {value} (baseline 0)")
+    return regressions
+
+
+def print_report(name: str, report: Dict):
+    print(f"== {name}")
+    for key, value in report.items():
+        if isinstance(value, dict):
+            for label, row in value.items():
+                cells = ", ".join(f"{k}={v}" for k, v in row.items()) if isinstance(row, dict) else row
+                print(f"    {label:<14} {cells}")
+        else:
+            print(f"  {key}: {value}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run IELTS Reading benchmarks")
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run (default all: {', '.join(BENCHMARKS)})")
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--answers', type=int, default=40)
+    parser.add_argument('--stroke-points', type=int, default=5000)
+    parser.add_argument('--diagram-elements', type=int, default=5000)
+    parser.add_argument('--grading-sessions', type=int, default=5000)
+    parser.add_argument('--store-attempts', type=int, default=100000)
+    generator = parser.add_argument_group("generated package")
+    generator.add_argument('--paragraphs', type=int, default=12)
+    generator.add_argument('--questions-per-type', type=int, default=10)
+    generator.add_argument('--table-rows', type=int, default=8)
+    generator.add_argument('--table-columns', type=int, default=4)
+    generator.add_argument('--flowchart-steps', type=int, default=10)
+    generator.add_argument('--diagram-strokes', type=int, default=50)
+    parser.add_argument('--save-baseline', metavar='FILE', help="write this run's figures as the baseline")
+    parser.add_argument('--baseline', metavar='FILE', help="fail on regressions against a saved baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown over the baseline as a fraction (default 0.25)")
+    args = parser.parse_args(argv)
+
+    reports = {}
+    for name in args.names or list(BENCHMARKS):
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+        reports[name] = BENCHMARKS[name](args)
+        print_report(name, reports[name])
+
+    figures = baseline_figures(reports)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(figures, f, indent=2, sort_keys=True)
+        print(f"Baseline with {len(figures)} figures written to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(figures, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
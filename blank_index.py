@@ -0,0 +1,156 @@
+"""
+Blank Token Index
+Locate summary, table and flow-chart gaps once per package load
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from models import ReadingPackage, QuestionGroup
+
+
+# Inline gap tokens such as "[3]" or "[BLANK]"
+BLANK_TOKEN_RE = re.compile(r'\[(\d+)\]|\[BLANK\]')
+
+# A table cell holding nothing but a single gap token
+BLANK_CELL_RE = re.compile(r'\s*(?:\[\d+\]|\[BLANK\])\s*')
+
+# Horizontal flow-chart arrows
+FLOWCHART_ARROW_RE = re.compile(r'\s*(?:→|->)\s*')
+
+SUMMARY = 'summary'
+TABLE = 'table'
+FLOWCHART = 'flowchart'
+
+
+@dataclass
+class BlankLocation:
+    """Position of a single gap token inside a question group's additional input"""
+    group_index: int
+    container: str
+    cell: Tuple[int, int]
+    start: int
+    end: int
+    number: Optional[int] = None
+    question_id: str = ""
+
+
+def iter_blank_spans(text: str) -> Iterable[Tuple[int, int, Optional[int]]]:
+    """Yield (start, end, number) for every gap token in text"""
+    for match in BLANK_TOKEN_RE.finditer(text):
+        number = int(match.group(1)) if match.group(1) else None
+        yield match.start(), match.end(), number
+
+
+def is_blank_cell(text: str) -> bool:
+    """True when a table cell is a full-cell gap"""
+    return BLANK_CELL_RE.fullmatch(text) is not None
+
+
+def has_blank(text: str) -> bool:
+    """True when text contains at least one gap token"""
+    return BLANK_TOKEN_RE.search(text) is not None
+
+
+def split_flowchart_line(line: str) -> List[str]:
+    """Split a horizontal flow-chart line on its arrows"""
+    return [part.strip() for part in FLOWCHART_ARROW_RE.split(line) if part.strip()]
+
+
+class BlankIndex:
+    """Index of every gap token in a package, keyed for constant-time lookup"""
+
+    def __init__(self):
+        self.locations: List[BlankLocation] = []
+        self._by_cell: Dict[Tuple[int, str, Tuple[int, int]], List[BlankLocation]] = {}
+        self._by_number: Dict[Tuple[int, int], BlankLocation] = {}
+        self._by_question: Dict[str, BlankLocation] = {}
+
+    @staticmethod
+    def from_package(package: ReadingPackage) -> 'BlankIndex':
+        """Scan every summary, table and flow-chart of the package once"""
+        index = BlankIndex()
+        first_number = 1
+        for group_index, qg in enumerate(package.question_groups):
+            index._index_group(group_index, qg, first_number)
+            first_number += len(qg.questions)
+        return index
+
+    def _index_group(self, group_index: int, qg: QuestionGroup, first_number: int):
+        if not qg.additional_inputs:
+            return
+        data = qg.additional_inputs.data
+        group_locations: List[BlankLocation] = []
+
+        if 'summaryData' in data:
+            group_locations.extend(
+                self._scan(group_index, SUMMARY, (0, 0), str(data['summaryData']))
+            )
+        elif 'tableData' in data:
+            table = data['tableData']
+            content = table.get('content', [])
+            for r in range(int(table.get('rows', len(content)))):
+                row = content[r] if r < len(content) else []
+                for c in range(int(table.get('cols', len(row)))):
+                    cell_text = row[c] if c < len(row) else ""
+                    group_locations.extend(self._scan(group_index, TABLE, (r, c), cell_text))
+        elif 'flowchartData' in data:
+            lines = str(data['flowchartData']).split('\n')
+            for line_no, line in enumerate(lines):
+                group_locations.extend(self._scan(group_index, FLOWCHART, (line_no, 0), line.strip()))
+
+        self._link_questions(qg, group_locations, first_number)
+        for location in group_locations:
+            self.locations.append(location)
+            key = (location.group_index, location.container, location.cell)
+            self._by_cell.setdefault(key, []).append(location)
+            if location.number is not None:
+                self._by_number.setdefault((group_index, location.number), location)
+            if location.question_id:
+                self._by_question.setdefault(location.question_id, location)
+
+    def _scan(self, group_index: int, container: str, cell: Tuple[int, int], text: str) -> List[BlankLocation]:
+        return [
+            BlankLocation(group_index, container, cell, start, end, number)
+            for start, end, number in iter_blank_spans(text)
+        ]
+
+    def _link_questions(self, qg: QuestionGroup, locations: List[BlankLocation], first_number: int):
+        """Attach question ids: numbered gaps use the exam-wide or in-group
+        question number, unnumbered [BLANK] gaps take the remaining questions in reading order"""
+        questions = qg.questions
+        claimed = set()
+        for location in locations:
+            if location.number is None:
+                continue
+            if first_number <= location.number < first_number + len(questions):
+                position = location.number - first_number
+            elif 1 <= location.number <= len(questions):
+                position = location.number - 1
+            else:
+                continue
+            location.question_id = questions[position].question_id
+            claimed.add(position)
+
+        free = (position for position in range(len(questions)) if position not in claimed)
+        for location in locations:
+            if location.number is None:
+                position = next(free, None)
+                if position is None:
+                    break
+                location.question_id = questions[position].question_id
+
+    def blanks_in(self, group_index: int, container: str, cell: Tuple[int, int] = (0, 0)) -> List[BlankLocation]:
+        """All gaps inside one summary, table cell or flow-chart line"""
+        return self._by_cell.get((group_index, container, cell), [])
+
+    def find(self, group_index: int, number: int) -> Optional[BlankLocation]:
+        """Gap with the given number inside a question group"""
+        return self._by_number.get((group_index, number))
+
+    def for_question(self, question_id: str) -> Optional[BlankLocation]:
+        """Gap linked to a question id"""
+        return self._by_question.get(question_id)
+
+    def unlinked(self) -> List[BlankLocation]:
+        """Gaps that could not be matched to any question"""
+        return [location for location in self.locations if not location.question_id]
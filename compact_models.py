@@ -0,0 +1,281 @@
+"""
+Compact Data Models
+Slotted and array-backed counterparts of the models for large in-memory cohorts
+"""
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+from models import (
+    Question, AnswerRecord, HighlightRecord, FeedbackItem, EvaluationResult
+)
+
+
+NO_STRING = -1
+
+
+def to_epoch_ms(timestamp: datetime) -> int:
+    """Naive local datetime to epoch milliseconds"""
+    return round(timestamp.timestamp() * 1000)
+
+
+def from_epoch_ms(epoch_ms: int) -> datetime:
+    """Epoch milliseconds back to a naive local datetime"""
+    seconds, millis = divmod(epoch_ms, 1000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=millis * 1000)
+
+
+class _Slotted:
+    """Equality and repr for classes that keep their fields in __slots__"""
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class SlottedParagraph(_Slotted):
+    """Paragraph without a per-instance __dict__; style runs are kept as compact int arrays"""
+    __slots__ = ('title', 'body', 'title_runs', 'body_runs')
+
+    def __init__(self, title: str = "", body: str = "", title_runs=(), body_runs=()):
+        self.title = title
+        self.body = body
+        self.title_runs = array('i', title_runs)
+        self.body_runs = array('i', body_runs)
+
+    def to_dict(self) -> Dict:
+        data = {'title': self.title, 'body': self.body}
+        if self.title_runs:
+            data['title_runs'] = self.title_runs.tolist()
+        if self.body_runs:
+            data['body_runs'] = self.body_runs.tolist()
+        return data
+
+    @staticmethod
+    def from_dict(data: Dict) -> 'SlottedParagraph':
+        return SlottedParagraph(data.get('title', ''), data.get('body', ''),
+                                data.get('title_runs', ()), data.get('body_runs', ()))
+
+
+class SlottedQuestion(_Slotted):
+    """Question without a per-instance __dict__"""
+    __slots__ = ('text', 'answer', 'question_id')
+
+    def __init__(self, text: str = "", answer: str = "", question_id: str = ""):
+        self.text = text
+        self.answer = answer
+        self.question_id = question_id
+
+    def to_dict(self) -> Dict:
+        return Question.to_dict(self)
+
+    @staticmethod
+    def from_dict(data: Dict) -> 'SlottedQuestion':
+        return SlottedQuestion(data.get('text', ''), data.get('answer', ''), data.get('question_id', ''))
+
+
+class SlottedAnswerRecord(_Slotted):
+    """Answer record holding its timestamp as epoch milliseconds"""
+    __slots__ = ('question_id', 'user_answer', 'timestamp_ms')
+
+    def __init__(self, question_id: str, user_answer: Optional[str] = None,
+                 timestamp_ms: Optional[int] = None):
+        self.question_id = question_id
+        self.user_answer = user_answer
+        self.timestamp_ms = to_epoch_ms(datetime.now()) if timestamp_ms is None else timestamp_ms
+
+    @property
+    def timestamp(self) -> datetime:
+        return from_epoch_ms(self.timestamp_ms)
+
+    def to_dict(self) -> Dict:
+        return {
+            'question_id': self.question_id,
+            'user_answer': self.user_answer,
+            'timestamp': self.timestamp.isoformat()
+        }
+
+    @staticmethod
+    def from_record(record: AnswerRecord) -> 'SlottedAnswerRecord':
+        return SlottedAnswerRecord(record.question_id, record.user_answer, to_epoch_ms(record.timestamp))
+
+    def to_record(self) -> AnswerRecord:
+        return AnswerRecord(self.question_id, self.user_answer, self.timestamp)
+
+
+class SlottedHighlightRecord(_Slotted):
+    """Highlight record holding its timestamp as epoch milliseconds"""
+    __slots__ = ('selection_range', 'highlight_color', 'timestamp_ms')
+
+    def __init__(self, selection_range: str, highlight_color: str, timestamp_ms: Optional[int] = None):
+        self.selection_range = selection_range
+        self.highlight_color = highlight_color
+        self.timestamp_ms = to_epoch_ms(datetime.now()) if timestamp_ms is None else timestamp_ms
+
+    @property
+    def timestamp(self) -> datetime:
+        return from_epoch_ms(self.timestamp_ms)
+
+    def to_dict(self) -> Dict:
+        return {
+            'selection_range': self.selection_range,
+            'highlight_color': self.highlight_color,
+            'timestamp': self.timestamp.isoformat()
+        }
+
+    @staticmethod
+    def from_record(record: HighlightRecord) -> 'SlottedHighlightRecord':
+        return SlottedHighlightRecord(record.selection_range, record.highlight_color,
+                                      to_epoch_ms(record.timestamp))
+
+
+class SlottedFeedbackItem(_Slotted):
+    """Feedback item without a per-instance __dict__"""
+    __slots__ = ('question_id', 'is_correct', 'correct_answer', 'user_answer', 'reason')
+
+    def __init__(self, question_id: str, is_correct: bool, correct_answer: str,
+                 user_answer: Optional[str], reason: str = ""):
+        self.question_id = question_id
+        self.is_correct = is_correct
+        self.correct_answer = correct_answer
+        self.user_answer = user_answer
+        self.reason = reason
+
+    def to_dict(self) -> Dict:
+        return FeedbackItem.to_dict(self)
+
+    @staticmethod
+    def from_item(item: FeedbackItem) -> 'SlottedFeedbackItem':
+        return SlottedFeedbackItem(item.question_id, item.is_correct, item.correct_answer, item.user_answer,
+                                   item.reason)
+
+
+class StringTable:
+    """Interns strings to small integer ids; share one table across a cohort"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._strings: List[str] = []
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._ids[value] = string_id
+            self._strings.append(value)
+        return string_id
+
+    def lookup(self, string_id: int) -> Optional[str]:
+        return None if string_id == NO_STRING else self._strings[string_id]
+
+    def __len__(self):
+        return len(self._strings)
+
+
+class AnswerSheet:
+    """Column-oriented answer records: interned string ids plus epoch-millisecond timestamps"""
+    __slots__ = ('strings', 'question_ids', 'answers', 'timestamps')
+
+    def __init__(self, strings: Optional[StringTable] = None):
+        self.strings = strings if strings is not None else StringTable()
+        self.question_ids = array('i')
+        self.answers = array('i')
+        self.timestamps = array('q')
+
+    def append(self, question_id: str, user_answer: Optional[str] = None,
+               timestamp: Optional[datetime] = None):
+        self.question_ids.append(self.strings.intern(question_id))
+        self.answers.append(self.strings.intern(user_answer))
+        self.timestamps.append(to_epoch_ms(timestamp or datetime.now()))
+
+    @staticmethod
+    def from_records(records: Iterable[AnswerRecord], strings: Optional[StringTable] = None) -> 'AnswerSheet':
+        sheet = AnswerSheet(strings)
+        for record in records:
+            sheet.append(record.question_id, record.user_answer, record.timestamp)
+        return sheet
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def record(self, index: int) -> AnswerRecord:
+        """Materialize one row as a regular AnswerRecord"""
+        return AnswerRecord(
+            question_id=self.strings.lookup(self.question_ids[index]),
+            user_answer=self.strings.lookup(self.answers[index]),
+            timestamp=from_epoch_ms(self.timestamps[index])
+        )
+
+    def __iter__(self) -> Iterator[AnswerRecord]:
+        for index in range(len(self)):
+            yield self.record(index)
+
+    def to_records(self) -> List[AnswerRecord]:
+        return list(self)
+
+    def to_dict(self) -> List[Dict]:
+        """Same output as [record.to_dict() for record in records] at millisecond precision"""
+        lookup = self.strings.lookup
+        return [
+            {
+                'question_id': lookup(question_id),
+                'user_answer': lookup(answer),
+                'timestamp': from_epoch_ms(timestamp).isoformat()
+            }
+            for question_id, answer, timestamp in zip(self.question_ids, self.answers, self.timestamps)
+        ]
+
+
+class FeedbackSheet:
+    """Column-oriented per-question feedback of one evaluation result"""
+    __slots__ = ('strings', 'question_ids', 'correct', 'correct_answers', 'user_answers', 'reasons')
+
+    def __init__(self, strings: Optional[StringTable] = None):
+        self.strings = strings if strings is not None else StringTable()
+        self.question_ids = array('i')
+        self.correct = bytearray()
+        self.correct_answers = array('i')
+        self.user_answers = array('i')
+        self.reasons = array('i')
+
+    def append(self, item: FeedbackItem):
+        intern = self.strings.intern
+        self.question_ids.append(intern(item.question_id))
+        self.correct.append(1 if item.is_correct else 0)
+        self.correct_answers.append(intern(item.correct_answer))
+        self.user_answers.append(intern(item.user_answer))
+        self.reasons.append(intern(item.reason or None))
+
+    @staticmethod
+    def from_result(result: EvaluationResult, strings: Optional[StringTable] = None) -> 'FeedbackSheet':
+        sheet = FeedbackSheet(strings)
+        for item in result.per_question_feedback:
+            sheet.append(item)
+        return sheet
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def __iter__(self) -> Iterator[FeedbackItem]:
+        lookup = self.strings.lookup
+        for index in range(len(self)):
+            yield FeedbackItem(
+                question_id=lookup(self.question_ids[index]),
+                is_correct=bool(self.correct[index]),
+                correct_answer=lookup(self.correct_answers[index]),
+                user_answer=lookup(self.user_answers[index]),
+                reason=lookup(self.reasons[index]) or ""
+            )
+
+    def correct_count(self) -> int:
+        return self.correct.count(1)
+
+    def to_dict(self) -> List[Dict]:
+        return [item.to_dict() for item in self]
@@ -4,13 +4,32 @@ Provides tools for creating, editing, and storing complete IELTS reading package
 """
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog, simpledialog, font as tkfont
-from typing import Optional
+from typing import Dict, Optional
+from datetime import datetime
+import os
+import queue
+import threading
+import time
 import uuid
 import json
 from models import (
     ReadingPackage, ReadingContent, Paragraph, QuestionGroup,
-    Question, QuestionType, AdditionalInput
+    Question, QuestionType, AdditionalInput, write_package_data
 )
+from package_validation import validate_package
+from instrumentation import traced
+from stall_watchdog import StallWatchdog
+from style_runs import (
+    TEXT_STYLES, iter_runs, make_runs, line_start_offsets, index_to_offset, split_runs
+)
+from diagram_tools import (
+    StrokeBuilder, DiagramDocument, draw_element, element_bbox,
+    parse_diagram_payload, encode_diagram_payload
+)
+
+
+AUTOSAVE_INTERVAL_MS = 60000
+SAVE_POLL_MS = 100
 
 
 class RichTextEditor(tk.Frame):
@@ -20,7 +39,7 @@ class RichTextEditor(tk.Frame):
         super().__init__(parent)
         
         # Toolbar
-        toolbar = tk.Frame(self)
+        self.toolbar = toolbar = tk.Frame(self)
         toolbar.pack(fill=tk.X, padx=5, pady=5)
         
         # Bold button
@@ -68,6 +87,7 @@ class RichTextEditor(tk.Frame):
                 self.text.tag_remove("bold", "sel.first", "sel.last")
             else:
                 self.text.tag_add("bold", "sel.first", "sel.last")
+            self.formatting_changed()
         except tk.TclError:
             pass
     
@@ -78,6 +98,7 @@ class RichTextEditor(tk.Frame):
                 self.text.tag_remove("italic", "sel.first", "sel.last")
             else:
                 self.text.tag_add("italic", "sel.first", "sel.last")
+            self.formatting_changed()
         except tk.TclError:
             pass
     
@@ -89,6 +110,7 @@ class RichTextEditor(tk.Frame):
         try:
             tag = f'h{level}'
             self.text.tag_add(tag, "sel.first", "sel.last")
+            self.formatting_changed()
         except tk.TclError:
             pass
     
@@ -98,18 +120,178 @@ class RichTextEditor(tk.Frame):
         except tk.TclError:
             # Apply to entire text if no selection
             self.text.tag_add(alignment, "1.0", "end")
+        self.formatting_changed()
+
+    def formatting_changed(self):
+        """Tag changes do not set the modified flag; set it so <<Modified>> listeners see them"""
+        self.text.edit_modified(True)
     
     def get_text(self) -> str:
         return self.text.get("1.0", "end-1c")
     
-    def set_text(self, text: str):
+    def set_text(self, text: str, runs=()):
         self.text.delete("1.0", "end")
         self.text.insert("1.0", text)
+        self.apply_runs([("1.0", runs)])
+    
+    def style_spans(self, content: str):
+        """(start, end, style_id) character spans of every formatting tag in the widget"""
+        line_starts = line_start_offsets(content)
+        spans = []
+        for style_id, tag in enumerate(TEXT_STYLES):
+            ranges = self.text.tag_ranges(tag)
+            for i in range(0, len(ranges), 2):
+                start = index_to_offset(line_starts, str(ranges[i]))
+                end = min(index_to_offset(line_starts, str(ranges[i + 1])), len(content))
+                spans.append((start, end, style_id))
+        return spans
+    
+    def get_runs(self) -> list:
+        """Formatting of get_text() as a flat [start, length, style_id, ...] run list"""
+        return make_runs(self.style_spans(self.get_text()))
+    
+    def apply_runs(self, segments):
+        """Tag (base_index, runs) pairs with one tag_add call per style"""
+        ranges = {}
+        for base, runs in segments:
+            for start, length, style_id in iter_runs(runs):
+                ranges.setdefault(TEXT_STYLES[style_id], []).extend(
+                    (f"{base}+{start}c", f"{base}+{start + length}c"))
+        for tag, indices in ranges.items():
+            self.text.tag_add(tag, *indices)
     
     def clear(self):
         self.text.delete("1.0", "end")
 
 
+class PassageEditor(RichTextEditor):
+    """Whole reading passage in one text widget with a single shared toolbar
+
+    Each paragraph is stored as "title\nbody\n"; a pair of left-gravity marks
+    records where its title and body start, so paragraph boundaries survive
+    edits and converting to/from Paragraph lists is linear in the text size.
+    """
+
+    def __init__(self, parent, height=24):
+        super().__init__(parent, height=height)
+        self._marks = []  # [(title_mark, body_mark)] in document order
+        self._mark_counter = 0
+        self.text.tag_configure('para_title', font=('Arial', 13, 'bold'), foreground='#2c3e50',
+                                background='#eef5fb', spacing1=14)
+
+        tk.Button(self.toolbar, text="+ Paragraph", command=self.add_paragraph).pack(side=tk.LEFT, padx=(12, 2))
+        tk.Button(self.toolbar, text="Remove Paragraph", command=self.remove_paragraph).pack(side=tk.LEFT, padx=2)
+
+    def _new_marks(self):
+        self._mark_counter += 1
+        return f"para{self._mark_counter}_title", f"para{self._mark_counter}_body"
+
+    def _set_mark(self, name, index):
+        self.text.mark_set(name, index)
+        self.text.mark_gravity(name, tk.LEFT)
+
+    def clear(self):
+        super().clear()
+        for title_mark, body_mark in self._marks:
+            self.text.mark_unset(title_mark, body_mark)
+        self._marks = []
+
+    def set_paragraphs(self, paragraphs):
+        """Replace the document with the given paragraphs using one insert"""
+        self.clear()
+        chunks = []
+        title_ranges = []
+        line = 1
+        for paragraph in paragraphs:
+            # Every segment ends with a newline, so each one starts at column 0 of a known line
+            title_lines = paragraph.title.count('\n') + 1
+            body_lines = paragraph.body.count('\n') + 1
+            title_ranges.extend([f"{line}.0", f"{line + title_lines}.0"])
+            chunks.extend([paragraph.title, '\n', paragraph.body, '\n'])
+            line += title_lines + body_lines
+
+        self.text.insert('1.0', ''.join(chunks))
+        for start in range(0, len(title_ranges), 2):
+            title_mark, body_mark = self._new_marks()
+            self._set_mark(title_mark, title_ranges[start])
+            self._set_mark(body_mark, title_ranges[start + 1])
+            self._marks.append((title_mark, body_mark))
+        if title_ranges:
+            self.text.tag_add('para_title', *title_ranges)
+        self.apply_runs([(title_ranges[2 * i], p.title_runs) for i, p in enumerate(paragraphs)] +
+                        [(title_ranges[2 * i + 1], p.body_runs) for i, p in enumerate(paragraphs)])
+        self.text.edit_reset()
+
+    def get_paragraphs(self) -> list:
+        """Split the document back into Paragraph objects"""
+        content = self.text.get('1.0', 'end-1c')
+        line_starts = line_start_offsets(content)
+
+        # Text before the first paragraph mark (or in a passage without marks) becomes an
+        # untitled paragraph, so nothing typed is dropped
+        boundaries = [0, 0]
+        for title_mark, body_mark in self._marks:
+            boundaries.extend([index_to_offset(line_starts, self.text.index(title_mark)),
+                               index_to_offset(line_starts, self.text.index(body_mark))])
+        boundaries.append(len(content))
+
+        # (start, end) of every title and body without its trailing newline
+        segments = []
+        for i in range(len(boundaries) - 1):
+            start, end = boundaries[i], boundaries[i + 1]
+            if end > start and content[end - 1] == '\n':
+                end -= 1
+            segments.append((start, max(start, end)))
+        runs = split_runs(self.style_spans(content), segments)
+
+        paragraphs = []
+        for i in range(0, len(segments), 2):
+            (title_start, title_end), (body_start, body_end) = segments[i], segments[i + 1]
+            title = content[title_start:title_end]
+            body = content[body_start:body_end]
+            if (title or body) if i else body.strip():
+                paragraphs.append(Paragraph(title=title, body=body,
+                                            title_runs=runs[i], body_runs=runs[i + 1]))
+        return paragraphs
+
+    def add_paragraph(self, title: str = "", body: str = ""):
+        """Append a paragraph and put the cursor in its title"""
+        title_mark, body_mark = self._new_marks()
+        self._set_mark(title_mark, 'end-1c')
+        self.text.insert('end-1c', title + '\n', ('para_title',))
+        self._set_mark(body_mark, 'end-1c')
+        self.text.insert('end-1c', body + '\n')
+        self._marks.append((title_mark, body_mark))
+        self.text.mark_set('insert', f"{body_mark}-1c")
+        self.text.see('insert')
+        self.text.focus_set()
+
+    def paragraph_at(self, index='insert') -> Optional[int]:
+        """Index of the paragraph containing a text position (binary search over marks)"""
+        low, high = 0, len(self._marks)
+        while low < high:
+            middle = (low + high) // 2
+            if self.text.compare(self._marks[middle][0], '<=', index):
+                low = middle + 1
+            else:
+                high = middle
+        return low - 1 if low else None
+
+    def remove_paragraph(self, number: Optional[int] = None):
+        """Remove the paragraph at the cursor (or the given paragraph index)"""
+        if number is None:
+            number = self.paragraph_at()
+        if number is None or not 0 <= number < len(self._marks):
+            return
+        title_mark, body_mark = self._marks.pop(number)
+        end = self._marks[number][0] if number < len(self._marks) else 'end-1c'
+        self.text.delete(title_mark, end)
+        self.text.mark_unset(title_mark, body_mark)
+
+    def paragraph_count(self) -> int:
+        return len(self._marks)
+
+
 class ContentEditorWindow:
     """Main Content Editor Window"""
     
@@ -121,8 +303,46 @@ class ContentEditorWindow:
         self.current_package = ReadingPackage()
         self.current_package.package_id = str(uuid.uuid4())
         
+        # Dirty tracking: sections changed since the last successful save, and the
+        # last serialized dict of each section so clean sections are not re-serialized
+        self.current_filepath: Optional[str] = None
+        self.dirty_sections = set()
+        self._section_cache: Dict[str, object] = {}
+        self._save_thread: Optional[threading.Thread] = None
+        self._save_results = queue.Queue()
+        self._pending_save = None
+        self.autosave_interval_ms = AUTOSAVE_INTERVAL_MS
+        
         self.create_ui()
+        for editor in (self.explanation_editor, self.title_editor, self.passage_editor):
+            editor.text.bind('<<Modified>>', self._on_reading_modified, add='+')
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self._autosave_job = self.root.after(self.autosave_interval_ms, self._autosave)
+        self.watchdog = StallWatchdog(self.root, 'editor')
+        self.watchdog.start()
+    
+    def _on_reading_modified(self, event):
+        if event.widget.edit_modified():
+            event.widget.edit_modified(False)
+            self.mark_dirty('reading_content')
+    
+    def mark_dirty(self, section: str):
+        """Record that a package section changed since the last save"""
+        self.dirty_sections.add(section)
+        self._update_title()
     
+    def mark_clean(self):
+        for editor in (self.explanation_editor, self.title_editor, self.passage_editor):
+            editor.text.edit_modified(False)
+        self.dirty_sections.clear()
+        self._section_cache.clear()
+        self._update_title()
+    
+    def _update_title(self):
+        name = os.path.basename(self.current_filepath) if self.current_filepath else "Untitled"
+        self.root.title(f"IELTS Content Editor - {'*' if self.dirty_sections else ''}{name}")
+    
+    @traced()
     def create_ui(self):
         # Menu bar
         menubar = tk.Menu(self.root)
@@ -181,13 +401,12 @@ class ContentEditorWindow:
         self.title_editor = RichTextEditor(scrollable_frame, height=3)
         self.title_editor.pack(fill=tk.X, padx=10, pady=5)
         
-        # Paragraphs
-        tk.Label(scrollable_frame, text="Paragraphs:", font=('Arial', 12, 'bold')).pack(anchor=tk.W, padx=10, pady=5)
-        
-        self.paragraph_frame = tk.Frame(scrollable_frame)
-        self.paragraph_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        # Paragraphs: one document editor for the whole passage
+        tk.Label(scrollable_frame, text="Paragraphs (highlighted line = paragraph title):",
+                 font=('Arial', 12, 'bold')).pack(anchor=tk.W, padx=10, pady=5)
         
-        self.paragraph_editors = []
+        self.passage_editor = PassageEditor(scrollable_frame, height=24)
+        self.passage_editor.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
         # Add paragraph button
         tk.Button(scrollable_frame, text="Add Paragraph", command=self.add_paragraph).pack(pady=10)
@@ -200,46 +419,27 @@ class ContentEditorWindow:
         scrollbar.pack(side="right", fill="y")
     
     def add_paragraph(self):
-        """Add a new paragraph editor"""
-        para_container = tk.LabelFrame(self.paragraph_frame, text=f"Paragraph {len(self.paragraph_editors) + 1}")
-        para_container.pack(fill=tk.BOTH, expand=True, pady=5)
-        
-        tk.Label(para_container, text="Paragraph Title:").pack(anchor=tk.W, padx=5)
-        title_editor = RichTextEditor(para_container, height=2)
-        title_editor.pack(fill=tk.X, padx=5, pady=2)
-        
-        tk.Label(para_container, text="Paragraph Body:").pack(anchor=tk.W, padx=5)
-        body_editor = RichTextEditor(para_container, height=8)
-        body_editor.pack(fill=tk.X, padx=5, pady=2)
-        
-        # Remove button
-        tk.Button(para_container, text="Remove Paragraph", 
-                 command=lambda: self.remove_paragraph(para_container)).pack(pady=5)
-        
-        self.paragraph_editors.append({
-            'container': para_container,
-            'title': title_editor,
-            'body': body_editor
-        })
+        """Append a new paragraph to the passage"""
+        self.passage_editor.add_paragraph()
     
-    def remove_paragraph(self, container):
-        """Remove a paragraph editor"""
-        self.paragraph_editors = [p for p in self.paragraph_editors if p['container'] != container]
-        container.destroy()
+    def remove_paragraph(self, number=None):
+        """Remove the paragraph at the cursor"""
+        self.passage_editor.remove_paragraph(number)
     
-    def save_reading_content(self):
-        """Save reading content to current package"""
+    def collect_reading_content(self):
+        """Copy the reading editors into the current package"""
         reading_content = ReadingContent()
         reading_content.explanation = self.explanation_editor.get_text()
         reading_content.title = self.title_editor.get_text()
         
-        for para_editor in self.paragraph_editors:
-            paragraph = Paragraph()
-            paragraph.title = para_editor['title'].get_text()
-            paragraph.body = para_editor['body'].get_text()
-            reading_content.paragraphs.append(paragraph)
+        reading_content.paragraphs = self.passage_editor.get_paragraphs()
         
         self.current_package.reading_content = reading_content
+    
+    def save_reading_content(self):
+        """Save reading content to current package"""
+        self.collect_reading_content()
+        self.mark_dirty('reading_content')
         self.status_bar.config(text="Reading content saved")
         messagebox.showinfo("Success", "Reading content saved successfully!")
     
@@ -303,54 +503,65 @@ class ContentEditorWindow:
         additional_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         additional_widgets = {}
+        # Input panels are built once per question type and shown/hidden on type change,
+        # so switching back and forth keeps whatever the author already typed.
+        panel_pool = {}
         
         def update_additional_inputs(*args):
-            """Update additional input fields based on question type"""
-            # Clear existing widgets
-            for widget in additional_frame.winfo_children():
-                widget.destroy()
-            additional_widgets.clear()
+            """Show the additional input panel for the selected question type"""
+            nonlocal additional_widgets
+            for pooled_panel, _ in panel_pool.values():
+                pooled_panel.pack_forget()
             
             selected_type = type_var.get()
+            if selected_type in panel_pool:
+                panel, additional_widgets = panel_pool[selected_type]
+                panel.pack(fill=tk.BOTH, expand=True)
+                return
+            
+            panel = tk.Frame(additional_frame)
+            panel.pack(fill=tk.BOTH, expand=True)
+            additional_widgets = {}
+            panel_pool[selected_type] = (panel, additional_widgets)
             
             if selected_type == QuestionType.TYPE4.value:  # Matching information
-                tk.Label(additional_frame, text="List of Information (one per line):", 
+                tk.Label(panel, text="List of Information (one per line):", 
                         font=('Arial', 9)).pack(anchor=tk.W, pady=5)
-                info_text = scrolledtext.ScrolledText(additional_frame, height=6, width=70)
+                info_text = scrolledtext.ScrolledText(panel, height=6, width=70)
                 info_text.pack(fill=tk.X, pady=5)
                 info_text.insert("1.0", "A. First piece of information\nB. Second piece of information\nC. Third piece of information")
                 additional_widgets['infoList'] = info_text
                 
             elif selected_type == QuestionType.TYPE5.value:  # Matching headings
-                tk.Label(additional_frame, text="List of Headings (one per line):", 
+                tk.Label(panel, text="List of Headings (one per line):", 
                         font=('Arial', 9)).pack(anchor=tk.W, pady=5)
-                heading_text = scrolledtext.ScrolledText(additional_frame, height=6, width=70)
+                heading_text = scrolledtext.ScrolledText(panel, height=6, width=70)
                 heading_text.pack(fill=tk.X, pady=5)
                 heading_text.insert("1.0", "i. First heading\nii. Second heading\niii. Third heading")
                 additional_widgets['headingList'] = heading_text
                 
             elif selected_type == QuestionType.TYPE6.value:  # Matching features
-                tk.Label(additional_frame, text="List of Features (one per line):", 
+                tk.Label(panel, text="List of Features (one per line):", 
                         font=('Arial', 9)).pack(anchor=tk.W, pady=5)
-                feature_text = scrolledtext.ScrolledText(additional_frame, height=6, width=70)
+                feature_text = scrolledtext.ScrolledText(panel, height=6, width=70)
                 feature_text.pack(fill=tk.X, pady=5)
                 feature_text.insert("1.0", "A. Feature one\nB. Feature two\nC. Feature three")
                 additional_widgets['featureList'] = feature_text
                 
             elif selected_type == QuestionType.TYPE7.value:  # Matching sentence endings
-                tk.Label(additional_frame, text="List of Sentence Endings (one per line):", 
+                tk.Label(panel, text="List of Sentence Endings (one per line):", 
                         font=('Arial', 9)).pack(anchor=tk.W, pady=5)
-                ending_text = scrolledtext.ScrolledText(additional_frame, height=6, width=70)
+                ending_text = scrolledtext.ScrolledText(panel, height=6, width=70)
                 ending_text.pack(fill=tk.X, pady=5)
                 ending_text.insert("1.0", "A. ending one.\nB. ending two.\nC. ending three.")
                 additional_widgets['sentenceEndingList'] = ending_text
                 
             elif selected_type == QuestionType.TYPE9.value:  # Summary/table/flow-chart
-                tk.Label(additional_frame, text="Choose Input Type:", 
+                tk.Label(panel, text="Choose Input Type:", 
                         font=('Arial', 9, 'bold')).pack(anchor=tk.W, pady=5)
                 
                 input_type_var = tk.StringVar(value="Summary")
-                input_type_frame = tk.Frame(additional_frame)
+                input_type_frame = tk.Frame(panel)
                 input_type_frame.pack(anchor=tk.W, pady=5)
                 
                 tk.Radiobutton(input_type_frame, text="Summary/Note", variable=input_type_var, 
@@ -361,30 +572,42 @@ class ContentEditorWindow:
                               value="Flowchart").pack(side=tk.LEFT, padx=5)
                 
                 # Content frame that changes based on selection
-                content_frame = tk.Frame(additional_frame)
+                content_frame = tk.Frame(panel)
                 content_frame.pack(fill=tk.BOTH, expand=True, pady=5)
                 
+                mode_pool = {}
+                
                 def update_type9_input():
-                    for widget in content_frame.winfo_children():
-                        widget.destroy()
+                    for mode_frame, _ in mode_pool.values():
+                        mode_frame.pack_forget()
 
-                    # Remove stale references from previous Type 9 mode widgets
+                    # Only the visible mode is collected on save
                     for key in ('summaryData', 'tableData', 'flowchartData'):
                         additional_widgets.pop(key, None)
                     
                     input_type = input_type_var.get()
+                    if input_type in mode_pool:
+                        mode_frame, mode_widgets = mode_pool[input_type]
+                        mode_frame.pack(fill=tk.BOTH, expand=True)
+                        additional_widgets.update(mode_widgets)
+                        return
+                    
+                    mode_frame = tk.Frame(content_frame)
+                    mode_frame.pack(fill=tk.BOTH, expand=True)
+                    mode_widgets = {}
+                    mode_pool[input_type] = (mode_frame, mode_widgets)
                     
                     if input_type == "Summary":
-                        tk.Label(content_frame, text="Summary Text (use [1], [2], [3] for blanks):", 
+                        tk.Label(mode_frame, text="Summary Text (use [1], [2], [3] for blanks):", 
                                 font=('Arial', 9)).pack(anchor=tk.W)
-                        summary_text = scrolledtext.ScrolledText(content_frame, height=8, width=70)
+                        summary_text = scrolledtext.ScrolledText(mode_frame, height=8, width=70)
                         summary_text.pack(fill=tk.BOTH, pady=5)
                         summary_text.insert("1.0", "Enter your summary here. Use [1] for first blank, [2] for second blank, etc.\nExample: The bicycle was invented in [1] by [2].")
-                        additional_widgets['summaryData'] = summary_text
-                        additional_widgets['type9_mode'] = 'summary'
+                        mode_widgets['summaryData'] = summary_text
+                        mode_widgets['type9_mode'] = 'summary'
                     
                     elif input_type == "Table":
-                        table_builder_frame = tk.LabelFrame(content_frame, text="Table Builder", 
+                        table_builder_frame = tk.LabelFrame(mode_frame, text="Table Builder", 
                                                            font=('Arial', 9, 'bold'), padx=5, pady=5)
                         table_builder_frame.pack(fill=tk.BOTH, expand=True)
                         
@@ -394,16 +617,19 @@ class ContentEditorWindow:
                         
                         tk.Label(control_frame, text="Rows:").pack(side=tk.LEFT, padx=5)
                         rows_var = tk.StringVar(value="3")
-                        tk.Spinbox(control_frame, from_=2, to=10, textvariable=rows_var, width=5).pack(side=tk.LEFT)
+                        rows_spin = tk.Spinbox(control_frame, from_=2, to=10, textvariable=rows_var, width=5)
+                        rows_spin.pack(side=tk.LEFT)
                         
                         tk.Label(control_frame, text="Columns:").pack(side=tk.LEFT, padx=5)
                         cols_var = tk.StringVar(value="3")
-                        tk.Spinbox(control_frame, from_=2, to=6, textvariable=cols_var, width=5).pack(side=tk.LEFT)
+                        cols_spin = tk.Spinbox(control_frame, from_=2, to=6, textvariable=cols_var, width=5)
+                        cols_spin.pack(side=tk.LEFT)
                         
                         table_data = {
                             'rows': rows_var,
                             'cols': cols_var,
                             'cells': {},
+                            'shape': (0, 0),
                             'selected_cell': None,
                             'font_family': 'Arial',
                             'font_size': 12
@@ -468,49 +694,71 @@ class ContentEditorWindow:
                         tk.Label(style_frame, text="Tip: select text in a cell and press B/I", 
                                 font=('Arial', 8, 'italic')).pack(side=tk.LEFT, padx=10)
 
+                        def make_cell(r, c):
+                            cell_entry = tk.Text(
+                                table_display_frame,
+                                width=34,
+                                height=5,
+                                wrap=tk.WORD,
+                                font=(table_data['font_family'], table_data['font_size']),
+                                relief=tk.SOLID,
+                                bd=1,
+                                padx=7,
+                                pady=6,
+                                undo=True
+                            )
+                            cell_entry.grid(row=r, column=c, padx=4, pady=4, sticky='nsew')
+                            cell_entry.tag_configure('bold', font=(table_data['font_family'], table_data['font_size'], 'bold'))
+                            cell_entry.tag_configure('italic', font=(table_data['font_family'], table_data['font_size'], 'italic'))
+                            cell_entry.configure(highlightthickness=1, highlightbackground='#d0d0d0', highlightcolor='#d0d0d0')
+                            cell_entry.bind('<FocusIn>', lambda e, w=cell_entry: (set_selected_cell(w), clear_other_cell_highlights(w)))
+
+                            # Pre-fill header row
+                            if r == 0:
+                                cell_entry.insert("1.0", f"Header {c+1}")
+
+                            table_data['cells'][f"{r},{c}"] = cell_entry
+
+                        def drop_cell(r, c):
+                            cell_entry = table_data['cells'].pop(f"{r},{c}", None)
+                            if cell_entry is None:
+                                return
+                            if table_data['selected_cell'] is cell_entry:
+                                table_data['selected_cell'] = None
+                            cell_entry.destroy()
+
                         def create_table():
-                            # Clear existing table
-                            for widget in table_display_frame.winfo_children():
-                                widget.destroy()
+                            """Resize the grid, creating or destroying only the rows/columns that changed"""
+                            try:
+                                rows = int(rows_var.get())
+                                cols = int(cols_var.get())
+                            except ValueError:
+                                return
+                            old_rows, old_cols = table_data['shape']
 
-                            rows = int(rows_var.get())
-                            cols = int(cols_var.get())
-                            table_data['cells'] = {}
-                            table_data['selected_cell'] = None
+                            for r in range(rows, old_rows):
+                                for c in range(old_cols):
+                                    drop_cell(r, c)
+                                table_display_frame.rowconfigure(r, weight=0)
+                            for c in range(cols, old_cols):
+                                for r in range(min(rows, old_rows)):
+                                    drop_cell(r, c)
+                                table_display_frame.columnconfigure(c, weight=0)
 
-                            # Create table grid
                             for r in range(rows):
                                 for c in range(cols):
-                                    cell_entry = tk.Text(
-                                        table_display_frame,
-                                        width=34,
-                                        height=5,
-                                        wrap=tk.WORD,
-                                        font=(table_data['font_family'], table_data['font_size']),
-                                        relief=tk.SOLID,
-                                        bd=1,
-                                        padx=7,
-                                        pady=6,
-                                        undo=True
-                                    )
-                                    cell_entry.grid(row=r, column=c, padx=4, pady=4, sticky='nsew')
-                                    cell_entry.tag_configure('bold', font=(table_data['font_family'], table_data['font_size'], 'bold'))
-                                    cell_entry.tag_configure('italic', font=(table_data['font_family'], table_data['font_size'], 'italic'))
-                                    cell_entry.configure(highlightthickness=1, highlightbackground='#d0d0d0', highlightcolor='#d0d0d0')
-                                    cell_entry.bind('<FocusIn>', lambda e, w=cell_entry: (set_selected_cell(w), clear_other_cell_highlights(w)))
-
-                                    # Pre-fill header row
-                                    if r == 0:
-                                        cell_entry.insert("1.0", f"Header {c+1}")
-
-                                    table_data['cells'][f"{r},{c}"] = cell_entry
+                                    if r >= old_rows or c >= old_cols:
+                                        make_cell(r, c)
 
                             # Configure weights for easier expansion and editing
-                            for r in range(rows):
+                            for r in range(old_rows, rows):
                                 table_display_frame.rowconfigure(r, weight=1)
-                            for c in range(cols):
+                            for c in range(old_cols, cols):
                                 table_display_frame.columnconfigure(c, weight=1)
+                            table_data['shape'] = (rows, cols)
 
+                        rows_spin.configure(command=create_table)
+                        cols_spin.configure(command=create_table)
                         tk.Button(control_frame, text="Create Table", command=create_table,
                                  bg='#3498db', fg='white').pack(side=tk.LEFT, padx=10)
 
@@ -552,11 +800,11 @@ class ContentEditorWindow:
                         create_table()
                         table_builder_frame.after_idle(sync_table_canvas_width)
 
-                        additional_widgets['tableData'] = table_data
-                        additional_widgets['type9_mode'] = 'table'
+                        mode_widgets['tableData'] = table_data
+                        mode_widgets['type9_mode'] = 'table'
                     
                     else:  # Flowchart
-                        flowchart_frame = tk.LabelFrame(content_frame, text="Flow-chart Builder",
+                        flowchart_frame = tk.LabelFrame(mode_frame, text="Flow-chart Builder",
                                                        font=('Arial', 9, 'bold'), padx=5, pady=5)
                         flowchart_frame.pack(fill=tk.BOTH, expand=True)
                         
@@ -615,8 +863,10 @@ Step 3: Final outcome
                                      command=lambda s=symbol: insert_symbol(s),
                                      width=8).pack(side=tk.LEFT, padx=2)
                         
-                        additional_widgets['flowchartData'] = flowchart_text
-                        additional_widgets['type9_mode'] = 'flowchart'
+                        mode_widgets['flowchartData'] = flowchart_text
+                        mode_widgets['type9_mode'] = 'flowchart'
+                    
+                    additional_widgets.update(mode_widgets)
                 
                 # Bind radio buttons
                 for widget in input_type_frame.winfo_children():
@@ -627,21 +877,21 @@ Step 3: Final outcome
                 update_type9_input()  # Initialize
                 
             elif selected_type == QuestionType.TYPE10.value:  # Diagram label completion
-                tk.Label(additional_frame, text="Diagram/Picture Input:", 
+                tk.Label(panel, text="Diagram/Picture Input:", 
                         font=('Arial', 9, 'bold')).pack(anchor=tk.W, pady=5)
 
                 helper_label = tk.Label(
-                    additional_frame,
+                    panel,
                     text="Use image path, text description, or open Diagram Painter to build a diagram.",
                     font=('Arial', 8, 'italic'),
                     fg='#555555'
                 )
                 helper_label.pack(anchor=tk.W)
 
-                controls = tk.Frame(additional_frame)
+                controls = tk.Frame(panel)
                 controls.pack(fill=tk.X, pady=5)
 
-                diagram_text = scrolledtext.ScrolledText(additional_frame, height=5, width=70)
+                diagram_text = scrolledtext.ScrolledText(panel, height=5, width=70)
                 diagram_text.pack(fill=tk.X, pady=5)
                 diagram_text.insert("1.0", "Enter diagram description or image file path")
 
@@ -661,35 +911,111 @@ Step 3: Final outcome
                     painter.minsize(860, 560)
 
                     painter_data = {
-                        'elements': [],
+                        'document': DiagramDocument(),
+                        'items': {},
                         'active_tool': tk.StringVar(value='pen'),
                         'line_color': '#000000',
                         'line_width': tk.IntVar(value=2),
-                        'current_points': [],
+                        'stroke': StrokeBuilder(),
+                        'selected': None,
                         'background_path': None,
                         'bg_photo': None
                     }
+                    document = painter_data['document']
+                    items = painter_data['items']
+
+                    # Reopen an existing painter diagram for editing
+                    try:
+                        existing = parse_diagram_payload(diagram_text.get('1.0', 'end'))
+                    except (json.JSONDecodeError, TypeError, ValueError):
+                        existing = None
+                    if existing:
+                        painter_data['document'] = document = DiagramDocument(existing.get('elements', []))
+                        painter_data['background_path'] = existing.get('background_path')
 
                     toolbar = tk.Frame(painter)
                     toolbar.pack(fill=tk.X, padx=6, pady=6)
 
                     tk.Label(toolbar, text='Tool:', font=('Arial', 9, 'bold')).pack(side=tk.LEFT, padx=(0, 4))
-                    for tool in ['pen', 'line', 'rect', 'text']:
-                        tk.Radiobutton(toolbar, text=tool.title(), value=tool, variable=painter_data['active_tool']).pack(side=tk.LEFT, padx=2)
+                    for tool in ['pen', 'line', 'rect', 'text', 'eraser', 'select']:
+                        tk.Radiobutton(toolbar, text=tool.title(), value=tool, variable=painter_data['active_tool'],
+                                       command=lambda: set_selected(None)).pack(side=tk.LEFT, padx=2)
 
                     tk.Label(toolbar, text='Width:').pack(side=tk.LEFT, padx=(10, 2))
                     tk.Spinbox(toolbar, from_=1, to=8, textvariable=painter_data['line_width'], width=4).pack(side=tk.LEFT)
 
+                    def draw(element_id, restack=False):
+                        item = draw_element(canvas, document.get(element_id), tags='element')
+                        if item is None:
+                            return
+                        items[element_id] = item
+                        if restack:
+                            above = document.next_above(element_id)
+                            if above in items:
+                                canvas.tag_lower(item, items[above])
+
+                    def undraw(element_id):
+                        item = items.pop(element_id, None)
+                        if item is not None:
+                            canvas.delete(item)
+
+                    def redraw_all():
+                        canvas.delete('element')
+                        items.clear()
+                        for element_id in document.ids():
+                            draw(element_id)
+
+                    def sync(command):
+                        """Bring the canvas in line with the document after an undo/redo"""
+                        set_selected(None)
+                        if command is None:
+                            return
+                        if len(command.entries) > 50:
+                            redraw_all()
+                            return
+                        for element_id in command.element_ids:
+                            undraw(element_id)
+                            if element_id in document:
+                                draw(element_id, restack=True)
+
+                    def set_selected(element_id):
+                        painter_data['selected'] = element_id
+                        canvas.delete('selection')
+                        if element_id is not None and element_id in items:
+                            x0, y0, x1, y1 = element_bbox(document.get(element_id))
+                            canvas.create_rectangle(x0 - 3, y0 - 3, x1 + 3, y1 + 3, outline='#3498db',
+                                                    dash=(4, 2), tags='selection')
+
+                    def show_background():
+                        canvas.delete('bg_image')
+                        if not painter_data['background_path']:
+                            return
+                        try:
+                            img = tk.PhotoImage(file=painter_data['background_path'])
+                        except tk.TclError:
+                            painter_data['background_path'] = None
+                            return
+                        painter_data['bg_photo'] = img
+                        canvas.create_image(0, 0, image=img, anchor='nw', tags='bg_image')
+                        canvas.tag_lower('bg_image')
+
                     def clear_canvas():
-                        canvas.delete('all')
-                        painter_data['elements'].clear()
-                        if painter_data['background_path']:
-                            try:
-                                img = tk.PhotoImage(file=painter_data['background_path'])
-                                painter_data['bg_photo'] = img
-                                canvas.create_image(0, 0, image=img, anchor='nw', tags='bg_image')
-                            except tk.TclError:
-                                painter_data['background_path'] = None
+                        sync(document.clear())
+
+                    def undo(event=None):
+                        sync(document.undo())
+                        return 'break'
+
+                    def redo(event=None):
+                        sync(document.redo())
+                        return 'break'
+
+                    def delete_selected(event=None):
+                        if painter_data['selected'] is not None:
+                            selected = painter_data['selected']
+                            document.remove([selected])
+                            undraw(selected)
+                            set_selected(None)
 
                     def load_background():
                         image_path = filedialog.askopenfilename(
@@ -699,37 +1025,54 @@ Step 3: Final outcome
                         if not image_path:
                             return
                         try:
-                            img = tk.PhotoImage(file=image_path)
+                            tk.PhotoImage(file=image_path)
                         except tk.TclError:
                             messagebox.showerror('Error', 'Unable to load selected image')
                             return
                         painter_data['background_path'] = image_path
-                        painter_data['bg_photo'] = img
-                        clear_canvas()
+                        show_background()
 
                     tk.Button(toolbar, text='Load Background', command=load_background).pack(side=tk.LEFT, padx=6)
+                    tk.Button(toolbar, text='Undo', command=undo).pack(side=tk.LEFT, padx=2)
+                    tk.Button(toolbar, text='Redo', command=redo).pack(side=tk.LEFT, padx=2)
                     tk.Button(toolbar, text='Clear', command=clear_canvas).pack(side=tk.LEFT, padx=4)
 
                     canvas = tk.Canvas(painter, bg='white', relief=tk.SOLID, bd=1)
                     canvas.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+                    show_background()
+                    redraw_all()
+
+                    def erase_at(x, y):
+                        element_id = document.hit_test(x, y, tolerance=painter_data['line_width'].get() + 3)
+                        if element_id is not None:
+                            document.remove([element_id])
+                            undraw(element_id)
 
                     def on_press(event):
                         tool = painter_data['active_tool'].get()
                         if tool == 'text':
                             text_value = simpledialog.askstring('Add Text', 'Enter text for diagram:', parent=painter)
                             if text_value:
-                                canvas.create_text(event.x, event.y, text=text_value, anchor='nw', font=('Arial', 12))
-                                painter_data['elements'].append({'kind': 'text', 'x': event.x, 'y': event.y, 'text': text_value})
+                                draw(document.add({'kind': 'text', 'x': event.x, 'y': event.y, 'text': text_value}))
+                            return
+                        if tool == 'eraser':
+                            erase_at(event.x, event.y)
+                            return
+                        if tool == 'select':
+                            set_selected(document.hit_test(event.x, event.y))
+                            painter_data['drag_from'] = (event.x, event.y)
+                            painter_data['drag_offset'] = (0, 0)
                             return
 
                         painter_data['start_x'] = event.x
                         painter_data['start_y'] = event.y
                         if tool == 'pen':
-                            painter_data['current_points'] = [(event.x, event.y)]
+                            # Draw the stroke as short preview segments; one smoothed line replaces them on release
+                            painter_data['stroke'].start(event.x, event.y)
                             painter_data['temp_item'] = canvas.create_line(event.x, event.y, event.x + 1, event.y + 1,
                                                                            fill=painter_data['line_color'],
                                                                            width=painter_data['line_width'].get(),
-                                                                           smooth=True)
+                                                                           capstyle=tk.ROUND, tags='stroke_preview')
                         elif tool == 'line':
                             painter_data['temp_item'] = canvas.create_line(
                                 event.x, event.y, event.x, event.y,
@@ -745,50 +1088,69 @@ Step 3: Final outcome
 
                     def on_drag(event):
                         tool = painter_data['active_tool'].get()
+                        if tool == 'eraser':
+                            erase_at(event.x, event.y)
+                            return
+                        if tool == 'select':
+                            selected = painter_data['selected']
+                            if selected is None or selected not in items:
+                                return
+                            from_x, from_y = painter_data['drag_from']
+                            dx, dy = event.x - from_x, event.y - from_y
+                            canvas.move(items[selected], dx, dy)
+                            canvas.move('selection', dx, dy)
+                            off_x, off_y = painter_data['drag_offset']
+                            painter_data['drag_offset'] = (off_x + dx, off_y + dy)
+                            painter_data['drag_from'] = (event.x, event.y)
+                            return
+
                         temp_item = painter_data.get('temp_item')
                         if not temp_item:
                             return
                         if tool == 'pen':
-                            pts = painter_data['current_points']
-                            pts.append((event.x, event.y))
-                            flat = [c for point in pts for c in point]
-                            canvas.coords(temp_item, *flat)
+                            segment = painter_data['stroke'].add(event.x, event.y)
+                            if segment:
+                                canvas.create_line(*segment, fill=painter_data['line_color'],
+                                                   width=painter_data['line_width'].get(),
+                                                   capstyle=tk.ROUND, tags='stroke_preview')
                         else:
                             canvas.coords(temp_item, painter_data['start_x'], painter_data['start_y'], event.x, event.y)
 
                     def on_release(event):
                         tool = painter_data['active_tool'].get()
+                        if tool == 'select':
+                            selected = painter_data['selected']
+                            if selected is not None:
+                                document.move([selected], *painter_data['drag_offset'])
+                                painter_data['drag_offset'] = (0, 0)
+                            return
+
                         temp_item = painter_data.get('temp_item')
                         if not temp_item:
                             return
+                        style = {'color': painter_data['line_color'], 'width': painter_data['line_width'].get()}
+                        element = None
                         if tool == 'pen':
-                            points = painter_data.get('current_points', [])
+                            points = painter_data['stroke'].finish(event.x, event.y)
+                            canvas.delete('stroke_preview')
                             if len(points) > 1:
-                                painter_data['elements'].append({
-                                    'kind': 'pen',
-                                    'points': points,
-                                    'color': painter_data['line_color'],
-                                    'width': painter_data['line_width'].get()
-                                })
-                        elif tool == 'line':
-                            painter_data['elements'].append({
-                                'kind': 'line',
-                                'coords': [painter_data['start_x'], painter_data['start_y'], event.x, event.y],
-                                'color': painter_data['line_color'],
-                                'width': painter_data['line_width'].get()
-                            })
-                        elif tool == 'rect':
-                            painter_data['elements'].append({
-                                'kind': 'rect',
-                                'coords': [painter_data['start_x'], painter_data['start_y'], event.x, event.y],
-                                'color': painter_data['line_color'],
-                                'width': painter_data['line_width'].get()
-                            })
+                                element = {'kind': 'pen', 'points': points, **style}
+                        else:
+                            canvas.delete(temp_item)
+                            if tool in ('line', 'rect'):
+                                coords = [painter_data['start_x'], painter_data['start_y'], event.x, event.y]
+                                element = {'kind': tool, 'coords': coords, **style}
+                        if element is not None:
+                            draw(document.add(element))
                         painter_data['temp_item'] = None
 
                     canvas.bind('<ButtonPress-1>', on_press)
                     canvas.bind('<B1-Motion>', on_drag)
                     canvas.bind('<ButtonRelease-1>', on_release)
+                    painter.bind('<Control-z>', undo)
+                    painter.bind('<Control-y>', redo)
+                    painter.bind('<Control-Z>', redo)
+                    painter.bind('<Delete>', delete_selected)
 
                     def save_to_diagram_input():
                         payload = {
@@ -796,10 +1158,10 @@ Step 3: Final outcome
                             'width': max(800, canvas.winfo_width()),
                             'height': max(500, canvas.winfo_height()),
                             'background_path': painter_data['background_path'],
-                            'elements': painter_data['elements']
+                            'elements': document.elements()
                         }
                         diagram_text.delete('1.0', 'end')
-                        diagram_text.insert('1.0', '__DIAGRAM_EDITOR__' + json.dumps(payload))
+                        diagram_text.insert('1.0', encode_diagram_payload(payload))
                         painter.destroy()
 
                     tk.Button(painter, text='Use This Diagram', command=save_to_diagram_input,
@@ -811,7 +1173,7 @@ Step 3: Final outcome
 
                 additional_widgets['diagramImage'] = diagram_text
             else:
-                tk.Label(additional_frame, text="No additional inputs required for this question type.", 
+                tk.Label(panel, text="No additional inputs required for this question type.", 
                         font=('Arial', 9, 'italic'), fg='gray').pack(pady=10)
         
         # Bind the update function to type change
@@ -999,6 +1361,7 @@ Step 3: Final outcome
                 return
             
             self.current_package.question_groups.append(qg)
+            self.mark_dirty('question_groups')
             self.status_bar.config(text=f"Question group added. Total groups: {len(self.current_package.question_groups)}")
             messagebox.showinfo("Success", f"Question group added successfully!\nTotal questions: {len(qg.questions)}")
             dialog.destroy()
@@ -1046,14 +1409,17 @@ Step 3: Final outcome
             # Clear editors
             self.explanation_editor.clear()
             self.title_editor.clear()
-            for para in self.paragraph_editors:
-                para['container'].destroy()
-            self.paragraph_editors = []
+            self.passage_editor.clear()
             
+            self.current_filepath = None
+            self.mark_clean()
             self.status_bar.config(text="New package created")
     
     def save_package(self):
         """Save package to file"""
+        # An explicit save always re-collects the editors rather than trusting the dirty flags
+        self.dirty_sections.add('reading_content')
+        self.collect_reading_content()
         if not self.current_package.reading_content.title:
             messagebox.showerror("Error", "Please add reading content first")
             return
@@ -1062,18 +1428,121 @@ Step 3: Final outcome
             messagebox.showerror("Error", "Please add at least one question group")
             return
         
+        errors = [issue for issue in validate_package(self.current_package) if issue.severity == 'error']
+        if errors:
+            details = "\n".join(
+                f"- {'Group ' + str(issue.group) + ': ' if issue.group else ''}{issue.message}"
+                for issue in errors[:10]
+            )
+            if not messagebox.askyesno("Validation", f"The package has {len(errors)} problem(s):\n\n"
+                                                     f"{details}\n\nSave anyway?"):
+                return
+        
         filepath = filedialog.asksaveasfilename(
             defaultextension=".json",
             filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
         )
         
         if filepath:
-            try:
-                self.current_package.save_to_file(filepath)
-                self.status_bar.config(text=f"Package saved: {filepath}")
+            self.start_save(filepath)
+    
+    def package_snapshot(self) -> Dict:
+        """Package dict for saving; only sections that changed are serialized again"""
+        if 'reading_content' in self.dirty_sections:
+            self.collect_reading_content()
+        package = self.current_package
+        serializers = {
+            'reading_content': lambda: package.reading_content.to_dict(),
+            'question_groups': lambda: [qg.to_dict() for qg in package.question_groups],
+        }
+        for section, serialize in serializers.items():
+            if section in self.dirty_sections or section not in self._section_cache:
+                self._section_cache[section] = serialize()
+        return {
+            'package_id': package.package_id,
+            'reading_content': self._section_cache['reading_content'],
+            'question_groups': self._section_cache['question_groups'],
+            'created_at': package.created_at.isoformat()
+        }
+    
+    def start_save(self, filepath: str, autosave: bool = False):
+        """Snapshot on the Tk thread, then encode and write atomically on a worker thread"""
+        if self._save_thread is not None:
+            self._pending_save = (filepath, autosave)
+            return
+        data = self.package_snapshot()
+        sections = set(self.dirty_sections)
+        self.dirty_sections.clear()
+        self._update_title()
+        self.status_bar.config(text="Autosaving..." if autosave else f"Saving {filepath}...")
+        self._save_thread = threading.Thread(target=self._save_worker,
+                                             args=(data, filepath, sections, autosave), daemon=True)
+        self._save_thread.start()
+        self.root.after(SAVE_POLL_MS, self._poll_save)
+    
+    def _save_worker(self, data, filepath, sections, autosave):
+        try:
+            write_package_data(data, filepath)
+            error = None
+        except Exception as e:
+            error = e
+        self._save_results.put((filepath, sections, autosave, error))
+    
+    def _poll_save(self):
+        if self._save_thread is None:  # on_close already finished the save
+            return
+        try:
+            result = self._save_results.get_nowait()
+        except queue.Empty:
+            self.root.after(SAVE_POLL_MS, self._poll_save)
+            return
+        self._finish_save(*result)
+    
+    def _finish_save(self, filepath, sections, autosave, error, notify: bool = True):
+        """Apply a finished save to the editor state; starts a save queued meanwhile"""
+        self._save_thread = None
+        
+        if error is not None:
+            self.dirty_sections |= sections
+            self._update_title()
+            self.status_bar.config(text=f"Save failed: {error}")
+            if notify and not autosave:
+                messagebox.showerror("Error", f"Failed to save package:\n{str(error)}")
+        else:
+            self.current_filepath = filepath
+            self._update_title()
+            stamp = datetime.now().strftime('%H:%M:%S')
+            self.status_bar.config(text=f"{'Autosaved' if autosave else 'Package saved'} {stamp}: {filepath}")
+            if notify and not autosave:
                 messagebox.showinfo("Success", f"Package saved successfully to:\n{filepath}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save package:\n{str(e)}")
+        
+        if self._pending_save:
+            filepath, autosave = self._pending_save
+            self._pending_save = None
+            if not autosave or self.dirty_sections:
+                self.start_save(filepath, autosave)
+    
+    def _autosave(self):
+        """Periodic autosave to the last saved file; nothing is written while clean"""
+        if self.current_filepath and self.dirty_sections and self._save_thread is None:
+            self.start_save(self.current_filepath, autosave=True)
+        self._autosave_job = self.root.after(self.autosave_interval_ms, self._autosave)
+    
+    def on_close(self):
+        """Let in-flight (and queued) saves finish before the window goes away"""
+        unsaved = False
+        deadline = time.monotonic() + 10
+        while self._save_thread is not None:
+            self._save_thread.join(timeout=max(0.0, deadline - time.monotonic()))
+            if self._save_thread.is_alive():  # still writing after the timeout; _poll_save takes it
+                unsaved = True
+                break
+            self._finish_save(*self._save_results.get(), notify=False)
+        if (unsaved or self.dirty_sections) and not messagebox.askyesno(
+                "Unsaved Changes", "The package has unsaved changes. Close anyway?", parent=self.root):
+            return
+        self.root.after_cancel(self._autosave_job)
+        self.root.destroy()
     
     def open_package(self):
         """Open existing package"""
@@ -1089,17 +1558,11 @@ Step 3: Final outcome
                 self.explanation_editor.set_text(self.current_package.reading_content.explanation)
                 self.title_editor.set_text(self.current_package.reading_content.title)
                 
-                # Clear existing paragraphs
-                for para in self.paragraph_editors:
-                    para['container'].destroy()
-                self.paragraph_editors = []
-                
-                # Load paragraphs
-                for para in self.current_package.reading_content.paragraphs:
-                    self.add_paragraph()
-                    self.paragraph_editors[-1]['title'].set_text(para.title)
-                    self.paragraph_editors[-1]['body'].set_text(para.body)
+                # Load paragraphs into the passage document
+                self.passage_editor.set_paragraphs(self.current_package.reading_content.paragraphs)
                 
+                self.current_filepath = filepath
+                self.mark_clean()
                 self.status_bar.config(text=f"Package loaded: {filepath}")
                 messagebox.showinfo("Success", "Package loaded successfully!")
             except Exception as e:
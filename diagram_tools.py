@@ -0,0 +1,386 @@
+"""
+Diagram Tools
+Tkinter-free geometry helpers for the diagram painter and diagram renderer
+"""
+import json
+import math
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+
+Point = Tuple[float, float]
+
+
+def flatten_points(points: Sequence[Sequence[float]]) -> List[float]:
+    """[(x, y), ...] -> [x, y, ...] as expected by Canvas.create_line"""
+    return [coord for point in points for coord in point]
+
+
+def _segment_distance(point: Point, start: Point, end: Point) -> float:
+    """Distance from point to the segment start-end"""
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    if dx == 0 and dy == 0:
+        return math.hypot(point[0] - start[0], point[1] - start[1])
+    t = ((point[0] - start[0]) * dx + (point[1] - start[1]) * dy) / (dx * dx + dy * dy)
+    t = max(0.0, min(1.0, t))
+    return math.hypot(point[0] - (start[0] + t * dx), point[1] - (start[1] + t * dy))
+
+
+def simplify_points(points: Sequence[Point], tolerance: float) -> List[Point]:
+    """Ramer-Douglas-Peucker simplification using an explicit stack"""
+    if len(points) < 3 or tolerance <= 0:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        worst_index = None
+        worst_distance = tolerance
+        for index in range(first + 1, last):
+            distance = _segment_distance(points[index], points[first], points[last])
+            if distance > worst_distance:
+                worst_index = index
+                worst_distance = distance
+        if worst_index is not None:
+            keep[worst_index] = True
+            stack.append((first, worst_index))
+            stack.append((worst_index, last))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+class StrokeBuilder:
+    """Collects a freehand stroke one motion event at a time
+
+    add() drops samples closer than min_distance to the last kept point and
+    returns only the new segment, so the caller draws O(1) per event instead of
+    re-sending the whole polyline. finish() simplifies the stroke for the one
+    smoothed item that is committed on release.
+    """
+
+    def __init__(self, min_distance: float = 2.0, tolerance: float = 0.75):
+        self.min_distance = min_distance
+        self.tolerance = tolerance
+        self._points: List[Point] = []
+        self._pending: Optional[Point] = None
+
+    @property
+    def points(self) -> List[Point]:
+        return self._points
+
+    def start(self, x: float, y: float):
+        self._points = [(x, y)]
+        self._pending = None
+
+    def add(self, x: float, y: float) -> Optional[Tuple[float, float, float, float]]:
+        """Record a motion sample; return (x0, y0, x1, y1) when a segment should be drawn"""
+        if not self._points:
+            self.start(x, y)
+            return None
+        last_x, last_y = self._points[-1]
+        if math.hypot(x - last_x, y - last_y) < self.min_distance:
+            self._pending = (x, y)
+            return None
+        self._points.append((x, y))
+        self._pending = None
+        return last_x, last_y, x, y
+
+    def finish(self, x: Optional[float] = None, y: Optional[float] = None) -> List[Point]:
+        """Close the stroke at the release point and return its simplified points"""
+        end = (x, y) if x is not None and y is not None else self._pending
+        if end is not None and self._points and end != self._points[-1]:
+            self._points.append(end)
+        self._pending = None
+        points = simplify_points(self._points, self.tolerance)
+        self._points = []
+        return points
+
+
+# ---------------------------------------------------------------------------
+# Element model shared by the painter and the exam renderer
+#
+# Elements stay plain JSON dicts so saved payloads are unchanged:
+#   {'kind': 'pen',  'points': [[x, y], ...], 'color': ..., 'width': ...}
+#   {'kind': 'line', 'coords': [x0, y0, x1, y1], 'color': ..., 'width': ...}
+#   {'kind': 'rect', 'coords': [x0, y0, x1, y1], 'color': ..., 'width': ...}
+#   {'kind': 'text', 'x': x, 'y': y, 'text': ...}
+# ---------------------------------------------------------------------------
+
+DIAGRAM_EDITOR_PREFIX = '__DIAGRAM_EDITOR__'
+DIAGRAM_FONT = ('Arial', 12)
+TEXT_CHAR_WIDTH = 8
+TEXT_LINE_HEIGHT = 18
+
+BBox = Tuple[float, float, float, float]
+
+
+def parse_diagram_payload(value: str) -> Optional[Dict]:
+    """Decode a '__DIAGRAM_EDITOR__{json}' field value, or None for plain values"""
+    value = str(value).strip()
+    if not value.startswith(DIAGRAM_EDITOR_PREFIX):
+        return None
+    return json.loads(value[len(DIAGRAM_EDITOR_PREFIX):])
+
+
+def encode_diagram_payload(payload: Dict) -> str:
+    return DIAGRAM_EDITOR_PREFIX + json.dumps(payload)
+
+
+def element_bbox(element: Dict) -> BBox:
+    """Bounding box of an element, widened by half its stroke width"""
+    kind = element.get('kind')
+    if kind == 'text':
+        lines = str(element.get('text', '')).split('\n')
+        x, y = element.get('x', 0), element.get('y', 0)
+        return (x, y, x + max(len(line) for line in lines) * TEXT_CHAR_WIDTH, y + len(lines) * TEXT_LINE_HEIGHT)
+    if kind == 'pen':
+        xs = [point[0] for point in element.get('points', [])] or [0]
+        ys = [point[1] for point in element.get('points', [])] or [0]
+        x0, y0, x1, y1 = min(xs), min(ys), max(xs), max(ys)
+    else:
+        coords = element.get('coords', [0, 0, 0, 0])
+        x0, x1 = sorted((coords[0], coords[2]))
+        y0, y1 = sorted((coords[1], coords[3]))
+    pad = element.get('width', 2) / 2
+    return (x0 - pad, y0 - pad, x1 + pad, y1 + pad)
+
+
+def element_distance(element: Dict, x: float, y: float) -> float:
+    """Distance from (x, y) to the drawn outline of an element (0 inside text)"""
+    kind = element.get('kind')
+    point = (x, y)
+    if kind == 'text':
+        x0, y0, x1, y1 = element_bbox(element)
+        return 0.0 if x0 <= x <= x1 and y0 <= y <= y1 else math.inf
+    if kind == 'pen':
+        points = [tuple(p) for p in element.get('points', [])]
+        if len(points) == 1:
+            return math.hypot(x - points[0][0], y - points[0][1])
+        return min((_segment_distance(point, a, b) for a, b in zip(points, points[1:])), default=math.inf)
+    x0, y0, x1, y1 = element.get('coords', [0, 0, 0, 0])
+    if kind == 'line':
+        return _segment_distance(point, (x0, y0), (x1, y1))
+    corners = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+    return min(_segment_distance(point, a, b) for a, b in zip(corners, corners[1:] + corners[:1]))
+
+
+def move_element(element: Dict, dx: float, dy: float):
+    """Translate an element in place"""
+    kind = element.get('kind')
+    if kind == 'text':
+        element['x'] = element.get('x', 0) + dx
+        element['y'] = element.get('y', 0) + dy
+    elif kind == 'pen':
+        element['points'] = [[p[0] + dx, p[1] + dy] for p in element.get('points', [])]
+    else:
+        x0, y0, x1, y1 = element.get('coords', [0, 0, 0, 0])
+        element['coords'] = [x0 + dx, y0 + dy, x1 + dx, y1 + dy]
+
+
+def draw_element(canvas, element: Dict, **options) -> Optional[int]:
+    """Create the canvas item for an element; extra options (e.g. tags) are passed through"""
+    kind = element.get('kind')
+    color = element.get('color', '#000000')
+    width = element.get('width', 2)
+    if kind == 'text':
+        return canvas.create_text(element.get('x', 0), element.get('y', 0), text=element.get('text', ''),
+                                  anchor='nw', font=DIAGRAM_FONT, fill=element.get('color', '#000000'),
+                                  **options)
+    if kind == 'pen':
+        points = element.get('points', [])
+        if len(points) < 2:
+            return None
+        return canvas.create_line(*flatten_points(points), fill=color, width=width,
+                                  capstyle='round', smooth=True, **options)
+    if kind == 'line':
+        return canvas.create_line(*element.get('coords', [0, 0, 0, 0]), fill=color, width=width, **options)
+    if kind == 'rect':
+        return canvas.create_rectangle(*element.get('coords', [0, 0, 0, 0]), outline=color, width=width,
+                                       **options)
+    return None
+
+
+class SpatialGrid:
+    """Uniform grid over bounding boxes; queries only touch the cells they overlap"""
+
+    def __init__(self, cell_size: int = 64):
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._boxes: Dict[int, BBox] = {}
+
+    def _cell_range(self, bbox: BBox):
+        size = self.cell_size
+        x0, y0, x1, y1 = bbox
+        for cx in range(int(x0 // size), int(x1 // size) + 1):
+            for cy in range(int(y0 // size), int(y1 // size) + 1):
+                yield cx, cy
+
+    def insert(self, key: int, bbox: BBox):
+        if key in self._boxes:
+            self.remove(key)
+        self._boxes[key] = bbox
+        for cell in self._cell_range(bbox):
+            self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key: int):
+        bbox = self._boxes.pop(key, None)
+        if bbox is None:
+            return
+        for cell in self._cell_range(bbox):
+            members = self._cells.get(cell)
+            if members:
+                members.discard(key)
+                if not members:
+                    del self._cells[cell]
+
+    def query(self, bbox: BBox) -> Set[int]:
+        """Keys whose bounding box intersects bbox"""
+        x0, y0, x1, y1 = bbox
+        found = set()
+        for cell in self._cell_range(bbox):
+            for key in self._cells.get(cell, ()):
+                bx0, by0, bx1, by1 = self._boxes[key]
+                if bx0 <= x1 and x0 <= bx1 and by0 <= y1 and y0 <= by1:
+                    found.add(key)
+        return found
+
+    def query_point(self, x: float, y: float, radius: float = 0.0) -> Set[int]:
+        return self.query((x - radius, y - radius, x + radius, y + radius))
+
+    def __len__(self):
+        return len(self._boxes)
+
+
+class DiagramCommand:
+    """One undoable edit: elements added, removed or moved by (dx, dy)"""
+    __slots__ = ('kind', 'entries', 'dx', 'dy')
+
+    def __init__(self, kind: str, entries: List[Tuple[int, int, Dict]], dx: float = 0, dy: float = 0):
+        self.kind = kind
+        self.entries = entries
+        self.dx = dx
+        self.dy = dy
+
+    @property
+    def element_ids(self) -> List[int]:
+        return [entry[0] for entry in self.entries]
+
+
+class DiagramDocument:
+    """Diagram elements in drawing order with a spatial index and a command log for undo/redo"""
+
+    def __init__(self, elements: Sequence[Dict] = (), cell_size: int = 64):
+        self._elements: Dict[int, Dict] = {}
+        self._z: Dict[int, int] = {}
+        self._next_id = 1
+        self.grid = SpatialGrid(cell_size)
+        self.undo_stack: List[DiagramCommand] = []
+        self.redo_stack: List[DiagramCommand] = []
+        for element in elements:
+            element_id = self._allocate()
+            self._insert(element_id, element_id, dict(element))
+
+    def _allocate(self) -> int:
+        element_id = self._next_id
+        self._next_id += 1
+        return element_id
+
+    def _insert(self, element_id: int, z: int, element: Dict):
+        self._elements[element_id] = element
+        self._z[element_id] = z
+        self.grid.insert(element_id, element_bbox(element))
+
+    def _delete(self, element_id: int):
+        self._elements.pop(element_id, None)
+        self._z.pop(element_id, None)
+        self.grid.remove(element_id)
+
+    def _translate(self, element_ids: Sequence[int], dx: float, dy: float):
+        for element_id in element_ids:
+            element = self._elements[element_id]
+            move_element(element, dx, dy)
+            self.grid.insert(element_id, element_bbox(element))
+
+    def _apply(self, command: DiagramCommand, reverse: bool = False):
+        if command.kind == 'move':
+            sign = -1 if reverse else 1
+            self._translate(command.element_ids, sign * command.dx, sign * command.dy)
+        elif (command.kind == 'add') != reverse:
+            for element_id, z, element in command.entries:
+                self._insert(element_id, z, element)
+        else:
+            for element_id, _, _ in command.entries:
+                self._delete(element_id)
+
+    def _record(self, command: DiagramCommand) -> DiagramCommand:
+        self._apply(command)
+        self.undo_stack.append(command)
+        self.redo_stack.clear()
+        return command
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __contains__(self, element_id: int):
+        return element_id in self._elements
+
+    def get(self, element_id: int) -> Optional[Dict]:
+        return self._elements.get(element_id)
+
+    def ids(self) -> List[int]:
+        """Element ids bottom to top"""
+        return sorted(self._elements, key=self._z.__getitem__)
+
+    def elements(self) -> List[Dict]:
+        """Elements bottom to top, as stored in the diagram payload"""
+        return [self._elements[element_id] for element_id in self.ids()]
+
+    def add(self, element: Dict) -> int:
+        element_id = self._allocate()
+        self._record(DiagramCommand('add', [(element_id, element_id, element)]))
+        return element_id
+
+    def remove(self, element_ids: Sequence[int]) -> Optional[DiagramCommand]:
+        entries = [(i, self._z[i], self._elements[i]) for i in element_ids if i in self._elements]
+        return self._record(DiagramCommand('remove', entries)) if entries else None
+
+    def clear(self) -> Optional[DiagramCommand]:
+        return self.remove(self.ids())
+
+    def move(self, element_ids: Sequence[int], dx: float, dy: float) -> Optional[DiagramCommand]:
+        element_ids = [i for i in element_ids if i in self._elements]
+        if not element_ids or (dx == 0 and dy == 0):
+            return None
+        return self._record(DiagramCommand('move', [(i, self._z[i], self._elements[i]) for i in element_ids],
+                                           dx, dy))
+
+    def undo(self) -> Optional[DiagramCommand]:
+        if not self.undo_stack:
+            return None
+        command = self.undo_stack.pop()
+        self._apply(command, reverse=True)
+        self.redo_stack.append(command)
+        return command
+
+    def redo(self) -> Optional[DiagramCommand]:
+        if not self.redo_stack:
+            return None
+        command = self.redo_stack.pop()
+        self._apply(command)
+        self.undo_stack.append(command)
+        return command
+
+    def hit_test(self, x: float, y: float, tolerance: float = 4.0) -> Optional[int]:
+        """Topmost element whose outline is within tolerance of (x, y)"""
+        best_id = None
+        for element_id in self.grid.query_point(x, y, tolerance):
+            if element_distance(self._elements[element_id], x, y) <= tolerance:
+                if best_id is None or self._z[element_id] > self._z[best_id]:
+                    best_id = element_id
+        return best_id
+
+    def next_above(self, element_id: int) -> Optional[int]:
+        """The lowest element drawn above element_id, for restoring stacking order"""
+        z = self._z[element_id]
+        above = [i for i, other in self._z.items() if other > z]
+        return min(above, key=self._z.__getitem__) if above else None
@@ -7,12 +7,43 @@ from tkinter import ttk, scrolledtext, messagebox, filedialog
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import threading
-import re
+import math
 import os
+import time
 import json
+import queue
+import uuid
 from models import (
-    ReadingPackage, AnswerRecord, HighlightRecord, QuestionType
+    ReadingPackage, AnswerRecord, AnswerSession, HighlightRecord, QuestionType
 )
+from blank_index import (
+    BlankIndex, SUMMARY, TABLE, FLOWCHART, FLOWCHART_ARROW_RE,
+    iter_blank_spans, is_blank_cell, has_blank, split_flowchart_line
+)
+from diagram_tools import DIAGRAM_EDITOR_PREFIX, draw_element, parse_diagram_payload
+from style_runs import TEXT_STYLES, iter_runs
+from exam_server import ExamServerClient, ExamServerError
+from result_outbox import ResultOutbox, default_outbox
+from instrumentation import traced
+from stall_watchdog import StallWatchdog
+from scroll_router import ScrollRouter
+from text_layout import TextLayout, REFLOW_DEBOUNCE_MS
+
+
+# Answer events (or an outbox journal) are streamed off the machine on this interval
+EVENT_FLUSH_MS = 5000
+SUBMIT_POLL_MS = 100
+
+
+# Tag options for the editor's style runs in the reading passage
+READING_STYLE_OPTIONS = {
+    'bold': {'font': ('Arial', 12, 'bold')},
+    'italic': {'font': ('Arial', 12, 'italic')},
+    'h1': {'font': ('Arial', 18, 'bold')},
+    'h2': {'font': ('Arial', 16, 'bold')},
+    'center': {'justify': 'center'},
+    'left': {'justify': 'left'},
+}
 
 
 class HighlightToolbar(tk.Frame):
@@ -58,16 +89,19 @@ class HighlightToolbar(tk.Frame):
 class ExamEngineWindow:
     """Main Exam Engine Window"""
     
-    def __init__(self, root, package_path: Optional[str] = None, package: Optional[ReadingPackage] = None, questions_left: bool = False):
+    def __init__(self, root, package_path: Optional[str] = None, package: Optional[ReadingPackage] = None,
+                 questions_left: bool = False, server_url: Optional[str] = None, candidate_id: str = ""):
         self.root = root
         self.root.title("IELTS Reading Exam")
         
         # Make fullscreen
-        self.root.state('zoomed')  # Windows/Linux
         try:
-            self.root.attributes('-zoomed', True)  # Alternative for some systems
-        except:
-            pass
+            self.root.state('zoomed')  # Windows
+        except tk.TclError:
+            try:
+                self.root.attributes('-zoomed', True)  # X11 window managers
+            except tk.TclError:
+                pass
         
         # Get screen dimensions
         self.screen_width = self.root.winfo_screenwidth()
@@ -85,13 +119,49 @@ class ExamEngineWindow:
         self.time_remaining = self.exam_duration
         self.timer_running = False
         self.exam_started = False
+        self._timer_deadline = 0.0
+
+        # Pending after() jobs by name; teardown() cancels whatever is left
+        self._jobs: Dict[str, str] = {}
+        self._closed = False
         
         # Answer widgets
         self.answer_widgets: Dict[str, tk.Widget] = {}
         self._diagram_images: List[tk.PhotoImage] = []
-        self._diagram_highlights: Dict[int, List[int]] = {}
+        # Highlight rectangles per diagram canvas, keyed by Tk path name (stable while the canvas lives)
+        self._diagram_highlights: Dict[str, List[int]] = {}
         self._diagram_selection = None
+        self.highlight_toolbar = None
         self.questions_left = questions_left
+
+        # Gap tokens are indexed once per package load
+        self.blank_index: Optional[BlankIndex] = None
+        self._blank_widgets: Dict[tuple, tk.Widget] = {}
+        self._flowchart_lines: Dict[int, Dict[int, int]] = {}
+        self._active_blank: Optional[tk.Text] = None
+
+        # Exam server session (lab deployments); None when working from local files
+        self.server: Optional[ExamServerClient] = ExamServerClient(server_url) if server_url else None
+        self.candidate_id = candidate_id
+        self.session_id = str(uuid.uuid4())
+        self._pending_events: List[AnswerRecord] = []
+        self._events_lock = threading.Lock()
+        self._events_in_flight = False
+        self._submit_queue: "queue.Queue" = queue.Queue()
+        # Durable upload queue for results the exam server did not take (None when not configured)
+        self.outbox: Optional[ResultOutbox] = default_outbox(
+            server_url.rstrip('/') + '/results' if server_url else None)
+        # Event-loop stall detection; one histogram per session is logged when the window closes
+        self.watchdog = StallWatchdog(self.root, 'exam', self.session_id)
+        self.watchdog.start()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.root.bind('<Destroy>', self._on_destroy, add='+')
+        # Mouse-wheel scrolling for every scrollable area, resolved once per event
+        self.scroll_router = ScrollRouter(self.root)
+        self.scroll_router.attach()
+        # Heights of the read-only question texts, measured and reflowed on resize
+        self.text_layout = TextLayout(self.root)
+        self._questions_width = 0
         
         if package is not None:
             self.package = package
@@ -106,8 +176,61 @@ class ExamEngineWindow:
             )
         elif package_path:
             self.load_package(package_path)
+        elif self.server is not None:
+            self.prompt_server_package()
         else:
             self.prompt_load_package()
+
+    def prompt_server_package(self):
+        """Let the candidate pick one of the packages offered by the exam server"""
+        try:
+            packages = self.server.list_packages()
+        except ExamServerError as e:
+            messagebox.showerror("Exam Server", f"{e}\n\nSelect a local package file instead.")
+            self.server = None
+            self.prompt_load_package()
+            return
+        if not packages:
+            messagebox.showerror("Exam Server", "The exam server has no packages.")
+            self.root.quit()
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Select Reading Package")
+        dialog.transient(self.root)
+        tk.Label(dialog, text="Packages on the exam server:", font=('Arial', 11, 'bold')).pack(padx=10, pady=(10, 5))
+        listbox = tk.Listbox(dialog, width=60, height=min(len(packages), 15), font=('Arial', 11))
+        for summary in packages:
+            listbox.insert(tk.END, f"{summary['title'] or summary['package_id']} ({summary['questions']} questions)")
+        listbox.selection_set(0)
+        listbox.pack(padx=10, pady=5)
+
+        def choose(event=None):
+            selection = listbox.curselection()
+            if not selection:
+                return
+            dialog.destroy()
+            self.load_server_package(packages[selection[0]]['package_id'])
+
+        listbox.bind('<Double-Button-1>', choose)
+        tk.Button(dialog, text="Open", command=choose, width=12).pack(pady=(0, 10))
+        dialog.grab_set()
+
+    def load_server_package(self, package_id: str):
+        """Download a package from the exam server"""
+        try:
+            self.package = self.server.fetch_package(package_id)
+        except (ExamServerError, ValueError, KeyError) as e:
+            messagebox.showerror("Error", f"Failed to load package:\n{str(e)}")
+            self.root.quit()
+            return
+        self.create_ui()
+        messagebox.showinfo("Package Loaded",
+                          f"Package loaded successfully!\n\n"
+                          f"Title: {self.package.reading_content.title}\n"
+                          f"Question Groups: {len(self.package.question_groups)}\n"
+                          f"Total Questions: {sum(len(qg.questions) for qg in self.package.question_groups)}\n\n"
+                          f"Click 'Start Exam' to begin.")
     
     def prompt_load_package(self):
         """Prompt user to load a package"""
@@ -120,7 +243,7 @@ class ExamEngineWindow:
             self.load_package(filepath)
         else:
             messagebox.showwarning("No Package", "No package selected. Please load a package.")
-            self.root.after(100, self.prompt_load_package)
+            self._schedule('prompt', 100, self.prompt_load_package)
     
     def load_package(self, filepath: str):
         """Load reading package from file"""
@@ -137,6 +260,7 @@ class ExamEngineWindow:
             messagebox.showerror("Error", f"Failed to load package:\n{str(e)}")
             self.root.quit()
     
+    @traced()
     def create_ui(self):
         """Create the exam UI"""
         # Top bar
@@ -190,9 +314,6 @@ class ExamEngineWindow:
         paned.add(right_frame, minsize=450, width=half_width, stretch='always')
 
         tk.Label(reading_host, text="Reading Passage", font=('Arial', 14, 'bold'),
-        paned.add(left_frame, minsize=450, width=half_width, stretch='always')
-        
-        tk.Label(left_frame, text="Reading Passage", font=('Arial', 14, 'bold'),
                 bg='#34495e', fg='white').pack(fill=tk.X)
 
         self.reading_text = scrolledtext.ScrolledText(reading_host, wrap=tk.WORD,
@@ -225,38 +346,12 @@ class ExamEngineWindow:
         def schedule_balance(event=None):
             if event is not None and event.widget is not self.root:
                 return
-            if self._pane_balance_job:
-                self.root.after_cancel(self._pane_balance_job)
-            self._pane_balance_job = self.root.after(80, keep_balanced_panes)
+            self._schedule('pane_balance', 80, keep_balanced_panes)
 
-        self.root.after_idle(keep_balanced_panes)
+        self._schedule('pane_balance', None, keep_balanced_panes)
         self.root.bind('<Configure>', schedule_balance, add='+')
         
         tk.Label(questions_host, text="Questions", font=('Arial', 14, 'bold'),
-        # Right pane - Questions
-        paned.add(right_frame, minsize=450, width=half_width, stretch='always')
-
-        def keep_balanced_panes():
-            try:
-                total = max(900, self.root.winfo_width())
-                if abs(total - self._last_pane_width) < 8:
-                    return
-                self._last_pane_width = total
-                paned.sash_place(0, total // 2, 1)
-            except tk.TclError:
-                pass
-
-        def schedule_balance(event=None):
-            if event is not None and event.widget is not self.root:
-                return
-            if self._pane_balance_job:
-                self.root.after_cancel(self._pane_balance_job)
-            self._pane_balance_job = self.root.after(80, keep_balanced_panes)
-
-        self.root.after_idle(keep_balanced_panes)
-        self.root.bind('<Configure>', schedule_balance, add='+')
-        
-        tk.Label(right_frame, text="Questions", font=('Arial', 14, 'bold'),
                 bg='#34495e', fg='white').pack(fill=tk.X)
         
         # Canvas with scrollbar for questions
@@ -274,6 +369,9 @@ class ExamEngineWindow:
 
         def fit_questions_to_canvas(event):
             canvas.itemconfigure(self.questions_window, width=event.width)
+            if event.width != self._questions_width:
+                self._questions_width = event.width
+                self._schedule('reflow', REFLOW_DEBOUNCE_MS, self.text_layout.reflow)
 
         canvas.bind('<Configure>', fit_questions_to_canvas)
         
@@ -281,7 +379,7 @@ class ExamEngineWindow:
         scrollbar.pack(side="right", fill="y")
 
         # Enable mouse wheel scrolling in the question panel
-        self.bind_mousewheel_scrolling(canvas)
+        self.scroll_router.register(canvas)
         
         # Load content
         self.load_reading_content()
@@ -289,43 +387,18 @@ class ExamEngineWindow:
         
         # Highlight toolbar (initially hidden)
         self.highlight_toolbar = None
-        self._pane_balance_job = None
         self._last_pane_width = 0
 
-    def bind_mousewheel_scrolling(self, widget):
-        """Enable cross-platform mouse-wheel scrolling for the hovered widget only."""
-        def _on_mousewheel(event):
-            try:
-                if not widget.winfo_exists():
-                    return
-                if hasattr(event, "delta") and event.delta:
-                    widget.yview_scroll(int(-1 * (event.delta / 120)), "units")
-                elif getattr(event, 'num', None) == 4:
-                    widget.yview_scroll(-1, "units")
-                elif getattr(event, 'num', None) == 5:
-                    widget.yview_scroll(1, "units")
-            except tk.TclError:
-                return
-
-        widget.bind("<MouseWheel>", _on_mousewheel, add="+")
-        widget.bind("<Button-4>", _on_mousewheel, add="+")
-        widget.bind("<Button-5>", _on_mousewheel, add="+")
-                # Widget can be destroyed while global wheel bindings still fire.
-                return
-
-        widget.bind_all("<MouseWheel>", _on_mousewheel, add="+")
-        widget.bind_all("<Button-4>", _on_mousewheel, add="+")
-        widget.bind_all("<Button-5>", _on_mousewheel, add="+")
-    
     def _make_selectable_text(self, parent, text: str, font=('Arial', 10), wraplength=600,
                               justify=tk.LEFT, padding=(0, 0), bold=False):
         # Render selectable, read-only text with highlight support.
         bg_color = parent.cget('bg')
-        char_width = max(30, int(wraplength / 7))
-        lines_estimate = max(1, min(8, (len(text) // char_width) + text.count('\n') + 1))
-        widget = tk.Text(parent, wrap=tk.WORD, height=lines_estimate, relief=tk.FLAT,
+        widget = tk.Text(parent, wrap=tk.WORD, height=1, relief=tk.FLAT,
                          bg=bg_color, font=font, padx=0, pady=0, borderwidth=0,
                          highlightthickness=0, cursor='arrow')
+        # wraplength sizes the text until the first reflow sees the widget's real width
+        content_font = (font[0], font[1], 'bold') if bold else font
+        widget.configure(height=self.text_layout.track(widget, text, content_font, wraplength))
         widget.tag_configure('highlight_yellow', background='#FFFF00')
         widget.tag_configure('highlight_green', background='#90EE90')
         widget.tag_configure('highlight_blue', background='#ADD8E6')
@@ -361,22 +434,43 @@ class ExamEngineWindow:
             self.reading_text.tag_configure('title', font=('Arial', 18, 'bold'), 
                                            justify='center', spacing3=10)
         
-        # Paragraphs
+        # Paragraphs; style runs are collected as index ranges and tagged in one pass below
+        style_ranges = {}
+
+        def collect_runs(runs):
+            if not runs:
+                return
+            base = self.reading_text.index("end-1c")
+            for start, length, style_id in iter_runs(runs):
+                style_ranges.setdefault(style_id, []).extend(
+                    (f"{base}+{start}c", f"{base}+{start + length}c"))
+
         for i, para in enumerate(rc.paragraphs):
             if para.title:
+                collect_runs(para.title_runs)
                 self.reading_text.insert("end", f"{para.title}\n", f'para_title_{i}')
                 self.reading_text.tag_configure(f'para_title_{i}', font=('Arial', 14, 'bold'),
                                                spacing1=10, spacing3=5)
             
             if para.body:
+                collect_runs(para.body_runs)
                 self.reading_text.insert("end", f"{para.body}\n\n", f'para_body_{i}')
                 self.reading_text.tag_configure(f'para_body_{i}', font=('Arial', 12),
                                                spacing1=2, spacing2=2, spacing3=5)
+
+        for style_id, indices in style_ranges.items():
+            tag = f'style_{TEXT_STYLES[style_id]}'
+            self.reading_text.tag_configure(tag, **READING_STYLE_OPTIONS[TEXT_STYLES[style_id]])
+            self.reading_text.tag_add(tag, *indices)
         
     
+    @traced()
     def load_questions(self):
         """Load questions into right pane"""
         question_number = 1
+        self.blank_index = BlankIndex.from_package(self.package)
+        self._blank_widgets.clear()
+        self._flowchart_lines.clear()
         
         for group_idx, qg in enumerate(self.package.question_groups):
             # Group frame
@@ -403,7 +497,7 @@ class ExamEngineWindow:
             # Additional inputs (if any) - display and collect options for dropdowns
             matching_options = []
             if qg.additional_inputs:
-                matching_options = self.render_additional_inputs(group_frame, qg.additional_inputs)
+                matching_options = self.render_additional_inputs(group_frame, qg.additional_inputs, group_idx)
             
             # Questions
             for q in qg.questions:
@@ -532,9 +626,17 @@ class ExamEngineWindow:
             entry = tk.Entry(parent, textvariable=var, width=40)
             entry.pack(anchor=tk.W, padx=20, pady=5)
             entry.bind('<KeyRelease>', lambda e: self.record_answer(question_id, var.get()))
+            entry.bind('<FocusIn>', lambda e: self.jump_to_blank(question_id))
             return var
     
-    def render_additional_inputs(self, parent, additional_inputs):
+    def _blank_spans(self, group_index: Optional[int], container: str, cell, text: str):
+        """Gap spans for a widget, served from the package blank index when available"""
+        if self.blank_index is None or group_index is None:
+            return [(start, end) for start, end, _ in iter_blank_spans(text)]
+        return [(loc.start, loc.end) for loc in self.blank_index.blanks_in(group_index, container, cell)]
+
+    @traced()
+    def render_additional_inputs(self, parent, additional_inputs, group_index: Optional[int] = None):
         """Render additional inputs like lists, tables, etc. and return options for dropdowns"""
         frame = tk.LabelFrame(parent, text="📋 ADDITIONAL INFORMATION - READ CAREFULLY", 
                              padx=15, pady=15, font=('Arial', 11, 'bold'),
@@ -632,19 +734,19 @@ class ExamEngineWindow:
             text_widget.tag_configure('highlight_blue', background='#ADD8E6')
             text_widget.tag_configure('highlight_pink', background='#FFB6C1')
             text_widget.tag_configure('blank', background='#ffeb3b', font=('Arial', 11, 'bold'))
+            text_widget.tag_configure('blank_active', background='#ff9800')
             
             # Highlight blanks
             content = data['summaryData']
-            for match in re.finditer(r'\[\d+\]|\[BLANK\]', content):
-                start_idx = f"1.0+{match.start()}c"
-                end_idx = f"1.0+{match.end()}c"
-                text_widget.tag_add('blank', start_idx, end_idx)
+            for start, end in self._blank_spans(group_index, SUMMARY, (0, 0), content):
+                text_widget.tag_add('blank', f"1.0+{start}c", f"1.0+{end}c")
+            self._blank_widgets[(group_index, SUMMARY, (0, 0))] = text_widget
             
             # Enable text selection and bind highlighting
             text_widget.bind("<<Selection>>", lambda e: self.show_highlight_menu(e, text_widget))
             text_widget.bind("<ButtonRelease-1>", lambda e: self.show_highlight_menu(e, text_widget))
             text_widget.bind('<Key>', lambda e: 'break')
-            self.bind_mousewheel_scrolling(text_widget)
+            self.scroll_router.register(text_widget)
         
         elif 'tableData' in data:
             tk.Label(frame, text="📊 TABLE - Complete the gaps below:", 
@@ -674,8 +776,7 @@ class ExamEngineWindow:
                     cell_text = content[r][c] if r < len(content) and c < len(content[r]) else ""
                     
                     # Only mark full-cell blanks (not normal text that happens to include [1], [2], etc.)
-                    normalized_text = cell_text.strip()
-                    is_blank = normalized_text in {'[BLANK]'} or bool(re.fullmatch(r'\[\d+\]', normalized_text))
+                    is_blank = is_blank_cell(cell_text)
                     is_header = (r == 0)
                     
                     # Use Text widget instead of Label to support highlighting
@@ -695,10 +796,9 @@ class ExamEngineWindow:
                     cell_widget.insert("1.0", cell_text)
 
                     # Highlight inline blank tokens without coloring whole cell
-                    for match in re.finditer(r'\[BLANK\]|\[\d+\]', cell_text):
-                        start_idx = f"1.0+{match.start()}c"
-                        end_idx = f"1.0+{match.end()}c"
-                        cell_widget.tag_add('blank_inline', start_idx, end_idx)
+                    for start, end in self._blank_spans(group_index, TABLE, (r, c), cell_text):
+                        cell_widget.tag_add('blank_inline', f"1.0+{start}c", f"1.0+{end}c")
+                    self._blank_widgets[(group_index, TABLE, (r, c))] = cell_widget
                     
                     # Configure highlight tags
                     cell_widget.tag_configure('highlight_yellow', background='#FFFF00')
@@ -706,6 +806,7 @@ class ExamEngineWindow:
                     cell_widget.tag_configure('highlight_blue', background='#ADD8E6')
                     cell_widget.tag_configure('highlight_pink', background='#FFB6C1')
                     cell_widget.tag_configure('blank_inline', background='#ffeb3b')
+                    cell_widget.tag_configure('blank_active', background='#ff9800')
                     
                     # Enable highlighting and keep read-only
                     cell_widget.bind('<Key>', lambda e: 'break')
@@ -721,7 +822,7 @@ class ExamEngineWindow:
             table_canvas.pack(side="left", fill="both", expand=True, padx=10, pady=10)
             table_scrollbar.pack(side="right", fill="y")
             table_scrollbar_x.pack(side="bottom", fill="x")
-            self.bind_mousewheel_scrolling(table_canvas)
+            self.scroll_router.register(table_canvas)
         
         elif 'flowchartData' in data:
             tk.Label(frame, text="🔄 FLOW-CHART - Complete the gaps below:", 
@@ -740,12 +841,15 @@ class ExamEngineWindow:
             
             # Parse flowchart data and render graphically
             flowchart_text = data['flowchartData']
-            self.render_flowchart_graphically(canvas, flowchart_text)
+            line_positions = self.render_flowchart_graphically(canvas, flowchart_text)
+            if group_index is not None:
+                self._flowchart_lines[group_index] = line_positions
+                self._blank_widgets[(group_index, FLOWCHART, None)] = canvas
             
             canvas.pack(side="left", fill="both", expand=True, padx=10, pady=10)
             scrollbar_y.pack(side="right", fill="y")
             scrollbar_x.pack(side="bottom", fill="x")
-            self.bind_mousewheel_scrolling(canvas)
+            self.scroll_router.register(canvas)
             
             # Enable canvas selection for highlighting
             canvas.bind("<Button-1>", lambda e: self.canvas_click_handler(e, canvas))
@@ -760,13 +864,12 @@ class ExamEngineWindow:
             diagram_data = str(data['diagramImage']).strip()
 
             # If this is a saved diagram-editor payload, render it as drawable canvas.
-            if diagram_data.startswith('__DIAGRAM_EDITOR__'):
-                canvas_payload = diagram_data.replace('__DIAGRAM_EDITOR__', '', 1)
+            if diagram_data.startswith(DIAGRAM_EDITOR_PREFIX):
                 diagram_canvas = tk.Canvas(diagram_frame, bg='white', highlightthickness=0)
                 diagram_canvas.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
 
                 try:
-                    payload = json.loads(canvas_payload)
+                    payload = parse_diagram_payload(diagram_data)
                     canvas_width = int(payload.get('width', 900))
                     canvas_height = int(payload.get('height', 550))
                     diagram_canvas.configure(width=canvas_width, height=canvas_height, scrollregion=(0, 0, canvas_width, canvas_height))
@@ -781,39 +884,7 @@ class ExamEngineWindow:
                             pass
 
                     for element in payload.get('elements', []):
-                        kind = element.get('kind')
-                        if kind == 'text':
-                            diagram_canvas.create_text(
-                                element.get('x', 0),
-                                element.get('y', 0),
-                                text=element.get('text', ''),
-                                anchor='nw',
-                                font=('Arial', 12)
-                            )
-                        elif kind == 'pen':
-                            points = element.get('points', [])
-                            if len(points) > 1:
-                                flat = [coord for pt in points for coord in pt]
-                                diagram_canvas.create_line(
-                                    *flat,
-                                    fill=element.get('color', '#000000'),
-                                    width=element.get('width', 2),
-                                    smooth=True
-                                )
-                        elif kind == 'line':
-                            coords = element.get('coords', [0, 0, 0, 0])
-                            diagram_canvas.create_line(
-                                *coords,
-                                fill=element.get('color', '#000000'),
-                                width=element.get('width', 2)
-                            )
-                        elif kind == 'rect':
-                            coords = element.get('coords', [0, 0, 0, 0])
-                            diagram_canvas.create_rectangle(
-                                *coords,
-                                outline=element.get('color', '#000000'),
-                                width=element.get('width', 2)
-                            )
+                        draw_element(diagram_canvas, element)
                 except (json.JSONDecodeError, TypeError, ValueError):
                     diagram_canvas.create_text(10, 10, anchor='nw', text='Unable to render diagram payload', font=('Arial', 10))
 
@@ -875,23 +946,7 @@ class ExamEngineWindow:
                     diagram_text.bind("<<Selection>>", lambda e: self.show_highlight_menu(e, diagram_text))
                     diagram_text.bind("<ButtonRelease-1>", lambda e: self.show_highlight_menu(e, diagram_text))
                     diagram_text.pack(fill=tk.BOTH, expand=True)
-                    self.bind_mousewheel_scrolling(diagram_text)
-                diagram_text = tk.Text(diagram_frame, height=8, width=70, wrap=tk.WORD,
-                                       font=('Arial', 10), bg='white', padx=10, pady=10)
-                diagram_text.insert("1.0", diagram_data)
-                diagram_text.bind('<Key>', lambda e: 'break')
-
-                # Configure highlight tags
-                diagram_text.tag_configure('highlight_yellow', background='#FFFF00')
-                diagram_text.tag_configure('highlight_green', background='#90EE90')
-                diagram_text.tag_configure('highlight_blue', background='#ADD8E6')
-                diagram_text.tag_configure('highlight_pink', background='#FFB6C1')
-
-                # Enable highlighting
-                diagram_text.bind("<<Selection>>", lambda e: self.show_highlight_menu(e, diagram_text))
-                diagram_text.bind("<ButtonRelease-1>", lambda e: self.show_highlight_menu(e, diagram_text))
-                diagram_text.pack(fill=tk.BOTH, expand=True)
-                self.bind_mousewheel_scrolling(diagram_text)
+                    self.scroll_router.register(diagram_text)
         
         return options
     
@@ -900,6 +955,43 @@ class ExamEngineWindow:
         if question_id in self.answer_records:
             self.answer_records[question_id].user_answer = answer
             self.answer_records[question_id].timestamp = datetime.now()
+            if self.server is not None:
+                with self._events_lock:
+                    self._pending_events.append(AnswerRecord(question_id, answer,
+                                                             self.answer_records[question_id].timestamp))
+
+    def current_session(self) -> AnswerSession:
+        """The answers so far as a session record"""
+        return AnswerSession(session_id=self.session_id, candidate_id=self.candidate_id,
+                             package_id=self.package.package_id,
+                             answers=list(self.answer_records.values()))
+
+    def flush_answer_events(self):
+        """Send queued answer events to the exam server on a worker thread, or journal to the outbox"""
+        if not self.exam_started:
+            return
+        if self.server is not None:
+            with self._events_lock:
+                batch, self._pending_events = self._pending_events, []
+            if batch and not self._events_in_flight:
+                self._events_in_flight = True
+                threading.Thread(target=self._send_events, args=(batch,), daemon=True).start()
+            elif batch:
+                with self._events_lock:
+                    self._pending_events[:0] = batch
+        elif self.outbox is not None:
+            self.outbox.defer_journal(self.current_session())
+        self._schedule('flush', EVENT_FLUSH_MS, self.flush_answer_events)
+
+    def _send_events(self, batch: List[AnswerRecord]):
+        try:
+            self.server.send_events(self.session_id, batch)
+        except ExamServerError:
+            # Keep them for the next flush; the final submission carries every answer anyway
+            with self._events_lock:
+                self._pending_events[:0] = batch
+        finally:
+            self._events_in_flight = False
     
     def on_text_selection(self, event):
         """Handle text selection for highlighting"""
@@ -973,42 +1065,52 @@ class ExamEngineWindow:
             self.pause_btn.config(state=tk.NORMAL)
             self.end_btn.config(state=tk.NORMAL)
             
-            # Start timer thread
-            self.timer_thread = threading.Thread(target=self.run_timer, daemon=True)
-            self.timer_thread.start()
+            self.start_timer()
+            if self.server is not None or self.outbox is not None:
+                self._schedule('flush', EVENT_FLUSH_MS, self.flush_answer_events)
             
             messagebox.showinfo("Exam Started", "The exam has started. Good luck!")
     
-    def run_timer(self):
-        """Timer countdown"""
-        while self.timer_running and self.time_remaining > 0:
-            mins, secs = divmod(self.time_remaining, 60)
-            self.timer_label.config(text=f"{mins:02d}:{secs:02d}")
-            
-            # Change color when time is low
-            if self.time_remaining <= 300:  # 5 minutes
-                self.timer_label.config(fg='#e74c3c')
-            elif self.time_remaining <= 600:  # 10 minutes
-                self.timer_label.config(fg='#f39c12')
-            
-            threading.Event().wait(1)
-            if self.timer_running:
-                self.time_remaining -= 1
-        
+    def start_timer(self):
+        """Count time_remaining down on the Tk event loop"""
+        self._timer_deadline = time.monotonic() + self.time_remaining
+        self.update_timer_label()
+        self._schedule('timer', 1000, self._tick)
+
+    def _tick(self):
+        if not self.timer_running:
+            return
+        # Derived from the deadline, so a late after() callback does not slow the clock down
+        remaining = self._timer_deadline - time.monotonic()
+        self.time_remaining = max(0, math.ceil(remaining))
+        self.update_timer_label()
         if self.time_remaining <= 0:
-            self.root.after(0, self.time_up)
+            self.time_up()
+            return
+        self._schedule('timer', int(remaining % 1 * 1000) + 1, self._tick)
+
+    def update_timer_label(self):
+        """Show time_remaining, coloured when time is low"""
+        mins, secs = divmod(math.ceil(self.time_remaining), 60)
+        self.timer_label.config(text=f"{mins:02d}:{secs:02d}")
+        if self.time_remaining <= 300:  # 5 minutes
+            self.timer_label.config(fg='#e74c3c')
+        elif self.time_remaining <= 600:  # 10 minutes
+            self.timer_label.config(fg='#f39c12')
     
     def pause_exam(self):
         """Pause/Resume the exam"""
         if self.timer_running:
             self.timer_running = False
+            self._cancel('timer')
+            # Keep the part of the second already counted, so pausing never hands time back
+            self.time_remaining = max(0.0, self._timer_deadline - time.monotonic())
             self.pause_btn.config(text="Resume")
             messagebox.showinfo("Paused", "Exam paused")
         else:
             self.timer_running = True
             self.pause_btn.config(text="Pause")
-            self.timer_thread = threading.Thread(target=self.run_timer, daemon=True)
-            self.timer_thread.start()
+            self.start_timer()
     
     def show_highlight_menu(self, event, text_widget):
         """Show highlighting menu for text widgets in tables/flowcharts"""
@@ -1115,17 +1217,18 @@ class ExamEngineWindow:
                 outline='',
                 stipple='gray25'
             )
-            key = id(canvas)
-            self._diagram_highlights.setdefault(key, []).append(highlight_id)
+            self._diagram_highlights.setdefault(str(canvas), []).append(highlight_id)
         
         if self.highlight_toolbar:
             self.highlight_toolbar.destroy()
             self.highlight_toolbar = None
         self._diagram_selection = None
 
-    def render_flowchart_graphically(self, canvas, flowchart_text):
-        """Render flowchart as graphical elements on canvas."""
+    @traced()
+    def render_flowchart_graphically(self, canvas, flowchart_text) -> Dict[int, int]:
+        """Render flowchart as graphical elements on canvas and return the y position of each line."""
         lines = [line.strip() for line in flowchart_text.split('\n')]
+        line_positions: Dict[int, int] = {}
 
         y_position = 30
         x_center = 450
@@ -1133,11 +1236,8 @@ class ExamEngineWindow:
         box_height = 66
         arrow_gap = 22
 
-        def is_blank_text(value: str) -> bool:
-            return '[BLANK]' in value or bool(re.search(r'\[\d+\]', value))
-
         def draw_box(x: int, y: int, label: str, width: int = default_box_width):
-            blank = is_blank_text(label)
+            blank = has_blank(label)
             fill_color = '#ffeb3b' if blank else '#e8f4f8'
             canvas.create_rectangle(
                 x - width // 2,
@@ -1161,10 +1261,8 @@ class ExamEngineWindow:
                 return
             canvas.create_line(x, y_start, x, y_end, arrow=tk.LAST, width=2, fill='#34495e')
 
-        def parse_horizontal_parts(line: str):
-            return [part.strip() for part in re.split(r'\s*(?:→|->)\s*', line) if part.strip()]
-
-        for line in lines:
+        for line_no, line in enumerate(lines):
+            line_positions[line_no] = y_position
             if not line:
                 y_position += 18
                 continue
@@ -1174,8 +1272,8 @@ class ExamEngineWindow:
                 y_position += 36
                 continue
 
-            if re.search(r'(→|->)', line):
-                parts = parse_horizontal_parts(line)
+            if FLOWCHART_ARROW_RE.search(line):
+                parts = split_flowchart_line(line)
                 if not parts:
                     continue
 
@@ -1218,6 +1316,35 @@ class ExamEngineWindow:
             y_position += box_height + 18
 
         canvas.configure(scrollregion=canvas.bbox("all"))
+        return line_positions
+
+    def jump_to_blank(self, question_id: str):
+        """Scroll the gap linked to a question into view and mark it active"""
+        location = self.blank_index.for_question(question_id) if self.blank_index else None
+        if location is None:
+            return
+        try:
+            if location.container == FLOWCHART:
+                canvas = self._blank_widgets.get((location.group_index, FLOWCHART, None))
+                y = self._flowchart_lines.get(location.group_index, {}).get(location.cell[0])
+                if canvas is None or y is None:
+                    return
+                region = canvas.bbox("all")
+                if region and region[3] > 0:
+                    canvas.yview_moveto(max(0.0, (y - 20) / region[3]))
+                return
+
+            widget = self._blank_widgets.get((location.group_index, location.container, location.cell))
+            if widget is None:
+                return
+            if self._active_blank is not None and self._active_blank.winfo_exists():
+                self._active_blank.tag_remove('blank_active', '1.0', 'end')
+            start, end = f"1.0+{location.start}c", f"1.0+{location.end}c"
+            widget.tag_add('blank_active', start, end)
+            widget.see(start)
+            self._active_blank = widget
+        except tk.TclError:
+            pass
 
     def canvas_click_handler(self, event, canvas):
         """Handle clicks on canvas for potential future highlighting"""
@@ -1227,6 +1354,7 @@ class ExamEngineWindow:
     def time_up(self):
         """Handle time up"""
         self.timer_running = False
+        self._cancel('timer')
         messagebox.showwarning("Time's Up!", "The exam time has ended. Submitting your answers...")
         self.submit_exam()
     
@@ -1239,6 +1367,7 @@ class ExamEngineWindow:
     def submit_exam(self):
         """Submit exam and show results"""
         self.timer_running = False
+        self._cancel('timer')
         self.start_btn.config(state=tk.DISABLED)
         self.pause_btn.config(state=tk.DISABLED)
         self.end_btn.config(state=tk.DISABLED)
@@ -1249,11 +1378,105 @@ class ExamEngineWindow:
                 widget.config(state=tk.DISABLED)
             elif isinstance(widget, ttk.Combobox):
                 widget.config(state=tk.DISABLED)
-        
-        # Open result window
+
+        self.exam_started = False  # stops the event flush loop
+        if self.server is not None:
+            answers = list(self.answer_records.values())
+            threading.Thread(target=self._submit_to_server, args=(answers,), daemon=True).start()
+            self._schedule('submit_poll', SUBMIT_POLL_MS, self._poll_submit)
+            return
+        self.show_results(queue_upload=True)
+
+    def _submit_to_server(self, answers: List[AnswerRecord]):
+        try:
+            result = self.server.submit(self.session_id, self.candidate_id, self.package.package_id, answers)
+        except ExamServerError as e:
+            result = e
+        self._submit_queue.put(result)
+
+    def _poll_submit(self):
+        try:
+            outcome = self._submit_queue.get_nowait()
+        except queue.Empty:
+            self._schedule('submit_poll', SUBMIT_POLL_MS, self._poll_submit)
+            return
+        failed = isinstance(outcome, Exception)
+        if failed and self.outbox is None:
+            messagebox.showerror("Exam Server",
+                                 f"Your answers could not be submitted to the exam server:\n{outcome}\n\n"
+                                 f"Please tell the invigilator before closing the results.")
+        self.show_results(queue_upload=failed)
+
+    def show_results(self, queue_upload: bool = False):
+        """Open the result window for the current answers; optionally queue the result in the outbox"""
         from result_engine import ResultEngineWindow
+        session = self.current_session()
+        session.submitted_at = datetime.now()
         result_window = tk.Toplevel(self.root)
-        ResultEngineWindow(result_window, self.package, list(self.answer_records.values()))
+        results = ResultEngineWindow(result_window, self.package, session.answers, session=session)
+        if queue_upload and self.outbox is not None:
+            if not self.outbox.defer_result(results.evaluation_result, session):
+                messagebox.showerror("Upload Queue",
+                                     "The result upload queue is full; export your results manually "
+                                     "and tell the invigilator.")
+
+    def _schedule(self, name: str, delay_ms: Optional[int], callback):
+        """after() (after_idle() when delay_ms is None) owned by the window; replaces a pending job of the same name"""
+        self._cancel(name)
+        if self._closed:
+            return
+
+        def run():
+            self._jobs.pop(name, None)
+            callback()
+        self._jobs[name] = self.root.after_idle(run) if delay_ms is None else self.root.after(delay_ms, run)
+
+    def _cancel(self, name: str):
+        job = self._jobs.pop(name, None)
+        if job is not None:
+            try:
+                self.root.after_cancel(job)
+            except tk.TclError:
+                pass
+
+    def close(self):
+        """Close the exam window and release what it owns"""
+        self.teardown()
+        try:
+            self.root.destroy()
+        except tk.TclError:
+            pass
+
+    def _on_destroy(self, event):
+        if event.widget is self.root:
+            self.teardown()
+
+    def teardown(self):
+        """Cancel timers and pending jobs and drop widget and image references; safe to call twice"""
+        if self._closed:
+            return
+        self._closed = True
+        self.timer_running = False
+        self.exam_started = False
+        for name in list(self._jobs):
+            self._cancel(name)
+        self.watchdog.stop()
+        self.scroll_router.close()
+        self.text_layout.clear()
+        if self.highlight_toolbar is not None:
+            try:
+                self.highlight_toolbar.destroy()
+            except tk.TclError:
+                pass
+            self.highlight_toolbar = None
+        # The last reference to each PhotoImage; dropping it deletes the Tk image
+        self._diagram_images.clear()
+        self._diagram_highlights.clear()
+        self._diagram_selection = None
+        self.answer_widgets.clear()
+        self._blank_widgets.clear()
+        self._flowchart_lines.clear()
+        self._active_blank = None
 
 
 def main():
@@ -0,0 +1,516 @@
+"""
+Exam Delivery Server
+Stdlib-only asyncio HTTP service that serves packages to lab machines and grades submissions
+
+Endpoints:
+    GET  /health
+    GET  /packages                       package list
+    GET  /packages/<package_id>          package JSON (ETag / If-None-Match, gzip)
+    POST /sessions/<session_id>/events   JSON Lines of answer records
+    POST /sessions/<session_id>/submit   {"candidate_id", "package_id", "answers": [...]}
+    POST /results                        result_outbox batches {"items": [...]}
+
+Usage: python exam_server.py --packages DIR --results results.jsonl [--host H] [--port P]
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from models import ReadingPackage, AnswerRecord, AnswerSession, EvaluationResult
+from grading import compile_answer_key, evaluate_answers
+from results_export import JsonLinesResultWriter, iter_json_files
+
+
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 4 * 1024 * 1024
+MAX_SESSIONS = 10000
+MAX_SUBMITTED = 100000      # submitted session ids remembered to reject duplicates, oldest dropped first
+RESCAN_INTERVAL = 5.0       # seconds between directory rescans triggered by unknown package ids
+
+STATUS_TEXT = {
+    200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 409: 'Conflict', 411: 'Length Required',
+    413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+
+class HTTPError(Exception):
+    """Raised by handlers to answer with an error status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ExamServerError(Exception):
+    """Raised by ExamServerClient when the server cannot be reached or refuses a request"""
+
+
+class CachedPackage:
+    """A package with its encoded response bodies, built once per file version"""
+
+    def __init__(self, path: str, package: ReadingPackage, mtime: float):
+        self.path = path
+        self.package = package
+        self.mtime = mtime
+        self.body = json.dumps(package.to_dict(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.answer_key = compile_answer_key(package)
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self._gzip_body: Optional[bytes] = None
+
+    @property
+    def gzip_body(self) -> bytes:
+        if self._gzip_body is None:
+            self._gzip_body = gzip.compress(self.body, compresslevel=6)
+        return self._gzip_body
+
+    def summary(self) -> Dict:
+        return {
+            'package_id': self.package.package_id,
+            'title': self.package.reading_content.title,
+            'questions': sum(len(qg.questions) for qg in self.package.question_groups),
+            'etag': self.etag,
+        }
+
+
+class PackageStore:
+    """In-memory package cache over a directory; a file is re-read only when its mtime changes"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._packages: Dict[str, CachedPackage] = {}
+        self.errors: List[Tuple[str, str]] = []
+        self._last_rescan = 0.0
+        self.rescan()
+
+    def rescan(self):
+        self._last_rescan = time.monotonic()
+        known = {cached.path for cached in self._packages.values()}
+        for path in iter_json_files(self.directory, ('.json', '.json.gz')):
+            if path not in known:
+                self._load(path)
+
+    def _load(self, path: str) -> Optional[CachedPackage]:
+        try:
+            mtime = os.stat(path).st_mtime
+            cached = CachedPackage(path, ReadingPackage.load_from_file(path), mtime)
+        except (OSError, ValueError, KeyError) as e:
+            self.errors.append((path, str(e)))
+            return None
+        self._packages[cached.package.package_id] = cached
+        return cached
+
+    def get(self, package_id: str) -> Optional[CachedPackage]:
+        cached = self._packages.get(package_id)
+        if cached is None:
+            # Unknown ids are cheap for clients to send; look for new files at most every RESCAN_INTERVAL
+            if time.monotonic() - self._last_rescan >= RESCAN_INTERVAL:
+                self.rescan()
+            return self._packages.get(package_id)
+        try:
+            mtime = os.stat(cached.path).st_mtime
+        except OSError:
+            del self._packages[package_id]
+            return None
+        if mtime != cached.mtime:
+            return self._load(cached.path)
+        return cached
+
+    def summaries(self) -> List[Dict]:
+        return [cached.summary() for cached in self._packages.values()]
+
+
+class BatchedResultWriter:
+    """Queue graded results and append them to a JSON Lines file in batches off the event loop"""
+
+    def __init__(self, filepath: str, batch_size: int = 200, flush_interval: float = 0.5):
+        self.filepath = filepath
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.batches_written = 0
+        self._writer = JsonLinesResultWriter(filepath, append=True)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def rows_written(self) -> int:
+        return self._writer.rows_written
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.ensure_future(self._run())
+
+    def submit(self, result: EvaluationResult, session: AnswerSession):
+        self._queue.put_nowait((result, session))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await loop.run_in_executor(None, self._write_batch, batch)
+            self.batches_written += 1
+
+    def _write_batch(self, batch):
+        for result, session in batch:
+            self._writer.write(result, session)
+        self._writer.flush()
+
+    async def close(self):
+        if self._task is not None:
+            self._queue.put_nowait(None)
+            await self._task
+            self._task = None
+        self._writer.close()
+
+
+class SessionState:
+    """Answers streamed in for one exam session before it is submitted"""
+    __slots__ = ('answers', 'events')
+
+    def __init__(self):
+        self.answers: Dict[str, AnswerRecord] = {}
+        self.events = 0
+
+
+class ExamServer:
+    """Serve packages and collect answer events/submissions from many concurrent exam clients"""
+
+    def __init__(self, package_dir: str, results_path: str, host: str = '127.0.0.1',
+                 port: int = DEFAULT_PORT, batch_size: int = 200, flush_interval: float = 0.5):
+        self.host = host
+        self.port = port
+        self.store = PackageStore(package_dir)
+        self.results = BatchedResultWriter(results_path, batch_size, flush_interval)
+        self.sessions: Dict[str, SessionState] = {}
+        self.submitted: "OrderedDict[str, None]" = OrderedDict()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.routes = [
+            ('GET', re.compile(r'^/health$'), self.handle_health),
+            ('GET', re.compile(r'^/packages$'), self.handle_list_packages),
+            ('GET', re.compile(r'^/packages/([^/]+)$'), self.handle_get_package),
+            ('POST', re.compile(r'^/sessions/([^/]+)/events$'), self.handle_events),
+            ('POST', re.compile(r'^/sessions/([^/]+)/submit$'), self.handle_submit),
+            ('POST', re.compile(r'^/results$'), self.handle_outbox_batch),
+        ]
+
+    async def start(self):
+        self.results.start()
+        self._server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.results.close()
+
+    # -- HTTP plumbing -----------------------------------------------------
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                try:
+                    if 'chunked' in headers.get('transfer-encoding', '').lower():
+                        raise HTTPError(411, "chunked request bodies are not supported")
+                    length = int(headers.get('content-length') or 0)
+                    if length > MAX_BODY_BYTES:
+                        keep_alive = False
+                        raise HTTPError(413, "request body too large")
+                    body = await reader.readexactly(length) if length else b''
+                    status, response_headers, payload = await self.dispatch(method, target, headers, body)
+                except HTTPError as e:
+                    status, response_headers, payload = e.status, {}, json_body({'error': str(e)})
+                except Exception as e:  # keep serving other clients
+                    status, response_headers, payload = 500, {}, json_body({'error': str(e)})
+
+                response_headers.setdefault('Content-Type', 'application/json')
+                response_headers['Content-Length'] = str(len(payload))
+                response_headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+                head = f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'OK')}\r\n" + "".join(
+                    f"{name}: {value}\r\n" for name, value in response_headers.items()) + "\r\n"
+                writer.write(head.encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        path = target.split('?', 1)[0]
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match:
+                if route_method != method:
+                    allowed = True
+                    continue
+                return await handler(headers, body, *match.groups())
+        raise HTTPError(405 if allowed else 404, f"{method} {path} is not supported")
+
+    # -- handlers ------------------------------------------------------------
+
+    async def handle_health(self, headers, body):
+        return 200, {}, json_body({'status': 'ok', 'packages': len(self.store.summaries()),
+                                   'open_sessions': len(self.sessions),
+                                   'results_written': self.results.rows_written})
+
+    async def handle_list_packages(self, headers, body):
+        return 200, {}, json_body({'packages': self.store.summaries()})
+
+    async def handle_get_package(self, headers, body, package_id):
+        cached = self.store.get(package_id)
+        if cached is None:
+            raise HTTPError(404, f"unknown package {package_id!r}")
+        response_headers = {'ETag': cached.etag, 'Cache-Control': 'no-cache'}
+        if cached.etag in [tag.strip() for tag in headers.get('if-none-match', '').split(',')]:
+            return 304, response_headers, b''
+        if 'gzip' in headers.get('accept-encoding', ''):
+            response_headers['Content-Encoding'] = 'gzip'
+            return 200, response_headers, cached.gzip_body
+        return 200, response_headers, cached.body
+
+    def _session(self, session_id: str) -> SessionState:
+        if session_id in self.submitted:
+            raise HTTPError(409, f"session {session_id!r} was already submitted")
+        state = self.sessions.get(session_id)
+        if state is None:
+            if len(self.sessions) >= MAX_SESSIONS:
+                raise HTTPError(503, "too many open sessions")
+            state = self.sessions[session_id] = SessionState()
+        return state
+
+    async def handle_events(self, headers, body, session_id):
+        state = self._session(session_id)
+        accepted = 0
+        for line in body.decode('utf-8').splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = AnswerRecord.from_dict(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                raise HTTPError(400, f"bad answer event: {e}")
+            previous = state.answers.get(record.question_id)
+            if previous is None or previous.timestamp <= record.timestamp:
+                state.answers[record.question_id] = record
+            accepted += 1
+        state.events += accepted
+        return 200, {}, json_body({'accepted': accepted, 'answers': len(state.answers)})
+
+    async def handle_submit(self, headers, body, session_id):
+        try:
+            data = json.loads(body.decode('utf-8') or '{}')
+            submitted = [AnswerRecord.from_dict(answer) for answer in data.get('answers', [])]
+        except (ValueError, KeyError, TypeError) as e:
+            raise HTTPError(400, f"bad submission: {e}")
+        cached = self.store.get(data.get('package_id', ''))
+        if cached is None:
+            raise HTTPError(404, f"unknown package {data.get('package_id')!r}")
+
+        state = self._session(session_id)
+        for record in submitted:
+            state.answers[record.question_id] = record
+        session = AnswerSession(
+            session_id=session_id,
+            candidate_id=str(data.get('candidate_id', '')),
+            package_id=cached.package.package_id,
+            answers=list(state.answers.values()),
+            submitted_at=datetime.now()
+        )
+        result = evaluate_answers(cached.package, session.answers, answer_key=cached.answer_key)
+        self.results.submit(result, session)
+        del self.sessions[session_id]
+        response = {'session_id': session_id, 'result': result.to_dict()}
+        self.mark_submitted(session_id)
+        return 200, {}, json_body(response)
+
+    def mark_submitted(self, session_id: str):
+        self.submitted[session_id] = None
+        if len(self.submitted) > MAX_SUBMITTED:
+            self.submitted.popitem(last=False)
+
+    async def handle_outbox_batch(self, headers, body):
+        try:
+            items = json.loads(body.decode('utf-8'))['items']
+            parsed = []
+            for item in items:
+                # A result item's own scores are ignored: the session is graded here, as in handle_submit
+                if item['kind'] == 'result':
+                    parsed.append((True, AnswerSession.from_dict(item['payload']['session'])))
+                elif item['kind'] == 'journal':
+                    parsed.append((False, AnswerSession.from_dict(item['payload'])))
+                else:
+                    raise ValueError(f"unknown item kind {item['kind']!r}")
+        except (ValueError, KeyError, TypeError) as e:
+            raise HTTPError(400, f"bad outbox batch: {e}")
+        packages = {}
+        for final, session in parsed:
+            if final and session.package_id not in packages:
+                packages[session.package_id] = self.store.get(session.package_id)
+                if packages[session.package_id] is None:
+                    raise HTTPError(400, f"bad outbox batch: unknown package {session.package_id!r}")
+
+        accepted = 0
+        for final, session in parsed:
+            if session.session_id in self.submitted:
+                continue  # a retried batch or a session that was submitted directly
+            if not final:
+                state = self._session(session.session_id)
+                for record in session.answers:
+                    state.answers[record.question_id] = record
+            else:
+                cached = packages[session.package_id]
+                result = evaluate_answers(cached.package, session.answers, answer_key=cached.answer_key)
+                self.sessions.pop(session.session_id, None)
+                self.mark_submitted(session.session_id)
+                self.results.submit(result, session)
+            accepted += 1
+        return 200, {}, json_body({'accepted': accepted})
+
+
+def json_body(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class ExamServerClient:
+    """Blocking client used by ExamEngineWindow; keeps fetched packages keyed by ETag"""
+
+    def __init__(self, base_url: str, timeout: float = 10.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._packages: Dict[str, Tuple[str, ReadingPackage]] = {}
+
+    def _request(self, method: str, path: str, body: Optional[bytes] = None,
+                 headers: Optional[Dict[str, str]] = None):
+        request = urllib.request.Request(self.base_url + path, data=body, method=method,
+                                         headers=headers or {})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = response.read()
+                if response.headers.get('Content-Encoding') == 'gzip':
+                    payload = gzip.decompress(payload)
+                return response.status, response.headers, payload
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 304, e.headers, b''
+            try:
+                message = json.loads(e.read().decode('utf-8')).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise ExamServerError(f"{method} {path}: {e.code} {message}") from e
+        except (urllib.error.URLError, OSError) as e:
+            raise ExamServerError(f"cannot reach exam server {self.base_url}: {e}") from e
+
+    def list_packages(self) -> List[Dict]:
+        _, _, payload = self._request('GET', '/packages')
+        return json.loads(payload.decode('utf-8'))['packages']
+
+    def fetch_package(self, package_id: str) -> ReadingPackage:
+        headers = {'Accept-Encoding': 'gzip'}
+        cached = self._packages.get(package_id)
+        if cached:
+            headers['If-None-Match'] = cached[0]
+        status, response_headers, payload = self._request(
+            'GET', '/packages/' + urllib.request.quote(package_id, safe=''), headers=headers)
+        if status == 304 and cached:
+            return cached[1]
+        package = ReadingPackage.from_dict(json.loads(payload.decode('utf-8')))
+        self._packages[package_id] = (response_headers.get('ETag', ''), package)
+        return package
+
+    def send_events(self, session_id: str, records: Iterable[AnswerRecord]) -> Dict:
+        lines = "".join(json.dumps(record.to_dict(), ensure_ascii=False) + "\n" for record in records)
+        _, _, payload = self._request('POST', f'/sessions/{session_id}/events', lines.encode('utf-8'),
+                                      {'Content-Type': 'application/x-ndjson'})
+        return json.loads(payload.decode('utf-8'))
+
+    def submit(self, session_id: str, candidate_id: str, package_id: str,
+               records: Iterable[AnswerRecord]) -> EvaluationResult:
+        body = json_body({
+            'candidate_id': candidate_id,
+            'package_id': package_id,
+            'answers': [record.to_dict() for record in records],
+        })
+        _, _, payload = self._request('POST', f'/sessions/{session_id}/submit', body,
+                                      {'Content-Type': 'application/json'})
+        return EvaluationResult.from_dict(json.loads(payload.decode('utf-8'))['result'])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve IELTS Reading packages to exam clients")
+    parser.add_argument('--packages', required=True, help="directory of package files")
+    parser.add_argument('--results', required=True, help="JSON Lines file that graded submissions are appended to")
+    parser.add_argument('--host', default='127.0.0.1', help="interface to bind (0.0.0.0 for a lab network)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--batch-size', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    server = ExamServer(args.packages, args.results, args.host, args.port, batch_size=args.batch_size)
+    for path, message in server.store.errors:
+        print(f"skipped {path}: {message}", file=sys.stderr)
+
+    async def run():
+        await server.start()
+        print(f"Serving {len(server.store.summaries())} packages on http://{server.host}:{server.port}",
+              file=sys.stderr)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Grading Module
+Evaluate answer records against a reading package without any GUI dependency
+"""
+import hashlib
+import json
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+from models import (
+    ReadingPackage, AnswerRecord, EvaluationResult, FeedbackItem,
+    IELTSScoringRules, QuestionType
+)
+from scoring import BandTable, get_scoring_table, table_for_rules
+from answer_equivalence import DEFAULT_RULES, Canonicalizer, WordLimit, get_canonicalizer, parse_word_limit
+
+
+# Completion types whose answers are free text; the other types are letters or fixed labels
+FREE_TEXT_TYPES = frozenset({QuestionType.TYPE8, QuestionType.TYPE9, QuestionType.TYPE10, QuestionType.TYPE11})
+
+# FeedbackItem.reason values
+REASON_WRONG_ANSWER = 'wrong_answer'
+REASON_WORD_LIMIT = 'word_limit'
+REASON_TEXT = {
+    REASON_WRONG_ANSWER: "wrong answer",
+    REASON_WORD_LIMIT: "over the word limit",
+}
+
+
+def normalize_answer(answer: str) -> str:
+    """Normalize answer for comparison"""
+    if not answer:
+        return ""
+
+    # Convert to lowercase and strip whitespace
+    normalized = answer.lower().strip()
+
+    # Remove common punctuation
+    for char in ['.', ',', '!', '?', ';', ':']:
+        normalized = normalized.replace(char, '')
+
+    return normalized
+
+
+class CompiledQuestion:
+    """One question of an answer key with every canonical answer it accepts"""
+    __slots__ = ('question_id', 'correct_answer', 'accepted', 'free_text', 'word_limit')
+
+    def __init__(self, question_id: str, correct_answer: str, accepted: FrozenSet[str], free_text: bool,
+                 word_limit: Optional[WordLimit] = None):
+        self.question_id = question_id
+        self.correct_answer = correct_answer
+        self.accepted = accepted
+        self.free_text = free_text
+        self.word_limit = word_limit
+
+    def signature(self) -> Tuple:
+        """Everything that decides whether an answer is correct; equal signatures grade alike"""
+        limit = (self.word_limit.max_words, self.word_limit.allow_number) if self.word_limit else None
+        return self.free_text, tuple(sorted(self.accepted)), limit
+
+
+class AnswerKey:
+    """A package's answers compiled once; grading an answer is one canonicalization and a set lookup"""
+
+    def __init__(self, questions: List[CompiledQuestion], canonicalizer: Canonicalizer):
+        self.questions = questions
+        self.canonicalizer = canonicalizer
+        self._fingerprint: Optional[str] = None
+
+    @property
+    def fingerprint(self) -> str:
+        """Short hash of every question signature and the equivalence rules; identifies a key version"""
+        if self._fingerprint is None:
+            content = [list(self.canonicalizer.rules)] + [[q.question_id, *q.signature()] for q in self.questions]
+            self._fingerprint = hashlib.sha256(
+                json.dumps(content, separators=(',', ':')).encode('utf-8')).hexdigest()[:16]
+        return self._fingerprint
+
+    def grade(self, question: CompiledQuestion, user_answer: str) -> str:
+        """Empty string when the answer is correct, otherwise the REASON_* it was rejected for"""
+        if not question.free_text:
+            return "" if normalize_answer(user_answer) in question.accepted else REASON_WRONG_ANSWER
+        canonical, words, numbers = self.canonicalizer.analyze(user_answer)
+        if question.word_limit is not None and not question.word_limit.accepts(words, numbers):
+            return REASON_WORD_LIMIT
+        return "" if canonical in question.accepted else REASON_WRONG_ANSWER
+
+
+def compile_answer_key(package: ReadingPackage, rules: Sequence[str] = DEFAULT_RULES) -> AnswerKey:
+    """Compile the answer key of a package; reuse it when grading many sessions"""
+    canonicalizer = get_canonicalizer(rules)
+    questions = []
+    for qg in package.question_groups:
+        free_text = qg.type in FREE_TEXT_TYPES
+        word_limit = parse_word_limit(qg.explanation) if free_text else None
+        for question in qg.questions:
+            if free_text:
+                accepted = canonicalizer.key_forms(question.answer)
+            else:
+                accepted = frozenset({normalize_answer(question.answer)})
+            questions.append(CompiledQuestion(question.question_id, question.answer, accepted, free_text,
+                                              word_limit))
+    return AnswerKey(questions, canonicalizer)
+
+
+def band_for_score(correct_count: int, scoring_rules: IELTSScoringRules) -> float:
+    """Look up the band score for a raw score"""
+    return table_for_rules(scoring_rules.mapping).band(correct_count)
+
+
+def evaluate_answers(package: ReadingPackage, answer_records: Iterable[AnswerRecord],
+                     scoring_rules: Optional[IELTSScoringRules] = None,
+                     answer_key: Optional[AnswerKey] = None,
+                     scoring_table: Optional[BandTable] = None,
+                     scaling: str = 'prorate') -> EvaluationResult:
+    """Evaluate user's answers; pass a compiled answer_key when grading many sessions of one package
+
+    The band comes from scoring_table (default: Academic), or from scoring_rules when given,
+    adapted to the number of questions in the package with the given scaling mode.
+    """
+    result = EvaluationResult()
+
+    if scoring_table is None:
+        scoring_table = table_for_rules(scoring_rules.mapping) if scoring_rules else get_scoring_table()
+
+    # Create answer lookup
+    answer_lookup: Dict[str, AnswerRecord] = {
+        ar.question_id: ar for ar in answer_records
+    }
+
+    if answer_key is None:
+        answer_key = compile_answer_key(package)
+
+    result.total_questions = len(answer_key.questions)
+
+    # Evaluate each question
+    for question in answer_key.questions:
+        feedback = FeedbackItem(
+            question_id=question.question_id,
+            is_correct=False,
+            correct_answer=question.correct_answer,
+            user_answer=None
+        )
+
+        # Get user's answer
+        user_record = answer_lookup.get(question.question_id)
+        user_answer = user_record.user_answer if user_record else None
+        feedback.user_answer = user_answer
+
+        if user_answer:
+            feedback.reason = answer_key.grade(question, user_answer)
+            if not feedback.reason:
+                feedback.is_correct = True
+                result.correct_count += 1
+            else:
+                result.incorrect_count += 1
+        else:
+            result.unanswered_count += 1
+
+        result.per_question_feedback.append(feedback)
+
+    # Calculate band score
+    result.band_score = scoring_table.for_test(result.total_questions, scaling).band(result.correct_count)
+    return result
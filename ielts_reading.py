@@ -0,0 +1,267 @@
+"""
+IELTS Reading Command Line Interface
+Validate, grade, convert and summarize packages without opening any window
+
+Usage: python -m ielts_reading <validate|grade|convert|stats|serve|regrade> [options]
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Dict
+
+
+# Commands import their modules lazily so the CLI starts quickly and never loads tkinter.
+
+def cmd_validate(args) -> int:
+    from package_validation import validate_paths
+
+    try:
+        report = validate_paths(args.paths, jobs=args.jobs, cache_path=args.cache,
+                                rule_names=args.rules, plugins=args.plugin,
+                                exclude=[args.report] if args.report else [])
+    except ValueError as e:
+        print(f"validate: {e}", file=sys.stderr)
+        return 1
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        for package in report['packages']:
+            for issue in package['issues']:
+                where = f" group {issue['group']}" if issue['group'] else ""
+                question = f" [{issue['question_id']}]" if issue['question_id'] else ""
+                print(f"{package['path']}:{where}{question} {issue['severity']}: "
+                      f"{issue['message']} ({issue['rule']})")
+        print(f"Checked {report['checked']} packages ({report['cached']} unchanged), "
+              f"{report['failed']} with errors")
+    return 1 if report['failed'] else 0
+
+
+def resolve_scoring_table(name: str):
+    """A registered table name, or a JSON file of {"raw score": band}"""
+    from scoring import get_scoring_table, load_scoring_table
+
+    if name.lower().endswith('.json'):
+        with open(name, 'r', encoding='utf-8') as f:
+            return load_scoring_table(os.path.splitext(os.path.basename(name))[0], json.load(f))
+    return get_scoring_table(name)
+
+
+def scoring_table_or_error(name: str, command: str):
+    """resolve_scoring_table(); None after printing the reason to stderr"""
+    try:
+        return resolve_scoring_table(name)
+    except (OSError, ValueError) as e:
+        print(f"{command}: {e}", file=sys.stderr)
+        return None
+
+
+def cmd_grade(args) -> int:
+    from results_export import load_packages, open_result_writer, export_sessions
+
+    scoring_table = scoring_table_or_error(args.scoring, 'grade')
+    if scoring_table is None:
+        return 1
+    packages = load_packages(args.packages)
+    question_columns = max((sum(len(qg.questions) for qg in p.question_groups)
+                            for p in packages.values()), default=40)
+    errors = []
+    with open_result_writer(args.output, args.format, question_columns,
+                            append=not args.overwrite) as writer:
+        count = 0
+        for path in args.sessions:
+            count = export_sessions(path, packages, writer, errors, scoring_table, args.scaling)
+
+    for path, message in errors:
+        print(f"skipped {path}: {message}", file=sys.stderr)
+    if args.output != '-':
+        print(f"Graded {count} sessions into {args.output}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def cmd_convert(args) -> int:
+    from models import ReadingPackage
+
+    package = ReadingPackage.load_from_file(args.source)
+    package.save_to_file(args.destination, indent=None if args.compact else 2)
+    print(f"Converted {args.source} -> {args.destination}")
+    return 0
+
+
+def package_stats(package) -> Dict:
+    """Size and question-type breakdown of one package"""
+    rc = package.reading_content
+    by_type: Dict[str, int] = {}
+    for qg in package.question_groups:
+        by_type[qg.type.value] = by_type.get(qg.type.value, 0) + len(qg.questions)
+    return {
+        'package_id': package.package_id,
+        'title': rc.title,
+        'paragraphs': len(rc.paragraphs),
+        'words': sum(len(p.body.split()) + len(p.title.split()) for p in rc.paragraphs),
+        'groups': len(package.question_groups),
+        'questions': sum(by_type.values()),
+        'by_type': by_type,
+    }
+
+
+def results_stats(path: str) -> Dict:
+    """Aggregate a JSON Lines results log without loading it all at once"""
+    count = 0
+    band_total = 0.0
+    correct_total = 0
+    question_total = 0
+    bands: Dict[str, int] = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            count += 1
+            band_total += record.get('band_score', 0.0)
+            correct_total += record.get('correct_count', 0)
+            question_total += record.get('total_questions', 0)
+            band = str(record.get('band_score', 0.0))
+            bands[band] = bands.get(band, 0) + 1
+    return {
+        'results': count,
+        'mean_band': round(band_total / count, 2) if count else 0.0,
+        'accuracy': round(correct_total / question_total * 100, 1) if question_total else 0.0,
+        'band_distribution': dict(sorted(bands.items(), key=lambda item: float(item[0]))),
+    }
+
+
+def cmd_stats(args) -> int:
+    from models import ReadingPackage
+    from package_validation import iter_package_paths
+
+    report = {'packages': [package_stats(ReadingPackage.load_from_file(path))
+                           for path in iter_package_paths(args.paths)]}
+    if args.results:
+        report['results'] = results_stats(args.results)
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return 0
+
+    for stats in report['packages']:
+        print(f"{stats['title'] or stats['package_id']}: {stats['paragraphs']} paragraphs, "
+              f"{stats['words']} words, {stats['groups']} groups, {stats['questions']} questions")
+        for type_name, count in stats['by_type'].items():
+            print(f"    {type_name}: {count}")
+    if 'results' in report:
+        results = report['results']
+        print(f"Results: {results['results']}, mean band {results['mean_band']}, "
+              f"accuracy {results['accuracy']}%")
+        for band, count in results['band_distribution'].items():
+            print(f"    band {band}: {count}")
+    return 0
+
+
+def cmd_serve(args) -> int:
+    from exam_server import main as serve_main
+
+    argv = ['--packages', args.packages, '--results', args.results,
+            '--host', args.host, '--port', str(args.port)]
+    return serve_main(argv)
+
+
+def cmd_regrade(args) -> int:
+    from models import ReadingPackage
+    from results_store import ResultsStore, default_store_path
+    from regrade import regrade_package
+
+    old_package = ReadingPackage.load_from_file(args.old)
+    new_package = ReadingPackage.load_from_file(args.new)
+    if old_package.package_id != new_package.package_id:
+        print(f"{args.old} and {args.new} are different packages", file=sys.stderr)
+        return 1
+    scoring_table = scoring_table_or_error(args.scoring, 'regrade')
+    if scoring_table is None:
+        return 1
+    with ResultsStore(args.store or default_store_path()) as store:
+        report = regrade_package(store, old_package, new_package, scoring_table=scoring_table,
+                                 scaling=args.scaling)
+    print(f"Changed questions: {', '.join(report.changed_questions) or 'none'}")
+    print(f"Re-graded {report.answers_checked} answers: {report.answers_changed} changed, "
+          f"{report.attempts_changed} attempts rescored, {report.attempts_retagged} tagged "
+          f"with key version {report.key_version}")
+    if report.attempts_skipped:
+        print(f"regrade: {len(report.attempts_skipped)} attempts answer questions the new package does not have "
+              f"and were left as they are (ids {', '.join(map(str, report.attempts_skipped))})", file=sys.stderr)
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='ielts_reading', description="IELTS Reading package tools")
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    validate = commands.add_parser('validate', help="lint package files or directories")
+    validate.add_argument('paths', nargs='+')
+    validate.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                          help="worker processes (default: CPU count)")
+    validate.add_argument('--cache', help="cache file; packages whose hash is unchanged are skipped")
+    validate.add_argument('--rules', nargs='+', help="run only these rules")
+    validate.add_argument('--plugin', action='append', default=[],
+                          help="import a module that registers extra rules")
+    validate.add_argument('--report', help="write the machine-readable report to a file")
+    validate.add_argument('--json', action='store_true', help="print the machine-readable report")
+    validate.set_defaults(func=cmd_validate)
+
+    grade = commands.add_parser('grade', help="grade answer session files into results")
+    grade.add_argument('sessions', nargs='+', help="answer session files or directories")
+    grade.add_argument('--packages', required=True, help="package file or directory of packages")
+    grade.add_argument('-o', '--output', default='-', help="results file (.jsonl or .csv, default stdout)")
+    grade.add_argument('--format', choices=['jsonl', 'csv'])
+    grade.add_argument('--overwrite', action='store_true', help="replace output instead of appending")
+    grade.add_argument('--scoring', default='academic',
+                       help="band table: academic, general, or a JSON file of {raw score: band}")
+    grade.add_argument('--scaling', choices=['prorate', 'linear', 'raw'], default='prorate',
+                       help="how bands are adapted to tests that are not 40 questions long")
+    grade.set_defaults(func=cmd_grade)
+
+    convert = commands.add_parser('convert', help="convert a package between .json and .json.gz")
+    convert.add_argument('source')
+    convert.add_argument('destination')
+    convert.add_argument('--compact', action='store_true', help="write minified JSON")
+    convert.set_defaults(func=cmd_convert)
+
+    stats = commands.add_parser('stats', help="summarize packages and result logs")
+    stats.add_argument('paths', nargs='*', default=[])
+    stats.add_argument('--results', help="JSON Lines results log")
+    stats.add_argument('--json', action='store_true')
+    stats.set_defaults(func=cmd_stats)
+
+    serve = commands.add_parser('serve', help="serve packages to exam clients and grade submissions")
+    serve.add_argument('packages', help="directory of package files")
+    serve.add_argument('--results', default='results.jsonl', help="JSON Lines results log")
+    serve.add_argument('--host', default='127.0.0.1', help="interface to bind (0.0.0.0 for a lab network)")
+    serve.add_argument('--port', type=int, default=8765)
+    serve.set_defaults(func=cmd_serve)
+
+    regrade = commands.add_parser('regrade', help="apply a corrected answer key to stored attempts")
+    regrade.add_argument('old', help="package file as the stored attempts were graded")
+    regrade.add_argument('new', help="corrected package file")
+    regrade.add_argument('--store', help="results store (default: the application's own)")
+    regrade.add_argument('--scoring', default='academic',
+                         help="band table: academic, general, or a JSON file of {raw score: band}")
+    regrade.add_argument('--scaling', choices=['prorate', 'linear', 'raw'], default='prorate')
+    regrade.set_defaults(func=cmd_regrade)
+    return parser
+
+
+def main(argv=None) -> int:
+    """Command line entry point"""
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Instrumentation
+Nested timing spans and counters exported as Chrome trace-event JSON (chrome://tracing, Perfetto)
+
+Tracing is off unless $IELTS_TRACE is set (a trace file path, or 1 for a timestamped file
+under app_home()/traces) or main.py is started with --trace. The decision is taken when a
+function is decorated: with tracing off @traced returns the function itself and span()
+returns a shared no-op context, so instrumented code runs exactly as before. Turn tracing
+on before the instrumented modules are imported.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+
+TRACE_ENV = 'IELTS_TRACE'
+MAX_EVENTS = 1_000_000  # spans past this are counted in 'dropped_spans' instead of kept
+
+
+class Tracer:
+    """Collects complete-span events from any thread"""
+
+    def __init__(self, max_events: int = MAX_EVENTS):
+        self.max_events = max_events
+        self.events: List[Dict] = []
+        self.counters: Dict[str, int] = {}
+        self.pid = os.getpid()
+        self._origin = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+    def add_span(self, name: str, start_ns: int, end_ns: int, args: Optional[Dict] = None):
+        event = {'name': name, 'ph': 'X', 'pid': self.pid, 'tid': threading.get_ident(),
+                 'ts': (start_ns - self._origin) / 1000, 'dur': (end_ns - start_ns) / 1000}
+        if args:
+            event['args'] = args
+        with self._lock:
+            if len(self.events) >= self.max_events:
+                self.counters['dropped_spans'] = self.counters.get('dropped_spans', 0) + 1
+                return
+            self.events.append(event)
+            if self.counters:
+                # Counter track sampled at the end of every span
+                self.events.append({'name': 'counters', 'ph': 'C', 'pid': self.pid, 'tid': event['tid'],
+                                    'ts': event['ts'] + event['dur'], 'args': dict(self.counters)})
+
+    def to_chrome_trace(self) -> Dict:
+        with self._lock:
+            return {'traceEvents': list(self.events), 'displayTimeUnit': 'ms',
+                    'otherData': {'counters': dict(self.counters)}}
+
+    def export(self, filepath: str):
+        from models import atomic_write
+
+        with atomic_write(filepath) as f:
+            json.dump(self.to_chrome_trace(), f, separators=(',', ':'))
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start', 'counters')
+
+    def __init__(self, tracer: Tracer, name: str, args: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.counters = self.tracer.snapshot()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        # Counters that moved inside the span, nested spans included
+        for name, value in self.tracer.snapshot().items():
+            delta = value - self.counters.get(name, 0)
+            if delta:
+                self.args[name] = delta
+        self.tracer.add_span(self.name, self.start, end, self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+_tracer: Optional[Tracer] = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, **args):
+    """Time a block: with span('parse', paragraphs=12): ..."""
+    if _tracer is None:
+        return NULL_SPAN
+    return _Span(_tracer, name, args)
+
+
+def count(name: str, amount: int = 1):
+    if _tracer is not None:
+        _tracer.count(name, amount)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator timing every call; a no-op when tracing was off at decoration time"""
+    def decorate(func):
+        if _tracer is None:
+            return func
+        label = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Span(_tracer, label, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def default_trace_path() -> str:
+    from app_paths import data_dir
+
+    return os.path.join(data_dir('traces'), f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+
+
+def enable(filepath: Optional[str] = None) -> Tracer:
+    """Start tracing; the trace is written to filepath when the process exits"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+        filepath = filepath or default_trace_path()
+
+        def export_at_exit():
+            _tracer.export(filepath)
+            print(f"Trace written to {filepath}", file=sys.stderr)
+        atexit.register(export_at_exit)
+    return _tracer
+
+
+def enable_from_environment() -> Optional[Tracer]:
+    value = os.environ.get(TRACE_ENV, '').strip()
+    if not value or value.lower() in ('0', 'false', 'no', 'off'):
+        return None
+    return enable(None if value.lower() in ('1', 'true', 'yes', 'on') else value)
+
+
+def instrument_tkinter():
+    """Count widgets created, text tags configured and canvas items drawn (tracing must be on)"""
+    import tkinter as tk
+
+    if _tracer is None or getattr(tk.BaseWidget, '_ielts_instrumented', False):
+        return
+
+    def counting(method, counter):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            _tracer.count(counter)
+            return method(*args, **kwargs)
+        return wrapper
+
+    tk.BaseWidget.__init__ = counting(tk.BaseWidget.__init__, 'widgets_created')
+    tk.Text.tag_configure = tk.Text.tag_config = counting(tk.Text.tag_configure, 'tags_configured')
+    tk.Canvas._create = counting(tk.Canvas._create, 'canvas_items')
+    tk.BaseWidget._ielts_instrumented = True
+
+
+enable_from_environment()
@@ -0,0 +1,177 @@
+"""
+Item Statistics
+Streaming item analysis (facility, discrimination, distractors) updated once per graded result
+
+Each question keeps running moments of its item score x (1 correct, 0 otherwise) and the
+candidate's rest score y (correct answers on the other questions). Welford-style updates give
+    facility        mean of x (the item's p-value)
+    discrimination  point-biserial correlation of x with y (corrected item-total)
+without ever revisiting stored results. Choice questions (multiple choice and the matching
+types) also count how often each option was chosen.
+
+Statistics are kept per package, answer-key fingerprint and question id, so editing a
+package (which can renumber question ids or change answers) starts fresh statistics
+instead of merging different questions.
+"""
+import json
+import math
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+from models import ReadingPackage, EvaluationResult, QuestionType, atomic_write
+from grading import AnswerKey, compile_answer_key, normalize_answer
+from app_paths import data_dir
+
+
+CHOICE_TYPES = frozenset({QuestionType.TYPE1, QuestionType.TYPE4, QuestionType.TYPE5,
+                          QuestionType.TYPE6, QuestionType.TYPE7})
+MAX_OPTIONS = 16           # distinct options tracked per question; the rest count as OTHER_OPTION
+OTHER_OPTION = '*other*'
+UNANSWERED_OPTION = ''
+STATISTICS_FILENAME = 'item_statistics.json'
+STATISTICS_VERSION = 2     # version 1 keyed items by question id alone
+
+
+def item_key(package_id: str, fingerprint: str, question_id: str) -> str:
+    return f"{package_id}:{fingerprint}:{question_id}"
+
+
+class ItemStat:
+    """Running moments of one question"""
+    __slots__ = ('count', 'mean_x', 'mean_y', 'm2_x', 'm2_y', 'c_xy', 'options')
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+        self.options: Optional[Dict[str, int]] = None
+
+    def add(self, x: float, y: float):
+        self.count += 1
+        dx = x - self.mean_x
+        self.mean_x += dx / self.count
+        dy = y - self.mean_y
+        self.mean_y += dy / self.count
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c_xy += dx * (y - self.mean_y)
+
+    def count_option(self, option: str):
+        if self.options is None:
+            self.options = {}
+        if option not in self.options and len(self.options) >= MAX_OPTIONS:
+            option = OTHER_OPTION
+        self.options[option] = self.options.get(option, 0) + 1
+
+    @property
+    def facility(self) -> float:
+        return self.mean_x
+
+    @property
+    def discrimination(self) -> Optional[float]:
+        """None until both the item and the rest score vary"""
+        if self.m2_x <= 0 or self.m2_y <= 0:
+            return None
+        return self.c_xy / math.sqrt(self.m2_x * self.m2_y)
+
+    def distractors(self, key: str = "") -> List[Tuple[str, int]]:
+        """Chosen options other than the key, most frequent first"""
+        return sorted(((option, count) for option, count in (self.options or {}).items()
+                       if option != key), key=lambda item: (-item[1], item[0]))
+
+    def to_list(self) -> List:
+        row = [self.count, self.mean_x, self.mean_y, self.m2_x, self.m2_y, self.c_xy]
+        if self.options is not None:
+            row.append(self.options)
+        return row
+
+    @staticmethod
+    def from_list(row: List) -> 'ItemStat':
+        stat = ItemStat()
+        stat.count, stat.mean_x, stat.mean_y, stat.m2_x, stat.m2_y, stat.c_xy = row[:6]
+        stat.options = dict(row[6]) if len(row) > 6 else None
+        return stat
+
+
+class ItemStatistics:
+    """ItemStat per (package, answer key, question); update() costs O(questions in the package)"""
+
+    def __init__(self):
+        self.items: Dict[str, ItemStat] = {}
+        self.results = 0
+
+    @staticmethod
+    def _fingerprint(package: ReadingPackage, answer_key: Optional[AnswerKey]) -> str:
+        return (answer_key or compile_answer_key(package)).fingerprint
+
+    def update(self, result: EvaluationResult, package: ReadingPackage, answer_key: Optional[AnswerKey] = None):
+        """Fold one graded result of package in; pass the compiled answer key when there is one"""
+        fingerprint = self._fingerprint(package, answer_key)
+        choices = frozenset(q.question_id for qg in package.question_groups
+                            if qg.type in CHOICE_TYPES for q in qg.questions)
+        total = result.correct_count
+        for feedback in result.per_question_feedback:
+            key = item_key(package.package_id, fingerprint, feedback.question_id)
+            stat = self.items.get(key)
+            if stat is None:
+                stat = self.items[key] = ItemStat()
+            x = 1.0 if feedback.is_correct else 0.0
+            stat.add(x, total - x)
+            if feedback.question_id in choices:
+                stat.count_option(normalize_answer(feedback.user_answer or "").upper() or UNANSWERED_OPTION)
+        self.results += 1
+
+    def get(self, package: ReadingPackage, question_id: str,
+            answer_key: Optional[AnswerKey] = None) -> Optional[ItemStat]:
+        """Statistics of a question under the package's current answer key"""
+        return self.items.get(item_key(package.package_id, self._fingerprint(package, answer_key), question_id))
+
+    def report(self, package: ReadingPackage) -> Iterator[Dict]:
+        """One row per question of the package, in package order"""
+        fingerprint = self._fingerprint(package, None)
+        for qg in package.question_groups:
+            for question in qg.questions:
+                stat = self.items.get(item_key(package.package_id, fingerprint, question.question_id))
+                if stat is None:
+                    continue
+                key = normalize_answer(question.answer).upper()
+                yield {
+                    'question_id': question.question_id,
+                    'type': qg.type.value,
+                    'responses': stat.count,
+                    'facility': round(stat.facility, 3),
+                    'discrimination': None if stat.discrimination is None else round(stat.discrimination, 3),
+                    'distractors': stat.distractors(key) if stat.options is not None else [],
+                }
+
+    def to_dict(self) -> Dict:
+        return {'version': STATISTICS_VERSION, 'results': self.results,
+                'items': {key: stat.to_list() for key, stat in self.items.items()}}
+
+    @staticmethod
+    def from_dict(data: Dict) -> 'ItemStatistics':
+        """Statistics saved by this version; older files cannot be attributed to a key and start empty"""
+        statistics = ItemStatistics()
+        if data.get('version') != STATISTICS_VERSION:
+            return statistics
+        statistics.results = data.get('results', 0)
+        statistics.items = {key: ItemStat.from_list(row) for key, row in data.get('items', {}).items()}
+        return statistics
+
+    def save(self, filepath: str):
+        with atomic_write(filepath) as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+
+    @staticmethod
+    def load(filepath: str) -> 'ItemStatistics':
+        """Saved statistics, or empty ones when the file does not exist yet"""
+        if not os.path.exists(filepath):
+            return ItemStatistics()
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return ItemStatistics.from_dict(json.load(f))
+
+
+def default_statistics_path() -> str:
+    return os.path.join(data_dir('statistics'), STATISTICS_FILENAME)
@@ -108,7 +108,9 @@ class MainLauncher:
         try:
             import exam_engine
             exam_window = tk.Toplevel(self.root)
-            exam_engine.ExamEngineWindow(exam_window)
+            exam_engine.ExamEngineWindow(exam_window,
+                                         server_url=os.environ.get('IELTS_EXAM_SERVER'),
+                                         candidate_id=os.environ.get('IELTS_CANDIDATE_ID', ''))
         except Exception as e:
             messagebox.showerror("Error", f"Failed to launch Exam Engine:\n{str(e)}")
     
@@ -331,8 +333,27 @@ D. It was too slow"""
                 messagebox.showerror("Error", f"Failed to create sample package:\n{str(e)}")
 
 
-def main():
+def main(argv=None):
     """Main entry point"""
+    import argparse
+    parser = argparse.ArgumentParser(description="IELTS Reading Test Application")
+    parser.add_argument('--trace', nargs='?', const='', metavar='PATH',
+                        help="record a Chrome trace of load/render/grade timings, written on exit "
+                             "(default: a timestamped file under ~/.ielts_reading/traces)")
+    args = parser.parse_args(argv)
+
+    # Tracing has to be on before the instrumented modules are imported
+    import instrumentation
+    if args.trace is not None:
+        instrumentation.enable(args.trace or None)
+    if instrumentation.enabled():
+        instrumentation.instrument_tkinter()
+
+    # Resume uploading results left in the outbox by earlier runs
+    from result_outbox import default_outbox
+    server_url = os.environ.get('IELTS_EXAM_SERVER')
+    default_outbox(server_url.rstrip('/') + '/results' if server_url else None)
+
     root = tk.Tk()
     app = MainLauncher(root)
     root.mainloop()
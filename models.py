@@ -6,7 +6,12 @@ from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
+from contextlib import contextmanager
+import gzip
 import json
+import os
+import tempfile
+from instrumentation import traced
 
 
 class QuestionType(Enum):
@@ -29,18 +34,28 @@ class Paragraph:
     """Represents a paragraph in reading content"""
     title: str = ""
     body: str = ""
+    # Formatting as flat [start, length, style_id, ...] runs (see style_runs.py)
+    title_runs: List[int] = field(default_factory=list)
+    body_runs: List[int] = field(default_factory=list)
     
     def to_dict(self) -> Dict:
-        return {
+        data = {
             'title': self.title,
             'body': self.body
         }
+        if self.title_runs:
+            data['title_runs'] = self.title_runs
+        if self.body_runs:
+            data['body_runs'] = self.body_runs
+        return data
     
     @staticmethod
     def from_dict(data: Dict) -> 'Paragraph':
         return Paragraph(
             title=data.get('title', ''),
-            body=data.get('body', '')
+            body=data.get('body', ''),
+            title_runs=list(data.get('title_runs', [])),
+            body_runs=list(data.get('body_runs', []))
         )
 
 
@@ -173,19 +188,77 @@ class ReadingPackage:
             created_at=datetime.fromisoformat(data.get('created_at', datetime.now().isoformat()))
         )
     
-    def save_to_file(self, filepath: str):
-        """Save package to JSON file"""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+    def save_to_file(self, filepath: str, indent: Optional[int] = 2):
+        """Save package to JSON file (gzip-compressed when the name ends in .gz)"""
+        write_package_data(self.to_dict(), filepath, indent)
     
     @staticmethod
+    @traced()
     def load_from_file(filepath: str) -> 'ReadingPackage':
-        """Load package from JSON file"""
-        with open(filepath, 'r', encoding='utf-8') as f:
+        """Load package from JSON file (gzip-compressed when the name ends in .gz)"""
+        with open_package_file(filepath, 'r') as f:
             data = json.load(f)
         return ReadingPackage.from_dict(data)
 
 
+def open_package_file(filepath: str, mode: str):
+    """Open a package file for text reading or writing, transparently handling .gz"""
+    if filepath.lower().endswith('.gz'):
+        return gzip.open(filepath, mode + 't', encoding='utf-8')
+    return open(filepath, mode, encoding='utf-8')
+
+
+@contextmanager
+def atomic_write(filepath: str):
+    """Write a text file via a temp file in the same directory, fsync, then rename over the target
+
+    Readers and crashes only ever see the old or the new complete file.
+    Names ending in .gz are gzip-compressed.
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, temp_path = tempfile.mkstemp(prefix='.' + os.path.basename(filepath) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as raw:
+            if filepath.lower().endswith('.gz'):
+                with gzip.open(raw, 'wt', encoding='utf-8') as f:
+                    yield f
+            else:
+                with open(raw.fileno(), 'w', encoding='utf-8', closefd=False) as f:
+                    yield f
+            raw.flush()
+            os.fsync(raw.fileno())
+        # mkstemp creates 0600 files; keep the permissions the target already had
+        try:
+            os.chmod(temp_path, os.stat(filepath).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(temp_path, 0o644)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    # Persist the rename itself; not supported on every platform
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def write_package_data(data: Dict, filepath: str, indent: Optional[int] = 2):
+    """Atomically write an already-built package dict; safe to call from a worker thread"""
+    with atomic_write(filepath) as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False,
+                  separators=None if indent is not None else (',', ':'))
+
+
 @dataclass
 class AnswerRecord:
     """Records user's answer to a question"""
@@ -199,6 +272,56 @@ class AnswerRecord:
             'user_answer': self.user_answer,
             'timestamp': self.timestamp.isoformat()
         }
+    
+    @staticmethod
+    def from_dict(data: Dict) -> 'AnswerRecord':
+        timestamp = data.get('timestamp')
+        return AnswerRecord(
+            question_id=data.get('question_id', ''),
+            user_answer=data.get('user_answer'),
+            timestamp=datetime.fromisoformat(timestamp) if timestamp else datetime.now()
+        )
+
+
+@dataclass
+class AnswerSession:
+    """A candidate's submitted answers for one package"""
+    session_id: str = ""
+    candidate_id: str = ""
+    package_id: str = ""
+    answers: List[AnswerRecord] = field(default_factory=list)
+    submitted_at: datetime = field(default_factory=datetime.now)
+    
+    def to_dict(self) -> Dict:
+        return {
+            'session_id': self.session_id,
+            'candidate_id': self.candidate_id,
+            'package_id': self.package_id,
+            'answers': [a.to_dict() for a in self.answers],
+            'submitted_at': self.submitted_at.isoformat()
+        }
+    
+    @staticmethod
+    def from_dict(data: Dict) -> 'AnswerSession':
+        return AnswerSession(
+            session_id=data.get('session_id', ''),
+            candidate_id=data.get('candidate_id', ''),
+            package_id=data.get('package_id', ''),
+            answers=[AnswerRecord.from_dict(a) for a in data.get('answers', [])],
+            submitted_at=datetime.fromisoformat(data.get('submitted_at', datetime.now().isoformat()))
+        )
+    
+    def save_to_file(self, filepath: str):
+        """Save session to JSON file"""
+        with atomic_write(filepath) as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+    
+    @staticmethod
+    def load_from_file(filepath: str) -> 'AnswerSession':
+        """Load session from JSON file"""
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return AnswerSession.from_dict(data)
 
 
 @dataclass
@@ -216,14 +339,29 @@ class FeedbackItem:
     is_correct: bool
     correct_answer: str
     user_answer: Optional[str]
+    # Why an answer was marked wrong (grading.REASON_*); empty when correct or unanswered
+    reason: str = ""
     
     def to_dict(self) -> Dict:
-        return {
+        data = {
             'question_id': self.question_id,
             'is_correct': self.is_correct,
             'correct_answer': self.correct_answer,
             'user_answer': self.user_answer
         }
+        if self.reason:
+            data['reason'] = self.reason
+        return data
+    
+    @staticmethod
+    def from_dict(data: Dict) -> 'FeedbackItem':
+        return FeedbackItem(
+            question_id=data.get('question_id', ''),
+            is_correct=bool(data.get('is_correct', False)),
+            correct_answer=data.get('correct_answer', ''),
+            user_answer=data.get('user_answer'),
+            reason=data.get('reason', '')
+        )
 
 
 @dataclass
@@ -245,6 +383,17 @@ class EvaluationResult:
             'band_score': self.band_score,
             'per_question_feedback': [f.to_dict() for f in self.per_question_feedback]
         }
+    
+    @staticmethod
+    def from_dict(data: Dict) -> 'EvaluationResult':
+        return EvaluationResult(
+            correct_count=data.get('correct_count', 0),
+            incorrect_count=data.get('incorrect_count', 0),
+            unanswered_count=data.get('unanswered_count', 0),
+            total_questions=data.get('total_questions', 0),
+            band_score=data.get('band_score', 0.0),
+            per_question_feedback=[FeedbackItem.from_dict(f) for f in data.get('per_question_feedback', [])]
+        )
 
 
 @dataclass
@@ -254,15 +403,6 @@ class IELTSScoringRules:
     
     @staticmethod
     def get_academic_rules() -> 'IELTSScoringRules':
-        """Standard IELTS Academic Reading band scores"""
-        mapping = {
-            0: 0.0, 1: 1.0, 2: 2.0, 3: 2.5, 4: 3.0, 5: 3.5,
-            6: 4.0, 7: 4.0, 8: 4.5, 9: 4.5, 10: 5.0,
-            11: 5.0, 12: 5.5, 13: 5.5, 14: 6.0, 15: 6.0,
-            16: 6.5, 17: 6.5, 18: 6.5, 19: 7.0, 20: 7.0,
-            21: 7.0, 22: 7.0, 23: 7.5, 24: 7.5, 25: 8.0,
-            26: 8.0, 27: 8.0, 28: 8.0, 29: 8.5, 30: 8.5,
-            31: 8.5, 32: 8.5, 33: 9.0, 34: 9.0, 35: 9.0,
-            36: 9.0, 37: 9.0, 38: 9.0, 39: 9.0, 40: 9.0
-        }
-        return IELTSScoringRules(mapping=mapping)
+        """Standard IELTS Academic Reading band scores (see scoring.py for the compiled tables)"""
+        from scoring import ACADEMIC_BANDS
+        return IELTSScoringRules(mapping=dict(enumerate(ACADEMIC_BANDS)))
@@ -0,0 +1,189 @@
+"""
+Package Generator
+Deterministic synthetic reading packages for benchmarks and tests
+
+generate_package() scales every part of a package independently: paragraph count, questions
+per type (split into groups of at most 10), table size, flow-chart length and the number of
+freehand strokes in diagram-editor payloads. The same arguments and seed always produce the
+same package, and it passes package validation.
+"""
+import math
+import random
+from datetime import datetime
+from typing import Dict, List, Optional
+from models import (
+    ReadingPackage, ReadingContent, Paragraph, QuestionGroup, Question, QuestionType, AdditionalInput
+)
+from diagram_tools import encode_diagram_payload
+
+
+MAX_GROUP_SIZE = 10
+MIN_GROUP_SIZE = 2
+
+WORDS = ("river", "energy", "harvest", "colour", "market", "glacier", "museum", "engine", "bridge", "climate",
+         "migration", "archive", "pottery", "satellite", "orchard", "festival", "copper", "tunnel", "lantern",
+         "vaccine", "harbour", "library", "algae", "textile", "railway", "monsoon", "telescope", "coral")
+ROMAN = ("i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x", "xi", "xii")
+JUDGEMENTS = {
+    QuestionType.TYPE2: ("TRUE", "FALSE", "NOT GIVEN"),
+    QuestionType.TYPE3: ("YES", "NO", "NOT GIVEN"),
+}
+GENERATED_AT = datetime(2024, 1, 1)  # fixed so that equal arguments give byte-identical packages
+COMPLETION_LIMIT = "Write NO MORE THAN TWO WORDS AND/OR A NUMBER for each answer."
+
+# Four questions of every type (44); a real test has 40 spread over fewer types
+DEFAULT_QUESTIONS = {question_type: 4 for question_type in QuestionType}
+
+
+def split_groups(count: int) -> List[int]:
+    """Group sizes for count questions, each within MIN_GROUP_SIZE..MAX_GROUP_SIZE where possible"""
+    if count <= 0:
+        return []
+    groups = math.ceil(count / MAX_GROUP_SIZE)
+    base, extra = divmod(count, groups)
+    return [base + 1 if index < extra else base for index in range(groups)]
+
+
+class _Builder:
+    def __init__(self, package_id: str, rng: random.Random, paragraphs: int, table_rows: int,
+                 table_columns: int, flowchart_steps: int, diagram_strokes: int, stroke_points: int):
+        self.package_id = package_id
+        self.rng = rng
+        self.paragraphs = paragraphs
+        self.table_rows = max(2, table_rows)
+        self.table_columns = max(2, table_columns)
+        self.flowchart_steps = flowchart_steps
+        self.diagram_strokes = diagram_strokes
+        self.stroke_points = stroke_points
+        self.number = 1      # exam-wide question number of the next question
+        self.completion_groups = 0
+
+    def words(self, count: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(count))
+
+    def sentence(self) -> str:
+        return f"The {self.words(1)} near the {self.words(1)} was studied for {self.rng.randint(2, 90)} years."
+
+    def passage(self) -> ReadingContent:
+        letters = [chr(ord('A') + index % 26) for index in range(self.paragraphs)]
+        return ReadingContent(
+            explanation="You should spend about 20 minutes on the questions based on the passage below.",
+            title=f"Synthetic Passage {self.package_id}",
+            paragraphs=[Paragraph(title=f"{letter}. {self.words(3).title()}",
+                                  body=" ".join(self.sentence() for _ in range(self.rng.randint(4, 8))))
+                        for letter in letters],
+        )
+
+    def questions(self, size: int, answers: List[str], texts: Optional[List[str]] = None) -> List[Question]:
+        questions = []
+        for index in range(size):
+            questions.append(Question(
+                text=texts[index] if texts else f"{self.number}. {self.sentence()}",
+                answer=answers[index],
+                question_id=f"{self.package_id}_q{self.number}",
+            ))
+            self.number += 1
+        return questions
+
+    def group(self, question_type: QuestionType, size: int) -> QuestionGroup:
+        rng = self.rng
+        if question_type == QuestionType.TYPE1:
+            texts = [f"{self.number + index}. Which {self.words(1)} is described?\n"
+                     + "\n".join(f"{letter}. {self.words(2)}" for letter in "ABCD") for index in range(size)]
+            return QuestionGroup("Choose the correct letter, A, B, C or D.", question_type,
+                                 self.questions(size, [rng.choice("ABCD") for _ in range(size)], texts))
+        if question_type in JUDGEMENTS:
+            return QuestionGroup("Do the following statements agree with the information in the passage?",
+                                 question_type,
+                                 self.questions(size, [rng.choice(JUDGEMENTS[question_type]) for _ in range(size)]))
+        if question_type in (QuestionType.TYPE4, QuestionType.TYPE6, QuestionType.TYPE7):
+            keys = [chr(ord('A') + index) for index in range(min(26, max(self.paragraphs, size + 1, 3)))]
+            list_key = {QuestionType.TYPE4: 'infoList', QuestionType.TYPE6: 'featureList',
+                        QuestionType.TYPE7: 'sentenceEndingList'}[question_type]
+            return QuestionGroup(f"Choose the correct letter, {keys[0]}-{keys[-1]}.", question_type,
+                                 self.questions(size, [rng.choice(keys) for _ in range(size)]),
+                                 AdditionalInput(question_type.value,
+                                                 {list_key: [f"{key}. {self.words(3)}" for key in keys]}))
+        if question_type == QuestionType.TYPE5:
+            keys = list(ROMAN[:min(len(ROMAN), size + 2)])
+            return QuestionGroup("Choose the correct heading for each paragraph.", question_type,
+                                 self.questions(size, [rng.choice(keys) for _ in range(size)]),
+                                 AdditionalInput(question_type.value,
+                                                 {'headingList': [f"{key}. {self.words(4).title()}" for key in keys]}))
+        if question_type == QuestionType.TYPE9:
+            return self.completion_group(size)
+        if question_type == QuestionType.TYPE10:
+            diagram = self.diagram(size)  # labels use the numbers of the questions created next
+            return QuestionGroup(f"Label the diagram below. {COMPLETION_LIMIT}", question_type,
+                                 self.questions(size, [self.words(rng.randint(1, 2)) for _ in range(size)]),
+                                 AdditionalInput(question_type.value, {'diagramImage': diagram}))
+        # Sentence completion and short answers
+        return QuestionGroup(COMPLETION_LIMIT, question_type,
+                             self.questions(size, [self.words(rng.randint(1, 2)) for _ in range(size)]))
+
+    def completion_group(self, size: int) -> QuestionGroup:
+        """Summary, table and flow-chart completion in turn, one gap per question"""
+        kind = self.completion_groups % 3
+        self.completion_groups += 1
+        first = self.number
+        answers = [self.words(self.rng.randint(1, 2)) for _ in range(size)]
+        numbers = list(range(first, first + size))
+        if kind == 0:
+            data = {'summaryData': " ".join(f"{self.sentence()} The {self.words(1)} needed [{number}]."
+                                            for number in numbers)}
+        elif kind == 1:
+            rows, cols = max(self.table_rows, math.ceil(size / (self.table_columns - 1)) + 1), self.table_columns
+            content = [[self.words(1).title() for _ in range(cols)]]
+            gaps = iter(numbers)
+            for row in range(1, rows):
+                cells = [self.words(2)]
+                for _ in range(1, cols):
+                    number = next(gaps, None)
+                    cells.append(f"[{number}]" if number is not None else self.words(2))
+                content.append(cells)
+            data = {'tableData': {'rows': rows, 'cols': cols, 'content': content}}
+        else:
+            steps = max(self.flowchart_steps, size)
+            gap_steps = set(self.rng.sample(range(steps), size))
+            gaps = iter(numbers)
+            lines = []
+            for step in range(steps):
+                label = f"the {self.words(1)} is [{next(gaps)}]" if step in gap_steps else self.words(3)
+                lines.append(f"Step {step + 1}: {label}")
+            data = {'flowchartData': "\n".join(lines)}
+        return QuestionGroup(f"Complete the notes below. {COMPLETION_LIMIT}", QuestionType.TYPE9,
+                             self.questions(size, answers), AdditionalInput(QuestionType.TYPE9.value, data))
+
+    def diagram(self, labels: int) -> str:
+        width, height = 900, 550
+        elements = []
+        for _ in range(self.diagram_strokes):
+            x, y = self.rng.uniform(50, width - 50), self.rng.uniform(50, height - 50)
+            points = []
+            for _ in range(self.stroke_points):
+                x = min(width, max(0, x + self.rng.uniform(-6, 6)))
+                y = min(height, max(0, y + self.rng.uniform(-6, 6)))
+                points.append([round(x), round(y)])
+            elements.append({'kind': 'pen', 'points': points, 'color': '#000000', 'width': 2})
+        for index in range(labels):
+            x, y = 60 + (index % 4) * 200, 40 + (index // 4) * 120
+            elements.append({'kind': 'rect', 'coords': [x, y, x + 150, y + 40], 'color': '#2c3e50', 'width': 2})
+            elements.append({'kind': 'text', 'x': x + 10, 'y': y + 10, 'text': f"[{self.number + index}]"})
+        return encode_diagram_payload({'width': width, 'height': height, 'elements': elements})
+
+
+def generate_package(paragraphs: int = 6, questions_per_type: Optional[Dict[QuestionType, int]] = None,
+                     table_rows: int = 5, table_columns: int = 3, flowchart_steps: int = 6,
+                     diagram_strokes: int = 10, stroke_points: int = 40, seed: int = 0,
+                     package_id: Optional[str] = None) -> ReadingPackage:
+    """A synthetic package; questions_per_type defaults to four of every type"""
+    rng = random.Random(seed)
+    package_id = package_id or f"synthetic-{seed}"
+    builder = _Builder(package_id, rng, paragraphs, table_rows, table_columns, flowchart_steps,
+                       diagram_strokes, stroke_points)
+    package = ReadingPackage(package_id=package_id, reading_content=builder.passage(), created_at=GENERATED_AT)
+    counts = DEFAULT_QUESTIONS if questions_per_type is None else questions_per_type
+    for question_type in QuestionType:
+        for size in split_groups(counts.get(question_type, 0)):
+            package.question_groups.append(builder.group(question_type, size))
+    return package
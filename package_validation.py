@@ -0,0 +1,425 @@
+"""
+Package Validation Module
+Pluggable lint rules for reading packages, run in parallel over a content repository
+"""
+import hashlib
+import importlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from models import ReadingPackage, QuestionType, open_package_file
+from blank_index import BlankIndex
+from diagram_tools import DIAGRAM_EDITOR_PREFIX, parse_diagram_payload
+from answer_equivalence import answer_alternatives, get_canonicalizer, parse_word_limit
+from grading import FREE_TEXT_TYPES
+
+
+# Bump when built-in rules change so cached reports are invalidated
+RULESET_VERSION = 3
+
+MATCHING_LISTS = {
+    QuestionType.TYPE4: 'infoList',
+    QuestionType.TYPE5: 'headingList',
+    QuestionType.TYPE6: 'featureList',
+    QuestionType.TYPE7: 'sentenceEndingList',
+}
+
+# "A. Some text", "iv. A heading", "3. An ending"
+OPTION_RE = re.compile(r'\s*([A-Za-z]{1,6}|\d{1,3})\s*\.\s*\S')
+
+IMAGE_SUFFIXES = ('.png', '.gif', '.ppm', '.pgm')
+
+# Files found in a directory are only validated when a package key shows up this early
+SNIFF_CHARS = 64 * 1024
+PACKAGE_KEY_RE = re.compile(r'"(?:reading_content|question_groups)"\s*:')
+
+
+@dataclass
+class ValidationIssue:
+    """A single problem found in a package"""
+    rule: str
+    message: str
+    severity: str = 'error'
+    group: Optional[int] = None
+    question_id: str = ""
+
+    def to_dict(self) -> Dict:
+        return {
+            'rule': self.rule,
+            'severity': self.severity,
+            'message': self.message,
+            'group': self.group,
+            'question_id': self.question_id
+        }
+
+
+class ValidationContext:
+    """Shared state for the rules run against one package"""
+
+    def __init__(self, package: ReadingPackage, path: str = ""):
+        self.package = package
+        self.path = path
+        self.base_dir = os.path.dirname(os.path.abspath(path)) if path else os.getcwd()
+        self.referenced_files: Set[str] = set()  # outside files the rules looked at
+        self._blank_index: Optional[BlankIndex] = None
+
+    @property
+    def blank_index(self) -> BlankIndex:
+        if self._blank_index is None:
+            self._blank_index = BlankIndex.from_package(self.package)
+        return self._blank_index
+
+    def resolve(self, file_path: str) -> str:
+        """Resolve a referenced file relative to the package location; cached reports depend on it"""
+        resolved = os.path.abspath(file_path if os.path.isabs(file_path) else os.path.join(self.base_dir, file_path))
+        self.referenced_files.add(resolved)
+        return resolved
+
+
+RuleFunction = Callable[[ValidationContext], Iterable[ValidationIssue]]
+VALIDATION_RULES: Dict[str, RuleFunction] = {}
+
+
+def validation_rule(name: str):
+    """Register a rule; plugin modules use this decorator at import time"""
+    def register(func: RuleFunction) -> RuleFunction:
+        VALIDATION_RULES[name] = func
+        return func
+    return register
+
+
+def load_rule_plugins(module_names: Iterable[str] = ()):
+    """Import plugin modules so their rules register themselves"""
+    for module_name in module_names:
+        importlib.import_module(module_name)
+
+
+@validation_rule('group-size')
+def check_group_size(ctx: ValidationContext):
+    for index, qg in enumerate(ctx.package.question_groups, start=1):
+        if not qg.validate():
+            yield ValidationIssue('group-size', f"has {len(qg.questions)} questions (expected 2-10)", group=index)
+
+
+@validation_rule('questions')
+def check_questions(ctx: ValidationContext):
+    seen: Dict[str, int] = {}
+    for index, qg in enumerate(ctx.package.question_groups, start=1):
+        for q in qg.questions:
+            if not q.question_id:
+                yield ValidationIssue('questions', "question without question_id", group=index)
+            elif q.question_id in seen:
+                yield ValidationIssue('questions', f"duplicate question_id (first used in group {seen[q.question_id]})",
+                                      group=index, question_id=q.question_id)
+            else:
+                seen[q.question_id] = index
+            if not q.answer.strip():
+                yield ValidationIssue('questions', "question has no answer", group=index, question_id=q.question_id)
+
+
+@validation_rule('word-limit')
+def check_word_limit(ctx: ValidationContext):
+    analyze = get_canonicalizer().analyze
+    for index, qg in enumerate(ctx.package.question_groups, start=1):
+        limit = parse_word_limit(qg.explanation) if qg.type in FREE_TEXT_TYPES else None
+        if limit is None:
+            continue
+        for q in qg.questions:
+            for alternative in answer_alternatives(q.answer):
+                if alternative.strip() and not limit.accepts(*analyze(alternative)[1:]):
+                    yield ValidationIssue('word-limit', f"answer {alternative.strip()!r} breaks the group's word limit",
+                                          group=index, question_id=q.question_id)
+
+
+@validation_rule('blanks')
+def check_blanks(ctx: ValidationContext):
+    index = ctx.blank_index
+    for location in index.unlinked():
+        token = f"[{location.number}]" if location.number is not None else "[BLANK]"
+        yield ValidationIssue('blanks', f"{location.container} gap {token} has no matching question",
+                              group=location.group_index + 1)
+
+    for group_index, qg in enumerate(ctx.package.question_groups):
+        data = qg.additional_inputs.data if qg.additional_inputs else {}
+        if not any(key in data for key in ('summaryData', 'tableData', 'flowchartData')):
+            continue
+        for q in qg.questions:
+            if q.question_id and index.for_question(q.question_id) is None:
+                yield ValidationIssue('blanks', "question has no gap in the summary/table/flow-chart",
+                                      severity='warning', group=group_index + 1, question_id=q.question_id)
+
+
+def parse_option_key(item: str) -> Optional[str]:
+    """Option letter/numeral of a matching list item, or None if it has none"""
+    match = OPTION_RE.match(item)
+    return match.group(1) if match else None
+
+
+@validation_rule('matching-options')
+def check_matching_options(ctx: ValidationContext):
+    for index, qg in enumerate(ctx.package.question_groups, start=1):
+        list_key = MATCHING_LISTS.get(qg.type)
+        if list_key is None:
+            continue
+        items = qg.additional_inputs.data.get(list_key) if qg.additional_inputs else None
+        if not items:
+            yield ValidationIssue('matching-options', f"{qg.type.value} group has no {list_key}", group=index)
+            continue
+
+        keys = set()
+        for item in items:
+            key = parse_option_key(str(item))
+            if key is None:
+                yield ValidationIssue('matching-options', f"option does not start with a letter or numeral: {item!r}",
+                                      group=index)
+            elif key.lower() in keys:
+                yield ValidationIssue('matching-options', f"duplicate option {key!r}", group=index)
+            else:
+                keys.add(key.lower())
+
+        for q in qg.questions:
+            if keys and q.answer.strip().lower() not in keys:
+                yield ValidationIssue('matching-options', f"answer {q.answer!r} is not one of the options",
+                                      group=index, question_id=q.question_id)
+
+
+@validation_rule('diagram-image')
+def check_diagram_images(ctx: ValidationContext):
+    for index, qg in enumerate(ctx.package.question_groups, start=1):
+        if not qg.additional_inputs or 'diagramImage' not in qg.additional_inputs.data:
+            continue
+        value = str(qg.additional_inputs.data['diagramImage']).strip()
+        if value.startswith(DIAGRAM_EDITOR_PREFIX):
+            try:
+                payload = parse_diagram_payload(value)
+            except ValueError:
+                yield ValidationIssue('diagram-image', "diagram editor payload is not valid JSON", group=index)
+                continue
+            background = payload.get('background_path')
+            if background and not os.path.exists(ctx.resolve(background)):
+                yield ValidationIssue('diagram-image', f"diagram background image not found: {background}", group=index)
+        elif value.lower().endswith(IMAGE_SUFFIXES) and not os.path.exists(ctx.resolve(value)):
+            yield ValidationIssue('diagram-image', f"diagram image not found: {value}", group=index)
+
+
+def check_schema(data) -> List[ValidationIssue]:
+    """Structural checks on the raw JSON before it is turned into models"""
+    if not isinstance(data, dict):
+        return [ValidationIssue('schema', "top level must be an object")]
+
+    issues = []
+    if not data.get('package_id'):
+        issues.append(ValidationIssue('schema', "missing package_id"))
+    if not isinstance(data.get('reading_content', {}), dict):
+        issues.append(ValidationIssue('schema', "reading_content must be an object"))
+    groups = data.get('question_groups', [])
+    if not isinstance(groups, list):
+        issues.append(ValidationIssue('schema', "question_groups must be a list"))
+        groups = []
+    try:
+        datetime.fromisoformat(data.get('created_at', datetime.now().isoformat()))
+    except (TypeError, ValueError):
+        issues.append(ValidationIssue('schema', f"created_at is not an ISO timestamp: {data.get('created_at')!r}"))
+
+    known_types = {qt.value for qt in QuestionType}
+    for index, group in enumerate(groups, start=1):
+        if not isinstance(group, dict):
+            issues.append(ValidationIssue('schema', "question group must be an object", group=index))
+        elif group.get('type') not in known_types:
+            issues.append(ValidationIssue('schema', f"unknown question type {group.get('type')!r}", group=index))
+    return issues
+
+
+def validate_package(package: ReadingPackage, path: str = "",
+                     rule_names: Optional[Iterable[str]] = None) -> List[ValidationIssue]:
+    """Run the selected (default: all registered) rules against a package"""
+    return run_rules(ValidationContext(package, path), rule_names)
+
+
+def run_rules(ctx: ValidationContext, rule_names: Optional[Iterable[str]] = None) -> List[ValidationIssue]:
+    names = list(rule_names) if rule_names else sorted(VALIDATION_RULES)
+    issues: List[ValidationIssue] = []
+    for name in names:
+        rule = VALIDATION_RULES.get(name)
+        if rule is None:
+            raise KeyError(f"unknown validation rule {name!r}")
+        issues.extend(rule(ctx))
+    return issues
+
+
+def validate_package_file(path: str, rule_names: Optional[List[str]] = None) -> Dict:
+    """Validate one package file and return a JSON-serializable report
+
+    'files' maps the outside files the rules looked at to file_stamp(); it is kept in the cache only.
+    """
+    issues: List[ValidationIssue] = []
+    referenced: Set[str] = set()
+    try:
+        with open_package_file(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        issues.append(ValidationIssue('schema', f"unreadable: {e}"))
+    else:
+        issues.extend(check_schema(data))
+        if not issues:
+            try:
+                package = ReadingPackage.from_dict(data)
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                issues.append(ValidationIssue('schema', f"invalid structure: {e}"))
+            else:
+                ctx = ValidationContext(package, path)
+                issues.extend(run_rules(ctx, rule_names))
+                referenced = ctx.referenced_files
+
+    return {
+        'path': path,
+        'ok': not any(issue.severity == 'error' for issue in issues),
+        'issues': [issue.to_dict() for issue in issues],
+        'files': {file_path: file_stamp(file_path) for file_path in sorted(referenced)}
+    }
+
+
+def file_stamp(path: str) -> Optional[int]:
+    """Modification time in ns, None for a missing file"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def rules_signature(rule_names: Optional[Iterable[str]] = None) -> str:
+    """Identifies the rule set a cached report was produced with"""
+    names = sorted(rule_names) if rule_names else sorted(VALIDATION_RULES)
+    return f"v{RULESET_VERSION}:" + ",".join(names)
+
+
+class ValidationCache:
+    """Reports keyed by package path, reused while the file hash, rule set and referenced files are unchanged"""
+
+    def __init__(self, filepath: Optional[str]):
+        self.filepath = filepath
+        self.entries: Dict[str, Dict] = {}
+        if filepath and os.path.exists(filepath):
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, path: str, sha256: str, signature: str) -> Optional[Dict]:
+        entry = self.entries.get(os.path.abspath(path))
+        if entry and entry.get('sha256') == sha256 and entry.get('rules') == signature and all(
+                file_stamp(file_path) == stamp for file_path, stamp in entry.get('files', {}).items()):
+            return entry['report']
+        return None
+
+    def put(self, path: str, sha256: str, signature: str, report: Dict, files: Dict[str, Optional[int]]):
+        self.entries[os.path.abspath(path)] = {'sha256': sha256, 'rules': signature, 'report': report,
+                                               'files': files}
+
+    def save(self):
+        if not self.filepath:
+            return
+        with open(self.filepath, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, separators=(',', ':'))
+
+
+def looks_like_package(path: str) -> bool:
+    """A package key near the start of the file; sessions, results and reports have none"""
+    try:
+        with open_package_file(path, 'r') as f:
+            head = f.read(SNIFF_CHARS)
+    except (OSError, ValueError):
+        return True  # reported as unreadable
+    return PACKAGE_KEY_RE.search(head) is not None
+
+
+def iter_package_paths(paths: Iterable[str], exclude: Iterable[str] = ()):
+    """Expand files and directories into package file paths
+
+    Files named directly are always yielded; files found in a directory only when they look
+    like packages and are not in exclude.
+    """
+    excluded = {os.path.abspath(path) for path in exclude}
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    file_path = os.path.join(root, name)
+                    if (name.lower().endswith(('.json', '.json.gz')) and os.path.abspath(file_path) not in excluded
+                            and looks_like_package(file_path)):
+                        yield file_path
+        else:
+            yield path
+
+
+def validate_paths(paths: Iterable[str], jobs: int = 1, cache_path: Optional[str] = None,
+                   rule_names: Optional[List[str]] = None, plugins: Iterable[str] = (),
+                   exclude: Iterable[str] = ()) -> Dict:
+    """Validate every package under paths with a process pool, skipping unchanged files
+
+    The cache file and the exclude paths (e.g. the report file) are never taken for packages.
+    """
+    plugins = list(plugins)
+    load_rule_plugins(plugins)
+    unknown = [name for name in rule_names or () if name not in VALIDATION_RULES]
+    if unknown:
+        raise ValueError(f"unknown validation rule(s): {', '.join(unknown)}; "
+                         f"known rules: {', '.join(sorted(VALIDATION_RULES))}")
+    signature = rules_signature(rule_names)
+    cache = ValidationCache(cache_path)
+
+    reports: Dict[str, Dict] = {}
+    pending: Dict[str, str] = {}
+    order: List[str] = []
+    cached = 0
+    for path in iter_package_paths(paths, [*exclude, *([cache_path] if cache_path else [])]):
+        order.append(path)
+        try:
+            sha256 = file_sha256(path)
+        except OSError as e:
+            reports[path] = {'path': path, 'ok': False,
+                             'issues': [ValidationIssue('schema', f"unreadable: {e}").to_dict()]}
+            continue
+        report = cache.get(path, sha256, signature)
+        if report is not None:
+            reports[path] = dict(report, path=path)
+            cached += 1
+        else:
+            pending[path] = sha256
+
+    pending_paths = list(pending)
+    if jobs > 1 and len(pending_paths) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs, initializer=load_rule_plugins, initargs=(plugins,)) as pool:
+            fresh = list(pool.map(validate_package_file, pending_paths,
+                                  [rule_names] * len(pending_paths), chunksize=16))
+    else:
+        fresh = [validate_package_file(path, rule_names) for path in pending_paths]
+
+    for path, report in zip(pending_paths, fresh):
+        files = report.pop('files')
+        reports[path] = report
+        cache.put(path, pending[path], signature, report, files)
+    cache.save()
+
+    packages = [reports[path] for path in order]
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'rules': signature,
+        'checked': len(packages),
+        'cached': cached,
+        'failed': sum(1 for report in packages if not report['ok']),
+        'packages': packages
+    }
@@ -0,0 +1,160 @@
+"""
+Regrade
+Re-score stored attempts after an answer key correction, touching only the changed questions
+
+The old and new keys are compared compiled, question by question, so edits that cannot
+change a grade (passage text, an equivalent spelling of an answer) select nothing.
+Attempts graded with the old key have only their stored answers to the changed
+questions graded again; attempts graded with any other (or an unknown) key version have
+all their stored answers graded again. Attempt and per-type counts move by the
+difference, the bands of the affected attempts are recomputed with one
+BandTable.bands_for() gather per test length, and every regraded attempt gets an audit
+row naming the key version it is now graded with. Attempts holding questions the new
+key does not have are left alone and reported.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from models import ReadingPackage
+from grading import AnswerKey, compile_answer_key
+from answer_equivalence import DEFAULT_RULES
+from scoring import BandTable, get_scoring_table
+from compact_models import to_epoch_ms
+from results_store import ResultsStore, question_types
+
+
+# Ids per "IN (...)" clause; well under SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+
+@dataclass
+class RegradeReport:
+    """What a regrade changed"""
+    package_id: str
+    key_version: int
+    changed_questions: List[str] = field(default_factory=list)
+    answers_checked: int = 0
+    answers_changed: int = 0
+    attempts_changed: int = 0
+    attempts_retagged: int = 0
+    attempts_skipped: List[int] = field(default_factory=list)  # ids whose questions the new key lacks
+
+
+def changed_questions(old_package: ReadingPackage, old_key: AnswerKey,
+                      new_package: ReadingPackage, new_key: AnswerKey) -> List[str]:
+    """Question ids whose compiled answer differs between two keys of the same package"""
+    if question_types(old_package) != question_types(new_package):
+        raise ValueError("The packages do not have the same questions and question types; "
+                         "grade the answer sessions again instead of regrading")
+    old = {question.question_id: question.signature() for question in old_key.questions}
+    return [question.question_id for question in new_key.questions
+            if question.signature() != old[question.question_id]]
+
+
+def diff_answer_keys(old_package: ReadingPackage, new_package: ReadingPackage,
+                     rules: Sequence[str] = DEFAULT_RULES) -> List[str]:
+    return changed_questions(old_package, compile_answer_key(old_package, rules),
+                             new_package, compile_answer_key(new_package, rules))
+
+
+def _chunks(items: List, size: int = CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def regrade_package(store: ResultsStore, old_package: ReadingPackage, new_package: ReadingPackage,
+                    rules: Sequence[str] = DEFAULT_RULES, scoring_table: Optional[BandTable] = None,
+                    scaling: str = 'prorate') -> RegradeReport:
+    """Apply a corrected answer key to every stored attempt of the package, in one transaction"""
+    old_key = compile_answer_key(old_package, rules)
+    new_key = compile_answer_key(new_package, rules)
+    changed = changed_questions(old_package, old_key, new_package, new_key)
+    scoring_table = scoring_table or get_scoring_table()
+    package_id = new_package.package_id
+    compiled = {question.question_id: question for question in new_key.questions}
+    connection = store.connection
+
+    with connection:
+        report = RegradeReport(package_id, store.key_version(package_id, new_key), changed)
+        old_version = store.key_version(package_id, old_key)
+        select = ("SELECT q.attempt_id, q.question_id, q.type_code, q.user_answer, q.is_correct, q.reason"
+                  " FROM attempt_questions q JOIN attempts a ON a.id = q.attempt_id"
+                  " WHERE a.package_id = ? AND q.user_answer <> ''")
+        # Graded with the old key: only the changed questions can differ
+        queries = [(select + " AND a.key_version = ?"
+                    f" AND q.question_id IN ({','.join('?' * len(question_ids))})",
+                    (package_id, old_version, *question_ids)) for question_ids in _chunks(changed)]
+        # Graded with another or an unknown key: every answer is graded again
+        queries.append((select + " AND a.key_version IS NOT ? AND a.key_version IS NOT ?",
+                        (package_id, old_version, report.key_version)))
+
+        answer_updates: Dict[int, List[Tuple[int, Optional[str], str, int]]] = {}
+        skipped = set()
+        for sql, parameters in queries:
+            for attempt_id, question_id, type_code, user_answer, was_correct, old_reason in \
+                    connection.execute(sql, parameters):
+                question = compiled.get(question_id)
+                if question is None:
+                    skipped.add(attempt_id)
+                    continue
+                report.answers_checked += 1
+                reason = new_key.grade(question, user_answer)
+                is_correct = 0 if reason else 1
+                if is_correct != was_correct or (reason or None) != old_reason:
+                    answer_updates.setdefault(attempt_id, []).append(
+                        (is_correct, reason or None, question_id, is_correct - was_correct, type_code))
+        report.attempts_skipped = sorted(skipped)
+
+        question_updates = []
+        attempt_deltas: Dict[int, int] = {}
+        type_deltas: Dict[Tuple[int, int], int] = {}
+        for attempt_id, updates in answer_updates.items():
+            if attempt_id in skipped:
+                continue
+            for is_correct, reason, question_id, delta, type_code in updates:
+                report.answers_changed += 1
+                question_updates.append((is_correct, reason, attempt_id, question_id))
+                if delta:
+                    attempt_deltas[attempt_id] = attempt_deltas.get(attempt_id, 0) + delta
+                    type_deltas[(attempt_id, type_code)] = type_deltas.get((attempt_id, type_code), 0) + delta
+
+        connection.executemany(
+            "UPDATE attempt_questions SET is_correct = ?, reason = ? WHERE attempt_id = ? AND question_id = ?",
+            question_updates)
+        changed_attempts = [attempt_id for attempt_id, delta in attempt_deltas.items() if delta]
+        connection.executemany(
+            "UPDATE attempt_types SET correct = correct + ? WHERE attempt_id = ? AND type_code = ?",
+            [(delta, attempt_id, type_code) for (attempt_id, type_code), delta in type_deltas.items() if delta])
+        connection.executemany(
+            "UPDATE attempts SET correct = correct + ?, incorrect = incorrect - ? WHERE id = ?",
+            [(attempt_deltas[attempt_id], attempt_deltas[attempt_id], attempt_id)
+             for attempt_id in changed_attempts])
+        report.attempts_changed = len(changed_attempts)
+
+        # Bands: group the new raw scores by test length and look each group up in one gather
+        by_total: Dict[int, Tuple[List[int], List[int]]] = {}
+        for attempt_ids in _chunks(changed_attempts):
+            rows = connection.execute(
+                f"SELECT id, correct, total FROM attempts WHERE id IN ({','.join('?' * len(attempt_ids))})",
+                attempt_ids)
+            for attempt_id, correct, total in rows:
+                ids, scores = by_total.setdefault(total, ([], []))
+                ids.append(attempt_id)
+                scores.append(correct)
+        for total, (ids, scores) in by_total.items():
+            bands = scoring_table.for_test(total, scaling).bands_for(scores)
+            connection.executemany("UPDATE attempts SET band = ? WHERE id = ?", zip(bands, ids))
+
+        retagged = [attempt_id for (attempt_id,) in connection.execute(
+            "SELECT id FROM attempts WHERE package_id = ? AND key_version IS NOT ?",
+            (package_id, report.key_version)) if attempt_id not in skipped]
+        graded_at = to_epoch_ms(datetime.now())
+        for attempt_ids in _chunks(retagged):
+            placeholders = ','.join('?' * len(attempt_ids))
+            connection.execute(
+                f"INSERT INTO gradings SELECT id, ?, ?, correct, band FROM attempts WHERE id IN ({placeholders})",
+                (report.key_version, graded_at, *attempt_ids))
+            connection.execute(f"UPDATE attempts SET key_version = ? WHERE id IN ({placeholders})",
+                               (report.key_version, *attempt_ids))
+        report.attempts_retagged = len(retagged)
+    return report
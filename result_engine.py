@@ -2,19 +2,30 @@
 Result Engine Module
 Evaluate user's submitted answers and produce IELTS band score
 """
+import os
+import sqlite3
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-from typing import List, Dict
-from models import (
-    ReadingPackage, AnswerRecord, EvaluationResult, FeedbackItem,
-    IELTSScoringRules
-)
+from typing import List, Dict, Optional
+from models import ReadingPackage, AnswerRecord, AnswerSession, EvaluationResult
+from grading import evaluate_answers, normalize_answer, REASON_TEXT, REASON_WORD_LIMIT
+from item_statistics import ItemStatistics, default_statistics_path
+from results_store import ResultsStore, default_store_path
+from instrumentation import traced
+
+# Items outside these ranges are highlighted in the item analysis tab
+FACILITY_RANGE = (0.2, 0.9)
+MIN_DISCRIMINATION = 0.2
+# Attempts summarized in the trends tab
+TREND_ATTEMPTS = 10
 
 
 class ResultEngineWindow:
     """Result Engine Window for displaying exam results"""
     
-    def __init__(self, root, package: ReadingPackage, answer_records: List[AnswerRecord]):
+    def __init__(self, root, package: ReadingPackage, answer_records: List[AnswerRecord],
+                 record_statistics: bool = True, session: Optional[AnswerSession] = None,
+                 record_history: bool = True):
         self.root = root
         self.root.title("IELTS Reading Exam Results")
         self.root.geometry("1000x700")
@@ -22,90 +33,57 @@ class ResultEngineWindow:
         self.package = package
         self.answer_records = answer_records
         self.evaluation_result: EvaluationResult = None
+        self.item_statistics: Optional[ItemStatistics] = None
+        self.session = session or AnswerSession(package_id=package.package_id, answers=answer_records)
+        self.trends: Optional[Dict] = None
+        # Failures to update the local statistics; shown under the summary instead of interrupting
+        self.storage_warnings: List[str] = []
         
         # Evaluate answers
         self.evaluate()
+        if record_statistics:
+            self.record_item_statistics()
+        if record_history:
+            self.record_attempt()
         
         # Create UI
         self.create_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
     
+    @traced()
     def evaluate(self):
         """Evaluate user's answers"""
-        self.evaluation_result = EvaluationResult()
-        
-        # Get scoring rules
-        scoring_rules = IELTSScoringRules.get_academic_rules()
-        
-        # Create answer lookup
-        answer_lookup: Dict[str, AnswerRecord] = {
-            ar.question_id: ar for ar in self.answer_records
-        }
-        
-        # Collect all questions from package
-        all_questions = []
-        for qg in self.package.question_groups:
-            all_questions.extend(qg.questions)
-        
-        self.evaluation_result.total_questions = len(all_questions)
-        
-        # Evaluate each question
-        for question in all_questions:
-            feedback = FeedbackItem(
-                question_id=question.question_id,
-                is_correct=False,
-                correct_answer=question.answer,
-                user_answer=None
-            )
-            
-            # Get user's answer
-            if question.question_id in answer_lookup:
-                user_record = answer_lookup[question.question_id]
-                user_answer = user_record.user_answer
-                feedback.user_answer = user_answer
-                
-                if user_answer:
-                    # Normalize answers for comparison
-                    normalized_user = self.normalize_answer(user_answer)
-                    normalized_correct = self.normalize_answer(question.answer)
-                    
-                    if normalized_user == normalized_correct:
-                        feedback.is_correct = True
-                        self.evaluation_result.correct_count += 1
-                    else:
-                        self.evaluation_result.incorrect_count += 1
-                else:
-                    self.evaluation_result.unanswered_count += 1
-            else:
-                self.evaluation_result.unanswered_count += 1
-            
-            self.evaluation_result.per_question_feedback.append(feedback)
-        
-        # Calculate band score
-        correct_count = self.evaluation_result.correct_count
-        if correct_count in scoring_rules.mapping:
-            self.evaluation_result.band_score = scoring_rules.mapping[correct_count]
-        else:
-            # Handle edge cases
-            max_score = max(scoring_rules.mapping.keys())
-            if correct_count > max_score:
-                self.evaluation_result.band_score = 9.0
-            else:
-                self.evaluation_result.band_score = 0.0
+        self.evaluation_result = evaluate_answers(self.package, self.answer_records)
+    
+    def record_item_statistics(self):
+        """Fold this submission into the persisted item statistics"""
+        path = default_statistics_path()
+        try:
+            self.item_statistics = ItemStatistics.load(path)
+            self.item_statistics.update(self.evaluation_result, self.package)
+            self.item_statistics.save(path)
+        except (OSError, ValueError, KeyError) as e:
+            self.storage_warnings.append(f"Item statistics not updated: {e}")
+    
+    def record_attempt(self):
+        """Store this attempt in the local results history and read the candidate's trends back"""
+        try:
+            with ResultsStore(default_store_path()) as store:
+                store.record(self.evaluation_result, self.session, self.package)
+                candidate_id = self.session.candidate_id
+                self.trends = {
+                    'attempts': store.attempt_count(candidate_id),
+                    'bands': store.band_trend(candidate_id, TREND_ATTEMPTS),
+                    'by_type': store.accuracy_by_type(candidate_id, TREND_ATTEMPTS),
+                }
+        except (OSError, ValueError, sqlite3.Error) as e:
+            self.storage_warnings.append(f"Results history not updated: {e}")
     
     def normalize_answer(self, answer: str) -> str:
         """Normalize answer for comparison"""
-        if not answer:
-            return ""
-        
-        # Convert to lowercase and strip whitespace
-        normalized = answer.lower().strip()
-        
-        # Remove common punctuation
-        for char in ['.', ',', '!', '?', ';', ':']:
-            normalized = normalized.replace(char, '')
-        
-        return normalized
+        return normalize_answer(answer)
     
+    @traced()
     def create_ui(self):
         """Create results UI"""
         # Header
@@ -148,6 +126,9 @@ class ResultEngineWindow:
         interpretation = self.get_band_interpretation(self.evaluation_result.band_score)
         tk.Label(summary_frame, text=interpretation, font=('Arial', 11, 'italic'),
                 bg='#ecf0f1', fg='#34495e', wraplength=800).pack(pady=10)
+        for warning in self.storage_warnings:
+            tk.Label(summary_frame, text=warning, font=('Arial', 9), bg='#ecf0f1', fg='#e67e22',
+                     wraplength=800).pack()
         
         # Notebook for detailed results
         notebook = ttk.Notebook(self.root)
@@ -161,6 +142,14 @@ class ResultEngineWindow:
         
         # Tab 3: Statistics
         self.create_statistics_tab(notebook)
+
+        # Tab 4: Item analysis across every recorded submission
+        if self.item_statistics is not None:
+            self.create_item_analysis_tab(notebook)
+
+        # Tab 5: Trends over the candidate's recent attempts
+        if self.trends is not None:
+            self.create_trends_tab(notebook)
         
         # Bottom buttons
         button_frame = tk.Frame(self.root)
@@ -170,10 +159,19 @@ class ResultEngineWindow:
                  bg='#3498db', fg='white', font=('Arial', 11, 'bold'), 
                  width=15).pack(side=tk.LEFT, padx=10)
         
-        tk.Button(button_frame, text="Close", command=self.root.destroy,
+        tk.Button(button_frame, text="Close", command=self.close,
                  bg='#95a5a6', fg='white', font=('Arial', 11, 'bold'),
                  width=15).pack(side=tk.RIGHT, padx=10)
     
+    def close(self):
+        """Close the results window and drop the graded result and history it holds"""
+        self.item_statistics = None
+        self.trends = None
+        try:
+            self.root.destroy()
+        except tk.TclError:
+            pass
+    
     def create_summary_card(self, parent, title, value, color, row, col, colspan=1):
         """Create a summary card widget"""
         card = tk.Frame(parent, bg=color, width=180, height=100, relief=tk.RAISED, bd=2)
@@ -210,6 +208,7 @@ class ResultEngineWindow:
         
         return interpretations.get(band_score, "Keep practicing to improve your score!")
     
+    @traced()
     def create_detailed_tab(self, notebook):
         """Create detailed question-by-question results tab"""
         tab = tk.Frame(notebook)
@@ -245,6 +244,8 @@ class ResultEngineWindow:
                     # Result
                     if feedback.is_correct:
                         text.insert("end", "✓ CORRECT\n\n", 'correct')
+                    elif feedback.reason == REASON_WORD_LIMIT:
+                        text.insert("end", f"✗ INCORRECT ({REASON_TEXT[feedback.reason]})\n\n", 'incorrect')
                     else:
                         text.insert("end", "✗ INCORRECT\n\n", 'incorrect')
                 
@@ -291,6 +292,8 @@ class ResultEngineWindow:
                         user_ans = feedback.user_answer if feedback.user_answer else "[NOT ANSWERED]"
                         text.insert("end", f"Your Answer: {user_ans}\n", 'user')
                         text.insert("end", f"Correct Answer: {feedback.correct_answer}\n", 'correct')
+                        if feedback.reason == REASON_WORD_LIMIT:
+                            text.insert("end", f"Marked wrong: {REASON_TEXT[feedback.reason]}\n", 'user')
                         text.insert("end", f"{'-'*60}\n", 'separator')
             
             text.tag_configure('question', font=('Courier', 10, 'bold'))
@@ -355,6 +358,67 @@ Band Score: {self.evaluation_result.band_score}
                     relief=tk.RIDGE).grid(row=row, column=3, padx=2, pady=2)
             row += 1
     
+    def create_item_analysis_tab(self, notebook):
+        """Create item analysis tab (facility, discrimination and distractors per question)"""
+        tab = tk.Frame(notebook)
+        notebook.add(tab, text="Item Analysis")
+
+        tk.Label(tab, text=f"Across {self.item_statistics.results} recorded submissions. Facility is the share "
+                           f"of correct answers; discrimination correlates an item with the rest of the test.",
+                 font=('Arial', 10, 'italic'), wraplength=900, justify=tk.LEFT).pack(fill=tk.X, padx=10, pady=(10, 0))
+
+        columns = ('question', 'type', 'responses', 'facility', 'discrimination', 'distractors')
+        tree = ttk.Treeview(tab, columns=columns, show='headings')
+        for column, heading, width in zip(columns,
+                                          ('Q', 'Type', 'Responses', 'Facility', 'Discrimination', 'Top distractors'),
+                                          (40, 220, 80, 80, 100, 300)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor=tk.W if column in ('type', 'distractors') else tk.CENTER)
+        tree.tag_configure('flag', background='#fdebd0')
+
+        scrollbar = ttk.Scrollbar(tab, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        for number, row in enumerate(self.item_statistics.report(self.package), start=1):
+            discrimination = row['discrimination']
+            flagged = (not FACILITY_RANGE[0] <= row['facility'] <= FACILITY_RANGE[1]
+                       or (discrimination is not None and discrimination < MIN_DISCRIMINATION))
+            distractors = ", ".join(f"{option or '(blank)'} x{count}" for option, count in row['distractors'][:3])
+            tree.insert('', tk.END, values=(
+                number, row['type'], row['responses'], f"{row['facility']:.2f}",
+                "-" if discrimination is None else f"{discrimination:.2f}", distractors
+            ), tags=('flag',) if flagged else ())
+
+    def create_trends_tab(self, notebook):
+        """Create trends tab (band per attempt and accuracy by question type over recent attempts)"""
+        tab = tk.Frame(notebook)
+        notebook.add(tab, text="Trends")
+
+        bands = self.trends['bands']
+        tk.Label(tab, text=f"Your last {len(bands)} of {self.trends['attempts']} recorded attempts",
+                 font=('Arial', 12, 'bold')).pack(anchor=tk.W, padx=10, pady=(10, 5))
+
+        band_frame = tk.Frame(tab)
+        band_frame.pack(fill=tk.X, padx=10)
+        for column, (submitted_at, band) in enumerate(bands):
+            tk.Label(band_frame, text=submitted_at.strftime('%d %b'), width=8,
+                     relief=tk.RIDGE).grid(row=0, column=column, padx=1, pady=1)
+            tk.Label(band_frame, text=f"{band:g}", width=8, relief=tk.RIDGE,
+                     font=('Arial', 10, 'bold')).grid(row=1, column=column, padx=1, pady=1)
+
+        columns = ('type', 'answered', 'correct', 'accuracy')
+        tree = ttk.Treeview(tab, columns=columns, show='headings')
+        for column, heading, width in zip(columns, ('Question Type', 'Answered', 'Correct', 'Accuracy'),
+                                          (300, 100, 100, 100)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor=tk.W if column == 'type' else tk.CENTER)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        for question_type, (correct, total, accuracy) in self.trends['by_type'].items():
+            tree.insert('', tk.END, values=(question_type.value, total, correct, f"{accuracy:.1f}%"))
+
     def calculate_type_statistics(self) -> Dict:
         """Calculate statistics by question type"""
         stats = {}
@@ -376,19 +440,30 @@ Band Score: {self.evaluation_result.band_score}
         return stats
     
     def export_results(self):
-        """Export results to JSON file"""
+        """Export results to JSON, or append them to a JSON Lines/CSV results log"""
         from tkinter import filedialog
         import json
         from datetime import datetime
+        from results_export import EXPORT_FORMATS, open_result_writer
         
         filepath = filedialog.asksaveasfilename(
             defaultextension=".json",
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
-            initialfile=f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            filetypes=[("JSON files", "*.json"), ("JSON Lines (append)", "*.jsonl"),
+                       ("CSV (append)", "*.csv"), ("All files", "*.*")],
+            initialfile=f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            confirmoverwrite=False
         )
         
         if filepath:
             try:
+                if os.path.splitext(filepath)[1].lower() in EXPORT_FORMATS:
+                    with open_result_writer(filepath, question_columns=self.evaluation_result.total_questions) as writer:
+                        writer.write(self.evaluation_result)
+                    messagebox.showinfo("Success", f"Results appended to:\n{filepath}")
+                    return
+                if os.path.exists(filepath) and not messagebox.askyesno(
+                        "Overwrite", f"{filepath} already exists. Replace it?"):
+                    return
                 with open(filepath, 'w', encoding='utf-8') as f:
                     json.dump(self.evaluation_result.to_dict(), f, indent=2, ensure_ascii=False)
                 messagebox.showinfo("Success", f"Results exported to:\n{filepath}")
@@ -0,0 +1,302 @@
+"""
+Result Outbox
+Durable on-disk queue of results and session journals, uploaded in batches by a background thread
+
+Every item is its own small JSON file written atomically into the outbox directory, so
+nothing is lost when the machine is offline, the endpoint is down or the app is closed.
+The uploader POSTs {"items": [...]} to the endpoint and deletes the files once it answers
+2xx; it backs off exponentially while the endpoint is unreachable. Only the ids of pending
+items are kept in memory and the queue refuses new items past max_pending. The Tk thread
+hands results and journals over with defer_result() / defer_journal(), which only keep
+the payload in memory (the latest one per session); the uploader thread writes them, so
+the Tk thread never waits on a disk sync. Item files are written outside the lock.
+"""
+import atexit
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from typing import Dict, List, Optional, Tuple
+from models import AnswerSession, EvaluationResult, atomic_write
+from app_paths import data_dir
+
+
+ENDPOINT_ENV = 'IELTS_RESULTS_ENDPOINT'
+ITEM_SUFFIX = '.json'
+
+KIND_RESULT = 'result'
+KIND_JOURNAL = 'journal'
+
+
+class ResultOutbox:
+    """Queue items on disk from any thread; upload them from one daemon thread"""
+
+    def __init__(self, directory: str, endpoint: str, batch_size: int = 50,
+                 max_batch_bytes: int = 1024 * 1024, max_pending: int = 10000,
+                 timeout: float = 10.0, base_delay: float = 1.0, max_delay: float = 300.0):
+        self.directory = directory
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.uploaded = 0
+        self.rejected = 0
+        self.failures = 0  # consecutive failed uploads
+        self.last_error: Optional[str] = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._rejected_dir = os.path.join(directory, 'rejected')
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._keyed: Dict[str, str] = {}  # journal key -> pending file name
+        self._deferred: Dict[str, Tuple[str, Dict]] = {}  # session id -> (kind, payload) not yet written
+        self._pending = {name for name in os.listdir(directory) if self._is_item(name)}
+        for name in self._pending:
+            key = self._key_of(name)
+            if key:
+                self._keyed[key] = name
+
+    @staticmethod
+    def _is_item(name: str) -> bool:
+        return name.endswith(ITEM_SUFFIX) and not name.startswith('.')
+
+    @staticmethod
+    def _key_of(name: str) -> Optional[str]:
+        # <time_ns>-<kind>-<key or random id>.json; only journals are keyed
+        parts = name[:-len(ITEM_SUFFIX)].split('-', 2)
+        return parts[2] if len(parts) == 3 and parts[1] == KIND_JOURNAL else None
+
+    # -- producer side: enqueue*() write a file, defer*() only hand the payload over --
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def enqueue(self, kind: str, payload: Dict, key: Optional[str] = None) -> bool:
+        """Persist one item; a keyed item replaces the pending item with the same key
+
+        Returns False when the outbox is full.
+        """
+        item_id = key or uuid.uuid4().hex
+        name = f"{time.time_ns():020d}-{kind}-{item_id}{ITEM_SUFFIX}"
+        with self._lock:
+            if not (key and key in self._keyed) and len(self._pending) >= self.max_pending:
+                return False
+        with atomic_write(os.path.join(self.directory, name)) as f:
+            json.dump({'id': item_id, 'kind': kind, 'payload': payload}, f, ensure_ascii=False,
+                      separators=(',', ':'))
+        with self._lock:
+            replaced = self._keyed.get(key) if key else None
+            self._pending.add(name)
+            if key:
+                self._keyed[key] = name
+            if replaced is not None:
+                self._discard(replaced)
+        self._wake.set()
+        return True
+
+    def enqueue_result(self, result: EvaluationResult, session: AnswerSession) -> bool:
+        payload = {'result': result.to_dict(), 'session': session.to_dict()}
+        with self._lock:
+            self._deferred.pop(session.session_id, None)
+        return self._write_result(payload, session.session_id)
+
+    def _write_result(self, payload: Dict, session_id: str) -> bool:
+        if not self.enqueue(KIND_RESULT, payload, None):
+            return False
+        # The final result supersedes any journal still waiting for the same session
+        with self._lock:
+            journal = self._keyed.get(session_id)
+            if journal is not None:
+                self._discard(journal)
+        return True
+
+    def enqueue_journal(self, session: AnswerSession) -> bool:
+        """Snapshot of an exam in progress; only the latest one per session is kept"""
+        return self.enqueue(KIND_JOURNAL, session.to_dict(), session.session_id)
+
+    def defer_result(self, result: EvaluationResult, session: AnswerSession) -> bool:
+        """Like enqueue_result() without touching the disk; returns False when the outbox is full"""
+        payload = {'result': result.to_dict(), 'session': session.to_dict()}
+        with self._lock:
+            waiting = sum(kind == KIND_RESULT for kind, _ in self._deferred.values())
+            if len(self._pending) + waiting >= self.max_pending:
+                return False
+            self._deferred[session.session_id] = (KIND_RESULT, payload)
+        self._wake.set()
+        return True
+
+    def defer_journal(self, session: AnswerSession):
+        """Like enqueue_journal() without touching the disk: the uploader thread writes the snapshot"""
+        payload = session.to_dict()  # taken now, while the caller's answer records are consistent
+        with self._lock:
+            waiting = self._deferred.get(session.session_id)
+            if waiting is not None and waiting[0] == KIND_RESULT:
+                return  # the session is already finished
+            self._deferred[session.session_id] = (KIND_JOURNAL, payload)
+        self._wake.set()
+
+    def write_deferred(self):
+        """Write the items handed over by defer_result() / defer_journal(); a full queue drops journals"""
+        with self._lock:
+            deferred, self._deferred = self._deferred, {}
+        # Results first: defer_result() kept their room in the queue
+        for session_id, (kind, payload) in sorted(deferred.items(), key=lambda entry: entry[1][0] != KIND_RESULT):
+            if kind == KIND_RESULT:
+                self._write_result(payload, session_id)
+            else:
+                self.enqueue(KIND_JOURNAL, payload, session_id)
+
+    def _discard(self, name: str):
+        """Forget a pending file; called with the lock held"""
+        self._pending.discard(name)
+        key = self._key_of(name)
+        if key and self._keyed.get(key) == name:
+            del self._keyed[key]
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+    # -- uploader thread -----------------------------------------------------------
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='result-outbox', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.write_deferred()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.write_deferred()
+                sent = self.upload_once()
+            except Exception as e:  # never let the uploader die
+                sent = None
+                self.last_error = str(e)
+            if sent is None:
+                self.failures += 1
+                delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - 1))
+                retry_at = time.monotonic() + delay * random.uniform(0.5, 1.0)
+                # A new item is no reason to retry a failing endpoint early, but journals are still written
+                while not self._stopping.is_set():
+                    if not self._wake.wait(max(0.0, retry_at - time.monotonic())):
+                        break
+                    self._wake.clear()
+                    self.write_deferred()
+                continue
+            self.failures = 0
+            if sent == 0:
+                self._wake.wait()
+                self._wake.clear()
+
+    def _next_batch(self) -> Tuple[List[str], List[Dict]]:
+        with self._lock:
+            names = sorted(self._pending)[:self.batch_size]
+        batch_names, items, size = [], [], 0
+        for name in names:
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except FileNotFoundError:  # replaced by a newer journal meanwhile
+                continue
+            if items and size + len(text) > self.max_batch_bytes:
+                break
+            try:
+                items.append(json.loads(text))
+            except ValueError:
+                self._reject([name])
+                continue
+            batch_names.append(name)
+            size += len(text)
+        return batch_names, items
+
+    def upload_once(self) -> Optional[int]:
+        """Upload one batch; returns the number of items sent, 0 when idle, None on failure"""
+        names, items = self._next_batch()
+        if not items:
+            return 0
+        body = json.dumps({'items': items}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        request = urllib.request.Request(self.endpoint, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            self.last_error = f"{e.code} {e.reason}"
+            if 400 <= e.code < 500 and e.code not in (408, 429):
+                # The endpoint will never accept this batch; park it instead of retrying forever
+                self._reject(names)
+                return len(names)
+            return None
+        except (urllib.error.URLError, OSError) as e:
+            self.last_error = str(e)
+            return None
+        with self._lock:
+            for name in names:
+                self._discard(name)
+        self.uploaded += len(names)
+        self.last_error = None
+        return len(names)
+
+    def _reject(self, names: List[str]):
+        os.makedirs(self._rejected_dir, exist_ok=True)
+        with self._lock:
+            for name in names:
+                try:
+                    os.replace(os.path.join(self.directory, name), os.path.join(self._rejected_dir, name))
+                except FileNotFoundError:
+                    pass
+                self._pending.discard(name)
+                key = self._key_of(name)
+                if key and self._keyed.get(key) == name:
+                    del self._keyed[key]
+        self.rejected += len(names)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until the queue is empty (or the timeout passes); returns True when drained"""
+        deadline = time.monotonic() + timeout
+        self._wake.set()
+        while (self.pending_count() or self._deferred) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return not (self.pending_count() or self._deferred)
+
+
+_default_outbox: Optional[ResultOutbox] = None
+_default_lock = threading.Lock()
+
+
+def default_outbox(endpoint: Optional[str] = None) -> Optional[ResultOutbox]:
+    """The application's shared outbox under app_home(), started on first use
+
+    $IELTS_RESULTS_ENDPOINT overrides the given endpoint; None when neither is set.
+    """
+    global _default_outbox
+    with _default_lock:
+        if _default_outbox is None:
+            endpoint = os.environ.get(ENDPOINT_ENV) or endpoint
+            if not endpoint:
+                return None
+            _default_outbox = ResultOutbox(data_dir('outbox'), endpoint)
+            _default_outbox.start()
+            # Items still held in memory reach the disk even when the app exits right away
+            atexit.register(_default_outbox.write_deferred)
+        return _default_outbox
@@ -0,0 +1,232 @@
+"""
+Results Export Module
+Stream evaluation results to JSON Lines or CSV files for analytics
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+from models import ReadingPackage, AnswerSession, EvaluationResult
+from grading import AnswerKey, compile_answer_key, evaluate_answers
+from scoring import BandTable
+
+
+RESULT_FIELDS = [
+    'session_id', 'candidate_id', 'package_id', 'submitted_at',
+    'correct_count', 'incorrect_count', 'unanswered_count',
+    'total_questions', 'band_score'
+]
+
+EXPORT_FORMATS = {
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.csv': 'csv',
+}
+
+
+def session_fields(session: Optional[AnswerSession]) -> Dict:
+    """Identifying columns for a result row"""
+    if session is None:
+        return {'session_id': '', 'candidate_id': '', 'package_id': '', 'submitted_at': ''}
+    return {
+        'session_id': session.session_id,
+        'candidate_id': session.candidate_id,
+        'package_id': session.package_id,
+        'submitted_at': session.submitted_at.isoformat()
+    }
+
+
+class JsonLinesResultWriter:
+    """Append one compact JSON object per result ('-' writes to stdout)"""
+
+    def __init__(self, filepath: str, append: bool = True):
+        self.filepath = filepath
+        self._owns_file = filepath != '-'
+        self._file = open(filepath, 'a' if append else 'w', encoding='utf-8') if self._owns_file else sys.stdout
+        self.rows_written = 0
+
+    def write(self, result: EvaluationResult, session: Optional[AnswerSession] = None):
+        record = session_fields(session)
+        record.update(result.to_dict())
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self._file.write('\n')
+        self.rows_written += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvResultWriter:
+    """Append one row per result with answer/correct columns per question number ('-' writes to stdout)"""
+
+    def __init__(self, filepath: str, question_columns: int = 40, append: bool = True):
+        self.filepath = filepath
+        fieldnames = list(RESULT_FIELDS)
+        for number in range(1, question_columns + 1):
+            fieldnames.extend([f'q{number}_id', f'q{number}_answer', f'q{number}_correct'])
+        self._owns_file = filepath != '-'
+        existing_header = self._read_header(filepath) if append and self._owns_file else None
+        if existing_header:
+            # Appended rows must line up with the columns already in the file
+            if existing_header[:len(fieldnames)] != fieldnames:
+                raise ValueError(f"{filepath} has columns for {self._columns(existing_header)} questions "
+                                 f"but {question_columns} are needed; write to a new file")
+            self.fieldnames = existing_header
+        else:
+            self.fieldnames = fieldnames
+        self.question_columns = self._columns(self.fieldnames)
+
+        if self._owns_file:
+            self._file = open(filepath, 'a' if append else 'w', encoding='utf-8', newline='')
+        else:
+            self._file = sys.stdout
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+        if not existing_header:
+            self._writer.writeheader()
+        self.rows_written = 0
+
+    @staticmethod
+    def _columns(header: List[str]) -> int:
+        return max(0, (len(header) - len(RESULT_FIELDS)) // 3)
+
+    @staticmethod
+    def _read_header(filepath: str) -> Optional[List[str]]:
+        if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+            return None
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            return next(csv.reader(f), None)
+
+    def write(self, result: EvaluationResult, session: Optional[AnswerSession] = None):
+        if len(result.per_question_feedback) > self.question_columns:
+            raise ValueError(f"Result has {len(result.per_question_feedback)} questions but {self.filepath} "
+                             f"has columns for {self.question_columns}")
+        row = session_fields(session)
+        for key in RESULT_FIELDS[4:]:
+            row[key] = getattr(result, key)
+        for number, feedback in enumerate(result.per_question_feedback, start=1):
+            row[f'q{number}_id'] = feedback.question_id
+            row[f'q{number}_answer'] = feedback.user_answer or ''
+            row[f'q{number}_correct'] = 1 if feedback.is_correct else 0
+        self._writer.writerow(row)
+        self.rows_written += 1
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_result_writer(filepath: str, fmt: Optional[str] = None, question_columns: int = 40,
+                       append: bool = True):
+    """Create a writer for the format given or implied by the file extension"""
+    if fmt is None:
+        fmt = 'jsonl' if filepath == '-' else EXPORT_FORMATS.get(os.path.splitext(filepath)[1].lower())
+    if fmt == 'jsonl':
+        return JsonLinesResultWriter(filepath, append=append)
+    if fmt == 'csv':
+        return CsvResultWriter(filepath, question_columns=question_columns, append=append)
+    raise ValueError(f"Unsupported export format for {filepath!r}; use .jsonl or .csv")
+
+
+def iter_json_files(path: str, suffixes=('.json',)) -> Iterator[str]:
+    """Yield a single file, or the matching files of a directory in a stable order"""
+    if not os.path.isdir(path):
+        yield path
+        return
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(suffixes):
+            yield os.path.join(path, name)
+
+
+def load_packages(path: str) -> Dict[str, ReadingPackage]:
+    """Load one package file or every package in a directory, keyed by package id"""
+    packages = {}
+    for package_path in iter_json_files(path, ('.json', '.json.gz')):
+        package = ReadingPackage.load_from_file(package_path)
+        packages[package.package_id] = package
+    return packages
+
+
+def iter_graded_sessions(path: str, packages: Dict[str, ReadingPackage],
+                         errors: Optional[List[Tuple[str, str]]] = None,
+                         scoring_table: Optional[BandTable] = None, scaling: str = 'prorate'
+                         ) -> Iterator[Tuple[AnswerSession, EvaluationResult]]:
+    """Lazily load and grade one answer session file or every session in a directory"""
+    answer_keys: Dict[str, AnswerKey] = {}
+    for session_path in iter_json_files(path):
+        try:
+            session = AnswerSession.load_from_file(session_path)
+        except (OSError, ValueError, KeyError) as e:
+            if errors is not None:
+                errors.append((session_path, str(e)))
+            continue
+
+        package = packages.get(session.package_id)
+        if package is None:
+            if errors is not None:
+                errors.append((session_path, f"unknown package {session.package_id!r}"))
+            continue
+
+        answer_key = answer_keys.get(session.package_id)
+        if answer_key is None:
+            answer_key = answer_keys[session.package_id] = compile_answer_key(package)
+        yield session, evaluate_answers(package, session.answers, answer_key=answer_key,
+                                        scoring_table=scoring_table, scaling=scaling)
+
+
+def export_sessions(path: str, packages: Dict[str, ReadingPackage], writer,
+                    errors: Optional[List[Tuple[str, str]]] = None,
+                    scoring_table: Optional[BandTable] = None, scaling: str = 'prorate') -> int:
+    """Grade one session file or every session in a directory and stream the results into writer"""
+    for session, result in iter_graded_sessions(path, packages, errors, scoring_table, scaling):
+        writer.write(result, session)
+    return writer.rows_written
+
+
+def main(argv=None):
+    """Export a directory of answer sessions without opening any window"""
+    parser = argparse.ArgumentParser(description="Grade answer sessions and export results")
+    parser.add_argument('sessions', help="directory of answer session JSON files")
+    parser.add_argument('output', help="output file (.jsonl or .csv)")
+    parser.add_argument('--packages', required=True, help="package file or directory of packages")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help="override format from extension")
+    parser.add_argument('--overwrite', action='store_true', help="replace output instead of appending")
+    args = parser.parse_args(argv)
+
+    packages = load_packages(args.packages)
+    question_columns = max((sum(len(qg.questions) for qg in p.question_groups)
+                            for p in packages.values()), default=40)
+    errors: List[Tuple[str, str]] = []
+    with open_result_writer(args.output, args.format, question_columns,
+                            append=not args.overwrite) as writer:
+        count = export_sessions(args.sessions, packages, writer, errors)
+
+    for path, message in errors:
+        print(f"skipped {path}: {message}", file=sys.stderr)
+    print(f"Exported {count} results to {args.output}", file=sys.stderr)
+    return 0 if not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
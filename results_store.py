@@ -0,0 +1,247 @@
+"""
+Results Store
+Local SQLite history of graded attempts with per-question and per-question-type rows
+
+Attempts are keyed by candidate, package and submission time. The schema is versioned
+with PRAGMA user_version; MIGRATIONS[n] upgrades a database from version n to n + 1.
+Trend queries read the newest attempts of a candidate through the
+(candidate_id, submitted_at) index and sum their per-type rows, which are clustered by
+attempt, so they stay in the millisecond range for 100k stored attempts.
+"""
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from models import ReadingPackage, AnswerSession, EvaluationResult, QuestionType
+from grading import AnswerKey, compile_answer_key
+from compact_models import to_epoch_ms, from_epoch_ms
+from app_paths import data_dir
+
+
+STORE_FILENAME = 'results.sqlite3'
+# Persisted as small integers; only ever append
+TYPE_CODES = {question_type: code for code, question_type in enumerate(QuestionType)}
+TYPES_BY_CODE = list(QuestionType)
+
+MIGRATIONS = [
+    # 0 -> 1
+    """
+    CREATE TABLE attempts (
+        id INTEGER PRIMARY KEY,
+        session_id TEXT UNIQUE,
+        candidate_id TEXT NOT NULL,
+        package_id TEXT NOT NULL,
+        submitted_at INTEGER NOT NULL,
+        correct INTEGER NOT NULL,
+        incorrect INTEGER NOT NULL,
+        unanswered INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        band REAL NOT NULL
+    );
+    CREATE INDEX attempts_candidate_time ON attempts (candidate_id, submitted_at);
+    CREATE INDEX attempts_package_time ON attempts (package_id, submitted_at);
+
+    CREATE TABLE attempt_questions (
+        attempt_id INTEGER NOT NULL REFERENCES attempts (id) ON DELETE CASCADE,
+        question_id TEXT NOT NULL,
+        type_code INTEGER NOT NULL,
+        is_correct INTEGER NOT NULL,
+        user_answer TEXT,
+        reason TEXT,
+        PRIMARY KEY (attempt_id, question_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX attempt_questions_question ON attempt_questions (question_id, is_correct);
+
+    CREATE TABLE attempt_types (
+        attempt_id INTEGER NOT NULL REFERENCES attempts (id) ON DELETE CASCADE,
+        type_code INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        correct INTEGER NOT NULL,
+        PRIMARY KEY (attempt_id, type_code)
+    ) WITHOUT ROWID;
+    """,
+    # 1 -> 2: answer key versions and a grading audit trail
+    """
+    CREATE TABLE key_versions (
+        id INTEGER PRIMARY KEY,
+        package_id TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        created_at INTEGER NOT NULL,
+        UNIQUE (package_id, fingerprint)
+    );
+    ALTER TABLE attempts ADD COLUMN key_version INTEGER REFERENCES key_versions (id);
+
+    CREATE TABLE gradings (
+        attempt_id INTEGER NOT NULL REFERENCES attempts (id) ON DELETE CASCADE,
+        key_version INTEGER REFERENCES key_versions (id),
+        graded_at INTEGER NOT NULL,
+        correct INTEGER NOT NULL,
+        band REAL NOT NULL
+    );
+    CREATE INDEX gradings_attempt ON gradings (attempt_id);
+    INSERT INTO gradings SELECT id, NULL, submitted_at, correct, band FROM attempts;
+    """,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def question_types(package: ReadingPackage) -> Dict[str, QuestionType]:
+    return {q.question_id: qg.type for qg in package.question_groups for q in qg.questions}
+
+
+class ResultsStore:
+    """One SQLite connection; use a store per thread"""
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.connection = sqlite3.connect(filepath)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        if filepath != ':memory:':
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.migrate()
+
+    def migrate(self):
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            self.connection.close()
+            raise ValueError(f"{self.filepath} has schema version {version}; "
+                             f"this version of the application supports up to {SCHEMA_VERSION}")
+        for target in range(version, SCHEMA_VERSION):
+            with self.connection:
+                self.connection.executescript("BEGIN;" + MIGRATIONS[target] +
+                                              f"PRAGMA user_version = {target + 1};")
+
+    @property
+    def schema_version(self) -> int:
+        return self.connection.execute("PRAGMA user_version").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def key_version(self, package_id: str, answer_key: AnswerKey) -> int:
+        """Id of an answer key version, registered on first use"""
+        row = self.connection.execute("SELECT id FROM key_versions WHERE package_id = ? AND fingerprint = ?",
+                                      (package_id, answer_key.fingerprint)).fetchone()
+        if row is not None:
+            return row[0]
+        return self.connection.execute(
+            "INSERT INTO key_versions (package_id, fingerprint, created_at) VALUES (?, ?, ?)",
+            (package_id, answer_key.fingerprint, to_epoch_ms(datetime.now()))).lastrowid
+
+    def record(self, result: EvaluationResult, session: AnswerSession,
+               package: Optional[ReadingPackage] = None,
+               types: Optional[Dict[str, QuestionType]] = None,
+               answer_key: Optional[AnswerKey] = None) -> Optional[int]:
+        """Store one attempt; returns its id, or None when the session was already stored
+
+        The attempt is tagged with the version of answer_key (compiled from package when omitted).
+        """
+        with self.connection:
+            if answer_key is None and package is not None:
+                answer_key = compile_answer_key(package)
+            version = self.key_version(session.package_id, answer_key) if answer_key is not None else None
+            return self._insert(result, session, types if types is not None else
+                                question_types(package) if package is not None else {}, version)
+
+    def record_many(self, attempts: Iterable[Tuple[EvaluationResult, AnswerSession]],
+                    package: ReadingPackage, answer_key: Optional[AnswerKey] = None) -> int:
+        """Store many attempts of one package in a single transaction"""
+        types = question_types(package)
+        stored = 0
+        with self.connection:
+            version = self.key_version(package.package_id, answer_key or compile_answer_key(package))
+            for result, session in attempts:
+                if self._insert(result, session, types, version) is not None:
+                    stored += 1
+        return stored
+
+    def _insert(self, result: EvaluationResult, session: AnswerSession,
+                types: Dict[str, QuestionType], key_version: Optional[int] = None) -> Optional[int]:
+        submitted_at = to_epoch_ms(session.submitted_at)
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO attempts (session_id, candidate_id, package_id, submitted_at, correct,"
+            " incorrect, unanswered, total, band, key_version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (session.session_id or None, session.candidate_id, session.package_id,
+             submitted_at, result.correct_count, result.incorrect_count,
+             result.unanswered_count, result.total_questions, result.band_score, key_version))
+        if not cursor.rowcount:
+            return None
+        attempt_id = cursor.lastrowid
+        self.connection.execute("INSERT INTO gradings VALUES (?, ?, ?, ?, ?)",
+                                (attempt_id, key_version, submitted_at, result.correct_count, result.band_score))
+
+        by_type: Dict[int, List[int]] = {}
+        rows = []
+        for feedback in result.per_question_feedback:
+            question_type = types.get(feedback.question_id)
+            code = TYPE_CODES[question_type] if question_type is not None else -1
+            rows.append((attempt_id, feedback.question_id, code, int(feedback.is_correct),
+                         feedback.user_answer, feedback.reason or None))
+            counts = by_type.setdefault(code, [0, 0])
+            counts[0] += 1
+            counts[1] += feedback.is_correct
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO attempt_questions VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.connection.executemany(
+            "INSERT INTO attempt_types VALUES (?, ?, ?, ?)",
+            [(attempt_id, code, total, correct) for code, (total, correct) in by_type.items()])
+        return attempt_id
+
+    # -- queries -----------------------------------------------------------------
+
+    def attempt_count(self, candidate_id: Optional[str] = None) -> int:
+        if candidate_id is None:
+            return self.connection.execute("SELECT COUNT(*) FROM attempts").fetchone()[0]
+        return self.connection.execute("SELECT COUNT(*) FROM attempts WHERE candidate_id = ?",
+                                       (candidate_id,)).fetchone()[0]
+
+    def recent_attempts(self, candidate_id: str, limit: int = 20) -> List[Dict]:
+        """Newest attempts first"""
+        rows = self.connection.execute(
+            "SELECT id, package_id, submitted_at, correct, total, band FROM attempts"
+            " WHERE candidate_id = ? ORDER BY submitted_at DESC LIMIT ?", (candidate_id, limit))
+        return [{'attempt_id': attempt_id, 'package_id': package_id, 'submitted_at': from_epoch_ms(ms),
+                 'correct': correct, 'total': total, 'band': band}
+                for attempt_id, package_id, ms, correct, total, band in rows]
+
+    def accuracy_by_type(self, candidate_id: str, last: int = 10) -> Dict[QuestionType, Tuple[int, int, float]]:
+        """(correct, total, accuracy %) per question type over the candidate's last attempts"""
+        rows = self.connection.execute(
+            "SELECT type_code, SUM(correct), SUM(total) FROM attempt_types WHERE attempt_id IN"
+            " (SELECT id FROM attempts WHERE candidate_id = ? ORDER BY submitted_at DESC LIMIT ?)"
+            " GROUP BY type_code ORDER BY type_code", (candidate_id, last))
+        return {TYPES_BY_CODE[code]: (correct, total, round(correct / total * 100, 1) if total else 0.0)
+                for code, correct, total in rows if 0 <= code < len(TYPES_BY_CODE)}
+
+    def band_trend(self, candidate_id: str, last: int = 10) -> List[Tuple[datetime, float]]:
+        """(submitted_at, band) of the last attempts, oldest first"""
+        rows = self.connection.execute(
+            "SELECT submitted_at, band FROM attempts WHERE candidate_id = ?"
+            " ORDER BY submitted_at DESC LIMIT ?", (candidate_id, last)).fetchall()
+        return [(from_epoch_ms(ms), band) for ms, band in reversed(rows)]
+
+    def grading_history(self, attempt_id: int) -> List[Tuple[Optional[str], datetime, int, float]]:
+        """(key fingerprint, graded_at, correct, band) of every grading of an attempt, oldest first"""
+        rows = self.connection.execute(
+            "SELECT k.fingerprint, g.graded_at, g.correct, g.band FROM gradings g"
+            " LEFT JOIN key_versions k ON k.id = g.key_version WHERE g.attempt_id = ? ORDER BY g.rowid",
+            (attempt_id,))
+        return [(fingerprint, from_epoch_ms(ms), correct, band) for fingerprint, ms, correct, band in rows]
+
+    def question_accuracy(self, question_id: str) -> Tuple[int, int]:
+        """(correct, answered) across every stored attempt of a question"""
+        correct, total = self.connection.execute(
+            "SELECT SUM(is_correct), COUNT(*) FROM attempt_questions WHERE question_id = ?",
+            (question_id,)).fetchone()
+        return correct or 0, total
+
+
+def default_store_path() -> str:
+    return os.path.join(data_dir('results'), STORE_FILENAME)
@@ -0,0 +1,144 @@
+"""
+Scoring Tables
+Raw-score to band conversion tables compiled into arrays indexed by raw score
+
+Tables are registered by name ('academic', 'general', or custom ones from a plugin or
+a JSON mapping). A table is defined for its own number of questions (40 for the real
+test); for_test() derives a table for any other test length:
+    prorate  scale the raw score up to the table's length, then look it up (default)
+    linear   spread bands evenly from 0 to the table's top band
+    raw      look the raw score up unchanged (capped at the table's top score)
+"""
+from array import array
+from bisect import bisect_right
+from operator import itemgetter
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+
+SCALING_MODES = ('prorate', 'linear', 'raw')
+DEFAULT_TABLE = 'academic'
+
+
+class BandTable:
+    """Bands for raw scores 0..max_score as an array('d'); lookups are one index"""
+    __slots__ = ('name', 'bands', '_scaled')
+
+    def __init__(self, name: str, bands: Iterable[float]):
+        self.name = name
+        self.bands = array('d', bands)
+        if not self.bands:
+            raise ValueError(f"Scoring table {name!r} is empty")
+        self._scaled: Dict[Tuple[int, str], 'BandTable'] = {}
+
+    @property
+    def max_score(self) -> int:
+        return len(self.bands) - 1
+
+    @staticmethod
+    def from_mapping(name: str, mapping: Mapping[int, float]) -> 'BandTable':
+        """Raw score -> band; a score missing from the mapping gets the band of the next lower one"""
+        points = sorted((int(score), float(band)) for score, band in mapping.items())
+        if not points:
+            raise ValueError(f"Scoring table {name!r} is empty")
+        scores = [score for score, _ in points]
+        bands = []
+        for raw in range(points[-1][0] + 1):
+            index = bisect_right(scores, raw) - 1
+            bands.append(points[index][1] if index >= 0 else 0.0)
+        return BandTable(name, bands)
+
+    @staticmethod
+    def from_ranges(name: str, ranges: Iterable[Tuple[int, int, float]]) -> 'BandTable':
+        """(lowest raw score, highest raw score, band) rows, as printed in band score charts"""
+        return BandTable.from_mapping(name, {score: band for low, high, band in ranges
+                                             for score in range(low, high + 1)})
+
+    def band(self, raw_score: int) -> float:
+        return self.bands[min(max(raw_score, 0), len(self.bands) - 1)]
+
+    def bands_for(self, raw_scores: Iterable[int]) -> array:
+        """Bands for many raw scores at once; the gather runs in C"""
+        top = len(self.bands) - 1
+        indices = [score if 0 <= score <= top else (0 if score < 0 else top) for score in raw_scores]
+        if not indices:
+            return array('d')
+        if len(indices) == 1:
+            return array('d', (self.bands[indices[0]],))
+        return array('d', itemgetter(*indices)(self.bands))
+
+    def for_test(self, total_questions: int, mode: str = 'prorate') -> 'BandTable':
+        """This table adapted to a test of total_questions questions (cached)"""
+        if total_questions <= 0 or total_questions == self.max_score:
+            return self
+        cached = self._scaled.get((total_questions, mode))
+        if cached is not None:
+            return cached
+        top = self.max_score
+        if mode == 'prorate':
+            bands = [self.bands[min(top, int(raw * top / total_questions + 0.5))]
+                     for raw in range(total_questions + 1)]
+        elif mode == 'linear':
+            best = self.bands[top]
+            bands = [round(best * raw / total_questions * 2) / 2 for raw in range(total_questions + 1)]
+        elif mode == 'raw':
+            bands = [self.band(raw) for raw in range(total_questions + 1)]
+        else:
+            raise ValueError(f"Unknown scaling mode {mode!r}; use one of {', '.join(SCALING_MODES)}")
+        scaled = BandTable(f"{self.name}/{total_questions}/{mode}", bands)
+        self._scaled[(total_questions, mode)] = scaled
+        return scaled
+
+    def to_mapping(self) -> Dict[int, float]:
+        return {raw: band for raw, band in enumerate(self.bands)}
+
+
+SCORING_TABLES: Dict[str, BandTable] = {}
+
+
+def register_scoring_table(table: BandTable) -> BandTable:
+    """Register a table by name; plugin modules call this at import time"""
+    SCORING_TABLES[table.name] = table
+    return table
+
+
+def get_scoring_table(name: str = DEFAULT_TABLE) -> BandTable:
+    try:
+        return SCORING_TABLES[name]
+    except KeyError:
+        raise ValueError(f"Unknown scoring table {name!r}; available: {', '.join(SCORING_TABLES)}") from None
+
+
+def load_scoring_table(name: str, mapping: Mapping[str, float]) -> BandTable:
+    """Register a custom table from a JSON-style {"raw score": band} mapping"""
+    return register_scoring_table(BandTable.from_mapping(name, {int(raw): band for raw, band in mapping.items()}))
+
+
+_rules_tables: Dict[Tuple[Tuple[int, float], ...], BandTable] = {}
+
+
+def table_for_rules(mapping: Mapping[int, float]) -> BandTable:
+    """Compiled table for an IELTSScoringRules mapping, cached by content"""
+    key = tuple(sorted(mapping.items()))
+    table = _rules_tables.get(key)
+    if table is None:
+        table = _rules_tables[key] = BandTable.from_mapping('custom', mapping)
+    return table
+
+
+# The band table this application has always used for Academic Reading
+ACADEMIC_BANDS: List[float] = [
+    0.0, 1.0, 2.0, 2.5, 3.0, 3.5, 4.0, 4.0, 4.5, 4.5, 5.0,
+    5.0, 5.5, 5.5, 6.0, 6.0, 6.5, 6.5, 6.5, 7.0, 7.0,
+    7.0, 7.0, 7.5, 7.5, 8.0, 8.0, 8.0, 8.0, 8.5, 8.5,
+    8.5, 8.5, 9.0, 9.0, 9.0, 9.0, 9.0, 9.0, 9.0, 9.0,
+]
+
+# General Training Reading; the published chart stops at 6 correct (band 2.5)
+GENERAL_TRAINING_RANGES = [
+    (0, 0, 0.0), (1, 2, 1.0), (3, 5, 2.0), (6, 8, 2.5), (9, 11, 3.0), (12, 14, 3.5),
+    (15, 18, 4.0), (19, 22, 4.5), (23, 26, 5.0), (27, 29, 5.5), (30, 31, 6.0),
+    (32, 33, 6.5), (34, 35, 7.0), (36, 36, 7.5), (37, 38, 8.0), (39, 39, 8.5), (40, 40, 9.0),
+]
+
+register_scoring_table(BandTable('academic', ACADEMIC_BANDS))
+register_scoring_table(BandTable.from_ranges('general', GENERAL_TRAINING_RANGES))
@@ -0,0 +1,147 @@
+"""
+Scroll Router
+One mouse-wheel handler per window that scrolls the nearest scrollable ancestor of the pointer
+
+Scrollable widgets are registered by Tk path name; the router binds <MouseWheel>,
+<Button-4> and <Button-5> once on the window itself, which every descendant's
+bindtags pass through. Each event resolves the widget under the pointer once and
+walks up its path to the nearest registered widget. Wheel deltas are accumulated
+per target and applied every COALESCE_MS, so a touchpad's burst of small deltas
+becomes one scroll; fractions of a unit carry over to the next flush. A target
+already at the end in the scroll direction hands the scroll to its next
+registered ancestor.
+"""
+import tkinter as tk
+from typing import Dict, Optional, Set
+
+WHEEL_SEQUENCES = ('<MouseWheel>', '<Button-4>', '<Button-5>')
+COALESCE_MS = 16
+# Wheel delta of one notch; aqua reports one per line instead
+WHEEL_NOTCH = 120
+# Widget classes whose own class bindings already scroll them under the pointer
+SELF_SCROLLING_CLASSES = frozenset({'Text', 'Listbox', 'Treeview'})
+
+
+def parent_path(path: str) -> Optional[str]:
+    """Tk path of the parent widget; None above the main window"""
+    if path == '.':
+        return None
+    parent = path.rsplit('.', 1)[0]
+    return parent or '.'
+
+
+class ScrollRouter:
+    """Routes wheel events in one window to registered scrollable widgets"""
+
+    def __init__(self, root, coalesce_ms: int = COALESCE_MS):
+        self.root = root
+        self.coalesce_ms = coalesce_ms
+        self._targets: Set[str] = set()
+        self._pending: Dict[str, float] = {}    # target path -> units not yet applied, + is down
+        self._remainder: Dict[str, float] = {}  # fractions of a unit left over by the last flush
+        self._job = None
+        self._notch = WHEEL_NOTCH
+        self._attached = False
+
+    def attach(self):
+        """Bind the window's wheel handlers; call once on the Tk thread"""
+        if self._attached:
+            return
+        self._attached = True
+        if self.root.tk.call('tk', 'windowingsystem') == 'aqua':
+            self._notch = 1
+        for sequence in WHEEL_SEQUENCES:
+            self.root.bind(sequence, self.on_wheel, add='+')
+
+    def register(self, widget):
+        """Scroll widget (anything with yview) when the wheel turns over it or its descendants"""
+        self._targets.add(str(widget))
+
+    def on_wheel(self, event):
+        units = self.wheel_units(event)
+        if not units:
+            return
+        path = self.widget_under_pointer(event)
+        if path is None:
+            return
+        if str(event.widget) == path and self._scrolls_itself(path, units):
+            return
+        target = self.nearest_target(path)
+        if target is None:
+            return
+        self._pending[target] = self._pending.get(target, 0.0) + units
+        if self._job is None:
+            self._job = self.root.after(self.coalesce_ms, self.flush)
+
+    def wheel_units(self, event) -> float:
+        """Scroll units for one event, positive towards the end"""
+        delta = getattr(event, 'delta', 0)
+        if delta:
+            return -delta / self._notch
+        number = getattr(event, 'num', None)
+        if number == 4:
+            return -1.0
+        if number == 5:
+            return 1.0
+        return 0.0
+
+    def widget_under_pointer(self, event) -> Optional[str]:
+        # Windows delivers <MouseWheel> to the focus widget, so ask Tk what is under the pointer
+        path = self.root.tk.call('winfo', 'containing', event.x_root, event.y_root)
+        return str(path) if path else None
+
+    def nearest_target(self, path: Optional[str]) -> Optional[str]:
+        while path is not None:
+            if path in self._targets:
+                return path
+            path = parent_path(path)
+        return None
+
+    def _scrolls_itself(self, path: str, units: float) -> bool:
+        """True when the class bindings of the widget under the pointer have already scrolled it"""
+        try:
+            if self.root.tk.call('winfo', 'class', path) not in SELF_SCROLLING_CLASSES:
+                return False
+            return self._can_scroll(path, units)
+        except tk.TclError:
+            return False
+
+    def flush(self):
+        """Apply the accumulated units to each target"""
+        self._job = None
+        pending, self._pending = self._pending, {}
+        for target, units in pending.items():
+            units += self._remainder.pop(target, 0.0)
+            whole = int(units)
+            if units - whole:
+                self._remainder[target] = units - whole
+            if whole:
+                self.scroll(target, whole)
+
+    def scroll(self, target: str, units: int):
+        """Scroll target, or the nearest registered ancestor that can still move that way"""
+        path = target
+        while path is not None:
+            try:
+                if self._can_scroll(path, units):
+                    self.root.tk.call(path, 'yview', 'scroll', units, 'units')
+                    return
+            except tk.TclError:  # destroyed since it was registered
+                self._targets.discard(path)
+            path = self.nearest_target(parent_path(path))
+
+    def _can_scroll(self, path: str, units: float) -> bool:
+        first, last = self.root.tk.splitlist(self.root.tk.call(path, 'yview'))
+        return float(first) > 0 if units < 0 else float(last) < 1
+
+    def close(self):
+        """Cancel a pending flush and forget every target; the window bindings go with the window"""
+        if self._job is not None:
+            try:
+                self.root.after_cancel(self._job)
+            except tk.TclError:
+                pass
+            self._job = None
+        self._targets.clear()
+        self._pending.clear()
+        self._remainder.clear()
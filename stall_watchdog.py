@@ -0,0 +1,167 @@
+"""
+Stall Watchdog
+Detect Tk event-loop stalls from after() jitter and capture what the Tk thread was doing
+
+A heartbeat callback is scheduled every interval_ms; how late it fires (the lag) goes into
+a histogram. A helper thread watches the heartbeat: once it is more than threshold_ms
+overdue it captures the Tk thread's Python stack with sys._current_frames(), so the
+report names the code that blocked the loop rather than the code that ran after it.
+When the window is destroyed one JSON line per session is appended to
+app_home()/stalls/stalls.jsonl with the histogram and the worst stalls.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+import uuid
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, Optional
+import instrumentation
+from app_paths import data_dir
+
+
+HEARTBEAT_MS = 50
+STALL_THRESHOLD_MS = 250
+# Histogram bucket upper bounds in ms of lag; the last bucket is everything above
+LAG_BUCKETS_MS = (5, 16, 33, 50, 100, 250, 500, 1000, 2000, 5000)
+MAX_STALLS_KEPT = 20        # the longest stalls are kept with their stacks
+MAX_STACK_FRAMES = 12
+STALL_LOG_FILENAME = 'stalls.jsonl'
+
+
+class LagHistogram:
+    """Counts of heartbeat lags per bucket"""
+    __slots__ = ('counts', 'total', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.total = 0
+        self.max_ms = 0.0
+
+    def add(self, lag_ms: float):
+        self.counts[bisect_left(LAG_BUCKETS_MS, lag_ms)] += 1
+        self.total += 1
+        if lag_ms > self.max_ms:
+            self.max_ms = lag_ms
+
+    def to_dict(self) -> Dict[str, int]:
+        """Non-empty buckets as {"<=16": n, ..., ">5000": n}"""
+        labels = [f"<={bound}" for bound in LAG_BUCKETS_MS] + [f">{LAG_BUCKETS_MS[-1]}"]
+        return {label: count for label, count in zip(labels, self.counts) if count}
+
+
+def capture_stack(thread_id: int) -> List[str]:
+    """Innermost frames of another thread as "file:line function" strings"""
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return []
+    frames = traceback.extract_stack(frame)[-MAX_STACK_FRAMES:]
+    return [f"{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}" for entry in reversed(frames)]
+
+
+class StallWatchdog:
+    """Heartbeat on the Tk thread plus a helper thread that samples the stack of a stalled loop"""
+
+    def __init__(self, root, window: str, session_id: Optional[str] = None,
+                 interval_ms: int = HEARTBEAT_MS, threshold_ms: int = STALL_THRESHOLD_MS,
+                 log_path: Optional[str] = None):
+        self.root = root
+        self.window = window
+        self.session_id = session_id or uuid.uuid4().hex
+        self.interval_ms = interval_ms
+        self.threshold_ms = threshold_ms
+        self.log_path = log_path
+        self.histogram = LagHistogram()
+        self.stalls: List[Dict] = []
+        self.stall_count = 0
+        self.started_at = datetime.now()
+
+        self._expected = 0.0
+        self._job = None
+        self._tk_thread = None
+        self._captured: Optional[List[str]] = None
+        self._stopping = threading.Event()
+        self._helper: Optional[threading.Thread] = None
+
+    def start(self):
+        """Call on the Tk thread"""
+        if self._job is not None:
+            return
+        self._tk_thread = threading.get_ident()
+        self._expected = time.monotonic() + self.interval_ms / 1000
+        self._job = self.root.after(self.interval_ms, self._beat)
+        self.root.bind('<Destroy>', self._on_destroy, add='+')
+        self._helper = threading.Thread(target=self._watch, name=f'stall-watchdog-{self.window}', daemon=True)
+        self._helper.start()
+
+    def _beat(self):
+        self.record_beat(time.monotonic())
+        self._job = self.root.after(self.interval_ms, self._beat)
+
+    def record_beat(self, now: float):
+        """One heartbeat at monotonic time now; closes the stall the helper thread saw, if any"""
+        lag_ms = max(0.0, (now - self._expected) * 1000)
+        self._expected = now + self.interval_ms / 1000
+        self.histogram.add(lag_ms)
+        stack, self._captured = self._captured, None
+        if lag_ms < self.threshold_ms:
+            return
+        self.stall_count += 1
+        instrumentation.count('event_loop_stalls')
+        self.stalls.append({'at': datetime.now().isoformat(timespec='seconds'),
+                            'ms': round(lag_ms), 'stack': stack or []})
+        if len(self.stalls) > MAX_STALLS_KEPT:
+            self.stalls.remove(min(self.stalls, key=lambda stall: stall['ms']))
+
+    def _watch(self):
+        poll = self.threshold_ms / 4000
+        while not self._stopping.wait(poll):
+            overdue_ms = (time.monotonic() - self._expected) * 1000
+            if overdue_ms >= self.threshold_ms and self._captured is None:
+                # Sample once per stall, while the loop is still blocked
+                self._captured = capture_stack(self._tk_thread)
+
+    def _on_destroy(self, event):
+        if event.widget is self.root:
+            self.stop()
+
+    def stop(self):
+        """Stop the heartbeat and the helper thread and append the session summary to the log"""
+        if self._job is None:
+            return
+        try:
+            self.root.after_cancel(self._job)
+        except Exception:  # the interpreter is already gone during teardown
+            pass
+        self._job = None
+        self._stopping.set()
+        if self._helper is not None:
+            self._helper.join(timeout=1)
+            self._helper = None
+        try:
+            self.write_log()
+        except OSError as e:
+            print(f"Stall log not written: {e}", file=sys.stderr)  # the window is already closing
+
+    def summary(self) -> Dict:
+        return {
+            'window': self.window,
+            'session_id': self.session_id,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'seconds': round((datetime.now() - self.started_at).total_seconds(), 1),
+            'interval_ms': self.interval_ms,
+            'threshold_ms': self.threshold_ms,
+            'beats': self.histogram.total,
+            'max_lag_ms': round(self.histogram.max_ms),
+            'histogram': self.histogram.to_dict(),
+            'stall_count': self.stall_count,
+            'stalls': sorted(self.stalls, key=lambda stall: -stall['ms']),
+        }
+
+    def write_log(self):
+        path = self.log_path or os.path.join(data_dir('stalls'), STALL_LOG_FILENAME)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.summary(), separators=(',', ':')) + '\n')
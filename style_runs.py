@@ -0,0 +1,71 @@
+"""
+Style Runs
+Compact run-length formatting spans stored next to plain text
+
+A run list is flat: [start, length, style_id, start, length, style_id, ...]
+with offsets in characters of the plain text and style_id an index into
+TEXT_STYLES. The ids are persisted, so only ever append to TEXT_STYLES.
+"""
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+
+TEXT_STYLES = ('bold', 'italic', 'h1', 'h2', 'center', 'left')
+STYLE_IDS = {name: style_id for style_id, name in enumerate(TEXT_STYLES)}
+
+
+def iter_runs(runs: Sequence[int]) -> Iterator[Tuple[int, int, int]]:
+    """Yield (start, length, style_id) triples, skipping unknown styles"""
+    for i in range(0, len(runs) - 2, 3):
+        start, length, style_id = runs[i], runs[i + 1], runs[i + 2]
+        if length > 0 and 0 <= style_id < len(TEXT_STYLES):
+            yield start, length, style_id
+
+
+def make_runs(spans: Sequence[Tuple[int, int, int]]) -> List[int]:
+    """Flatten (start, end, style_id) spans into a run list, ordered and with adjacent spans merged"""
+    runs: List[int] = []
+    last: Dict[int, int] = {}  # style_id -> position of its latest run in runs
+    for start, end, style_id in sorted(spans, key=lambda span: (span[0], span[2])):
+        if end <= start:
+            continue
+        previous = last.get(style_id)
+        if previous is not None and runs[previous] + runs[previous + 1] >= start:
+            runs[previous + 1] = max(runs[previous + 1], end - runs[previous])
+            continue
+        last[style_id] = len(runs)
+        runs.extend((start, end - start, style_id))
+    return runs
+
+
+def line_start_offsets(text: str) -> List[int]:
+    """Character offset of the start of every line"""
+    starts = [0]
+    position = text.find('\n')
+    while position != -1:
+        starts.append(position + 1)
+        position = text.find('\n', position + 1)
+    return starts
+
+
+def index_to_offset(line_starts: Sequence[int], index: str) -> int:
+    """Tk 'line.column' index to a character offset"""
+    line, column = index.split('.')
+    return line_starts[int(line) - 1] + int(column)
+
+
+def split_runs(spans: Sequence[Tuple[int, int, int]],
+               segments: Sequence[Tuple[int, int]]) -> List[List[int]]:
+    """Clip absolute (start, end, style_id) spans to sorted (start, end) segments, relative to each"""
+    segment_starts = [start for start, _ in segments]
+    clipped: List[List[Tuple[int, int, int]]] = [[] for _ in segments]
+    for start, end, style_id in spans:
+        first = max(bisect_right(segment_starts, start) - 1, 0)
+        for number in range(first, len(segments)):
+            seg_start, seg_end = segments[number]
+            if seg_start >= end:
+                break
+            low, high = max(start, seg_start), min(end, seg_end)
+            if low < high:
+                clipped[number].append((low - seg_start, high - seg_start, style_id))
+    return [make_runs(spans) for spans in clipped]
@@ -0,0 +1,80 @@
+"""
+Tests for answer equivalence rules and compiled answer keys
+Run with: python -m pytest test_answer_equivalence.py
+"""
+from models import ReadingPackage, QuestionGroup, Question, QuestionType, AnswerRecord, FeedbackItem
+from compact_models import FeedbackSheet
+from answer_equivalence import Canonicalizer, answer_alternatives, parse_word_limit
+from grading import compile_answer_key, evaluate_answers, REASON_WORD_LIMIT, REASON_WRONG_ANSWER
+
+
+def test_canonical_forms():
+    canonical = Canonicalizer().canonical
+    assert canonical("Twenty-five") == canonical("25")
+    assert canonical("the nineteenth century") == canonical("19th Century")
+    assert canonical("one hundred and five") == "105"
+    assert canonical("two thousand and twenty first") == "2021st"
+    # Runs of number words only combine the way numbers are said
+    assert canonical("two three") == "2 3"
+    assert canonical("one and two") == "1 and 2"
+    assert canonical("one two three") == "1 2 3"
+    assert canonical("nineteen ninety") == "19 90"
+    assert canonical("1,000") == canonical("one thousand")
+    assert canonical("Color") == canonical("colour")
+    assert canonical("organization") == canonical("organisation")
+    assert canonical("The steam-engine") == canonical("steam engine")
+    assert canonical("prize") != canonical("prise")
+    assert Canonicalizer(rules=()).canonical("The Colour") == "the colour"
+
+
+def test_answer_alternatives():
+    assert answer_alternatives("car/automobile") == ["car", "automobile"]
+    assert Canonicalizer().key_forms("(very) fast train") == {"fast train", "very fast train"}
+    assert answer_alternatives("3/4") == ["3/4"]
+
+
+def test_rules_apply_only_to_completion_types():
+    package = ReadingPackage(package_id="eq")
+    package.question_groups = [
+        QuestionGroup(type=QuestionType.TYPE1, questions=[Question(answer="A", question_id="mc")]),
+        QuestionGroup(type=QuestionType.TYPE11, questions=[
+            Question(answer="four wheels", question_id="q1"),
+            Question(answer="(the) railway/railroad", question_id="q2"),
+        ]),
+    ]
+    key = compile_answer_key(package)
+    result = evaluate_answers(package, [AnswerRecord("mc", "the A"), AnswerRecord("q1", "4 wheels"),
+                                        AnswerRecord("q2", "Railroad")], answer_key=key)
+    assert [f.is_correct for f in result.per_question_feedback] == [False, True, True]
+    assert result.per_question_feedback[2].correct_answer == "(the) railway/railroad"
+
+
+def test_parse_word_limit():
+    limit = parse_word_limit("Write NO MORE THAN TWO WORDS AND/OR A NUMBER for each answer.")
+    assert (limit.max_words, limit.allow_number) == (2, True)
+    assert parse_word_limit("Choose ONE WORD ONLY from the passage.").max_words == 1
+    assert parse_word_limit("Write A NUMBER for each answer.").max_words == 0
+    assert parse_word_limit("Complete the summary below.") is None
+
+
+def test_word_limit_is_enforced_with_a_reason():
+    package = ReadingPackage(package_id="wl")
+    package.question_groups = [QuestionGroup(
+        type=QuestionType.TYPE8,
+        explanation="Write NO MORE THAN TWO WORDS AND/OR A NUMBER.",
+        questions=[Question(answer="steam engine", question_id=f"q{n}") for n in range(4)],
+    )]
+    result = evaluate_answers(package, [
+        AnswerRecord("q0", "the steam-engine"),      # article and hyphenated word: 2 words
+        AnswerRecord("q1", "a big steam engine"),    # 4 words
+        AnswerRecord("q2", "steam engine 1825"),     # 2 words and a number
+        AnswerRecord("q3", "water wheel"),
+    ])
+    assert [f.reason for f in result.per_question_feedback] == [
+        "", REASON_WORD_LIMIT, REASON_WRONG_ANSWER, REASON_WRONG_ANSWER]
+    assert result.correct_count == 1 and result.incorrect_count == 3
+
+    item = result.per_question_feedback[1]
+    assert FeedbackItem.from_dict(item.to_dict()) == item
+    assert 'reason' not in result.per_question_feedback[0].to_dict()
+    assert list(FeedbackSheet.from_result(result))[1].reason == REASON_WORD_LIMIT
@@ -0,0 +1,57 @@
+"""
+Tests for the summary, table and flow-chart gap index
+Run with: python -m pytest test_blank_index.py
+"""
+from models import ReadingPackage, QuestionGroup, Question, QuestionType, AdditionalInput
+from blank_index import (
+    BlankIndex, SUMMARY, TABLE, FLOWCHART, is_blank_cell, has_blank, split_flowchart_line
+)
+
+
+def completion_group(data, count, first):
+    questions = [Question(text=f"{n}.", answer="x", question_id=f"q{n}") for n in range(first, first + count)]
+    return QuestionGroup("Complete the notes.", QuestionType.TYPE9, questions,
+                         AdditionalInput(QuestionType.TYPE9.value, data))
+
+
+def build_package():
+    package = ReadingPackage(package_id="gaps")
+    # Questions 1-2: exam-wide numbers in a summary
+    package.question_groups.append(completion_group({'summaryData': "Bees need [1] and [2]."}, 2, 1))
+    # Questions 3-4: a full-cell gap and an in-group number in a table
+    package.question_groups.append(completion_group(
+        {'tableData': {'rows': 2, 'cols': 2, 'content': [["Stage", "Result"], ["[3]", "made of [2]"]]}}, 2, 3))
+    # Questions 5-6: unnumbered gaps in reading order, plus one gap too many
+    package.question_groups.append(completion_group(
+        {'flowchartData': "Step one\n[BLANK] → dried\nthen [BLANK]\n[BLANK]"}, 2, 5))
+    # Question 7: a number that matches no question
+    package.question_groups.append(completion_group({'summaryData': "Only [9] here."}, 1, 7))
+    return package
+
+
+def test_gaps_are_located_and_linked_to_questions():
+    index = BlankIndex.from_package(build_package())
+
+    summary = index.blanks_in(0, SUMMARY)
+    assert [(loc.start, loc.end, loc.number, loc.question_id) for loc in summary] == [
+        (10, 13, 1, 'q1'), (18, 21, 2, 'q2')]
+
+    assert index.blanks_in(1, TABLE, (1, 0))[0].question_id == 'q3'
+    assert index.blanks_in(1, TABLE, (1, 1))[0].question_id == 'q4'   # [2] is the second question of the group
+    assert index.blanks_in(1, TABLE, (0, 0)) == []
+
+    flowchart = [loc for loc in index.locations if loc.container == FLOWCHART]
+    assert [loc.cell for loc in flowchart] == [(1, 0), (2, 0), (3, 0)]
+    assert [loc.question_id for loc in flowchart] == ['q5', 'q6', '']
+
+    assert index.find(0, 2).question_id == 'q2'
+    assert index.for_question('q4').cell == (1, 1)
+    assert index.for_question('q7') is None
+    assert [(loc.group_index, loc.number) for loc in index.unlinked()] == [(2, None), (3, 9)]
+
+
+def test_gap_helpers():
+    assert is_blank_cell(" [12] ") and is_blank_cell("[BLANK]")
+    assert not is_blank_cell("made of [2]")
+    assert has_blank("made of [2]") and not has_blank("[a]")
+    assert split_flowchart_line("seed -> sprout → tree") == ["seed", "sprout", "tree"]
@@ -0,0 +1,43 @@
+"""
+Tests for the compact model containers
+Run with: python -m pytest test_compact_models.py
+"""
+from datetime import datetime
+
+from compact_models import (
+    AnswerSheet, FeedbackSheet, SlottedAnswerRecord, SlottedQuestion, StringTable
+)
+from grading import evaluate_answers
+from models import AnswerRecord, Question
+from test_grading import make_package
+
+
+def test_answer_sheet_matches_record_dicts():
+    stamp = datetime(2024, 5, 1, 10, 30, 15, 250000)
+    records = [AnswerRecord("pkg_q1", "TRUE", stamp), AnswerRecord("pkg_q2", None, stamp)]
+    strings = StringTable()
+    sheet = AnswerSheet.from_records(records, strings)
+    other = AnswerSheet.from_records(records, strings)
+
+    assert sheet.to_dict() == [record.to_dict() for record in records]
+    assert sheet.to_records() == records
+    assert len(strings) == 3 and len(other) == 2
+
+
+def test_slotted_variants_round_trip():
+    question = Question(text="Who?", answer="Dunlop", question_id="q1")
+    slotted = SlottedQuestion.from_dict(question.to_dict())
+    assert slotted.to_dict() == question.to_dict()
+    assert not hasattr(slotted, '__dict__')
+
+    record = AnswerRecord("q1", "A", datetime(2024, 5, 1, 8, 0, 0, 123000))
+    assert SlottedAnswerRecord.from_record(record).to_record() == record
+
+
+def test_feedback_sheet_from_result():
+    package = make_package()
+    records = [AnswerRecord("pkg_q1", "true"), AnswerRecord("pkg_q3", "wood")]
+    result = evaluate_answers(package, records)
+    sheet = FeedbackSheet.from_result(result)
+    assert sheet.to_dict() == [item.to_dict() for item in result.per_question_feedback]
+    assert sheet.correct_count() == result.correct_count
@@ -0,0 +1,46 @@
+"""
+Tests for the tkinter-free diagram helpers
+Run with: python -m pytest test_diagram_tools.py
+"""
+from diagram_tools import DiagramDocument, StrokeBuilder, simplify_points
+
+
+def test_stroke_builder_decimates_and_returns_segments():
+    builder = StrokeBuilder(min_distance=2.0, tolerance=0.0)
+    builder.start(0, 0)
+    assert builder.add(1, 0) is None
+    assert builder.add(3, 0) == (0, 0, 3, 0)
+    assert builder.add(4, 0) is None
+    assert builder.finish() == [(0, 0), (3, 0), (4, 0)]
+    assert builder.points == []
+
+
+def test_simplify_keeps_corners_only():
+    line = [(x, 0) for x in range(50)] + [(49, y) for y in range(1, 50)]
+    assert simplify_points(line, 0.5) == [(0, 0), (49, 0), (49, 49)]
+
+
+def test_document_hit_test_and_undo_redo():
+    document = DiagramDocument()
+    line = document.add({'kind': 'line', 'coords': [0, 0, 100, 0], 'color': '#000', 'width': 2})
+    rect = document.add({'kind': 'rect', 'coords': [50, -20, 150, 20], 'color': '#000', 'width': 2})
+    assert document.hit_test(20, 1) == line
+    assert document.hit_test(50, 0) == rect
+    assert document.hit_test(100, 0) == line
+    assert document.hit_test(300, 300) is None
+
+    document.remove([line])
+    document.move([rect], 10, 0)
+    assert document.hit_test(20, 1) is None and document.hit_test(60, 0) == rect
+
+    document.undo()
+    document.undo()
+    assert document.elements()[0]['coords'] == [0, 0, 100, 0]
+    assert document.ids() == [line, rect] and document.hit_test(50, 0) == rect
+
+    document.redo()
+    assert document.ids() == [rect]
+    document.clear()
+    assert len(document) == 0 and len(document.grid) == 0
+    document.undo()
+    assert document.ids() == [rect]
@@ -0,0 +1,60 @@
+"""
+Tests for opening and closing exam windows without leaking memory
+Run with: python -m pytest test_exam_lifecycle.py
+"""
+import gc
+import tracemalloc
+import weakref
+
+import pytest
+import tkinter as tk
+
+import exam_engine
+from package_generator import generate_package
+
+CYCLES = 50
+MAX_GROWTH_BYTES = 256 * 1024  # a single leaked exam window holds several MB
+
+
+@pytest.fixture
+def tk_root(tmp_path, monkeypatch):
+    monkeypatch.setenv('IELTS_READING_HOME', str(tmp_path))
+    monkeypatch.delenv('IELTS_RESULTS_ENDPOINT', raising=False)
+    monkeypatch.setattr(exam_engine.messagebox, 'showinfo', lambda *a, **k: None)
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    root.withdraw()
+    yield root
+    root.destroy()
+
+
+def test_closed_exams_return_memory_to_baseline(tk_root):
+    package = generate_package(paragraphs=8, diagram_strokes=20, seed=5)
+
+    def open_and_close():
+        window = tk.Toplevel(tk_root)
+        exam = exam_engine.ExamEngineWindow(window, package=package)
+        exam.start_exam()
+        tk_root.update()
+        exam.close()
+        tk_root.update()
+        return weakref.ref(exam)
+
+    # Fonts, styles and lazily imported modules are allocated by the first windows only
+    for _ in range(3):
+        open_and_close()
+    gc.collect()
+
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        refs = [open_and_close() for _ in range(CYCLES)]
+        gc.collect()
+        growth = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+
+    assert all(ref() is None for ref in refs)
+    assert growth < MAX_GROWTH_BYTES
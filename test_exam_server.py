@@ -0,0 +1,117 @@
+"""
+Tests for the exam delivery server and its client
+Run with: python -m pytest test_exam_server.py
+"""
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from models import AnswerRecord, AnswerSession
+from grading import evaluate_answers
+import exam_server as exam_server_module
+from exam_server import ExamServer, ExamServerClient, ExamServerError, PackageStore
+from result_outbox import ResultOutbox
+from test_grading import make_package
+
+
+@pytest.fixture
+def server(tmp_path):
+    package_dir = tmp_path / "packages"
+    package_dir.mkdir()
+    make_package("pkg").save_to_file(str(package_dir / "pkg.json"))
+    results_path = tmp_path / "results.jsonl"
+
+    loop = asyncio.new_event_loop()
+    exam_server = ExamServer(str(package_dir), str(results_path), port=0, flush_interval=0.05)
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(exam_server.start(), loop).result(5)
+    yield exam_server, results_path
+    asyncio.run_coroutine_threadsafe(exam_server.close(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def test_package_fetch_uses_etag_cache(server):
+    exam_server, _ = server
+    client = ExamServerClient(f"http://127.0.0.1:{exam_server.port}")
+
+    assert [p['package_id'] for p in client.list_packages()] == ["pkg"]
+    first = client.fetch_package("pkg")
+    second = client.fetch_package("pkg")
+    assert second is first  # answered with 304 Not Modified
+    assert [q.question_id for qg in first.question_groups for q in qg.questions][0] == "pkg_q1"
+
+    with pytest.raises(ExamServerError):
+        client.fetch_package("missing")
+
+
+def test_events_and_submission_are_graded_and_logged(server):
+    exam_server, results_path = server
+    client = ExamServerClient(f"http://127.0.0.1:{exam_server.port}")
+
+    assert client.send_events("s1", [AnswerRecord("pkg_q1", "FALSE"),
+                                     AnswerRecord("pkg_q3", "john boyd dunlop")])['answers'] == 2
+    result = client.submit("s1", "cand-1", "pkg", [AnswerRecord("pkg_q1", "TRUE")])
+    assert result.correct_count == 2
+    assert result.unanswered_count == 2
+
+    with pytest.raises(ExamServerError, match="409"):
+        client.submit("s1", "cand-1", "pkg", [])
+
+    deadline = time.monotonic() + 5
+    while exam_server.results.batches_written < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    rows = [json.loads(line) for line in results_path.read_text(encoding='utf-8').splitlines()]
+    assert len(rows) == 1
+    assert rows[0]['candidate_id'] == "cand-1"
+    assert rows[0]['correct_count'] == 2
+
+
+def test_outbox_batches_are_accepted_once_and_graded_by_the_server(server, tmp_path):
+    exam_server, results_path = server
+    outbox = ResultOutbox(str(tmp_path / "outbox"), f"http://127.0.0.1:{exam_server.port}/results")
+    session = AnswerSession(session_id="s2", candidate_id="cand-2", package_id="pkg",
+                            answers=[AnswerRecord("pkg_q1", "TRUE")])
+    result = evaluate_answers(exam_server.store.get("pkg").package, session.answers)
+    result.correct_count, result.band_score = 40, 9.0  # a forged score is not trusted
+    outbox.enqueue_result(result, session)
+    outbox.enqueue_result(result, session)  # a retried upload of the same session
+
+    assert outbox.upload_once() == 2
+    assert "s2" in exam_server.submitted
+    deadline = time.monotonic() + 5
+    while exam_server.results.batches_written < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert exam_server.results.rows_written == 1
+    assert json.loads(results_path.read_text(encoding='utf-8'))['correct_count'] == 1
+
+    # A result for a package the server does not have is refused and parked on the client
+    outbox.enqueue_result(result, AnswerSession(session_id="s3", package_id="missing"))
+    assert outbox.upload_once() == 1
+    assert outbox.rejected == 1 and "s3" not in exam_server.submitted
+
+
+def test_unknown_package_rescans_and_submitted_ids_are_bounded(tmp_path, monkeypatch):
+    package_dir = tmp_path / "packages"
+    package_dir.mkdir()
+    store = PackageStore(str(package_dir))
+    rescans = []
+    monkeypatch.setattr(store, 'rescan', lambda: rescans.append(1))
+    for _ in range(50):
+        assert store.get("nope") is None
+    assert rescans == []  # the constructor just scanned
+
+    monkeypatch.setattr(store, '_last_rescan', time.monotonic() - exam_server_module.RESCAN_INTERVAL)
+    store.get("nope")
+    assert len(rescans) == 1
+
+    monkeypatch.setattr(exam_server_module, 'MAX_SUBMITTED', 2)
+    server = ExamServer(str(package_dir), str(tmp_path / "results.jsonl"))
+    for session_id in ("a", "b", "c"):
+        server.mark_submitted(session_id)
+    assert list(server.submitted) == ["b", "c"]
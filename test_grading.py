@@ -0,0 +1,94 @@
+"""
+Tests for headless grading and results export
+Run with: python -m pytest test_grading.py
+"""
+import csv
+import json
+import os
+
+import pytest
+
+from models import (
+    ReadingPackage, QuestionGroup, Question, QuestionType,
+    AnswerRecord, AnswerSession
+)
+from grading import evaluate_answers
+from results_export import load_packages, open_result_writer, export_sessions, main as results_export_main
+
+
+def make_package(package_id="pkg"):
+    package = ReadingPackage(package_id=package_id)
+    package.question_groups = [
+        QuestionGroup(
+            type=QuestionType.TYPE2,
+            questions=[
+                Question(text="Statement one", answer="TRUE", question_id=f"{package_id}_q1"),
+                Question(text="Statement two", answer="NOT GIVEN", question_id=f"{package_id}_q2"),
+            ]
+        ),
+        QuestionGroup(
+            type=QuestionType.TYPE11,
+            explanation="Answer using NO MORE THAN THREE WORDS from the passage.",
+            questions=[
+                Question(text="Who?", answer="John Boyd Dunlop", question_id=f"{package_id}_q3"),
+                Question(text="What?", answer="wood", question_id=f"{package_id}_q4"),
+            ]
+        ),
+    ]
+    return package
+
+
+def test_evaluate_answers_counts():
+    package = make_package()
+    answers = [
+        AnswerRecord(question_id="pkg_q1", user_answer="TRUE"),
+        AnswerRecord(question_id="pkg_q2", user_answer="FALSE"),
+        AnswerRecord(question_id="pkg_q3", user_answer="john boyd dunlop."),
+    ]
+    result = evaluate_answers(package, answers)
+    assert result.total_questions == 4
+    assert result.correct_count == 2
+    assert result.incorrect_count == 1
+    assert result.unanswered_count == 1
+    assert [f.question_id for f in result.per_question_feedback] == ["pkg_q1", "pkg_q2", "pkg_q3", "pkg_q4"]
+
+
+def test_export_sessions_streams_jsonl_and_csv(tmp_path, capsys):
+    package = make_package()
+    package.save_to_file(str(tmp_path / "package.json"))
+    session_dir = tmp_path / "sessions"
+    session_dir.mkdir()
+    for i in range(3):
+        AnswerSession(
+            session_id=f"s{i}", candidate_id=f"c{i}", package_id="pkg",
+            answers=[AnswerRecord(question_id="pkg_q4", user_answer="wood" if i else "stone")]
+        ).save_to_file(str(session_dir / f"s{i}.json"))
+
+    packages = load_packages(str(tmp_path / "package.json"))
+    jsonl_path = str(tmp_path / "results.jsonl")
+    with open_result_writer(jsonl_path) as writer:
+        assert export_sessions(str(session_dir), packages, writer) == 3
+    with open(jsonl_path, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert [row['correct_count'] for row in rows] == [0, 1, 1]
+    assert rows[0]['candidate_id'] == "c0"
+
+    csv_path = str(tmp_path / "results.csv")
+    for _ in range(2):
+        with open_result_writer(csv_path, question_columns=4) as writer:
+            export_sessions(str(session_dir), packages, writer)
+    with open(csv_path, encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 6
+    assert rows[1]['q4_answer'] == "wood" and rows[1]['q4_correct'] == "1"
+    # A file laid out for fewer questions is refused rather than losing columns
+    with pytest.raises(ValueError, match="columns for 4 questions"):
+        open_result_writer(csv_path, question_columns=6)
+    assert os.path.getsize(csv_path) > 0
+
+    # "-" streams to stdout; the summary line goes to stderr
+    assert results_export_main([str(session_dir), '-', '--packages', str(tmp_path / "package.json"),
+                                '--format', 'jsonl']) == 0
+    out, err = capsys.readouterr()
+    assert [json.loads(line)['session_id'] for line in out.splitlines()] == ["s0", "s1", "s2"]
+    assert err.startswith("Exported 3 results")
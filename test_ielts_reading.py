@@ -0,0 +1,89 @@
+"""
+Tests for the command line interface
+Run with: python -m pytest test_ielts_reading.py
+"""
+import csv
+import json
+
+from models import ReadingPackage, AnswerRecord, AnswerSession
+from package_generator import generate_package
+from ielts_reading import main
+
+
+def write_package(tmp_path):
+    package = generate_package(paragraphs=3, seed=2, package_id="cli")
+    path = str(tmp_path / "cli.json")
+    package.save_to_file(path)
+    return package, path
+
+
+def write_sessions(tmp_path, package, count=2):
+    session_dir = tmp_path / "sessions"
+    session_dir.mkdir()
+    questions = [q for qg in package.question_groups for q in qg.questions]
+    for i in range(count):
+        answers = [AnswerRecord(q.question_id, q.answer if i else "") for q in questions]
+        AnswerSession(session_id=f"s{i}", candidate_id=f"c{i}", package_id=package.package_id,
+                      answers=answers).save_to_file(str(session_dir / f"s{i}.json"))
+    return str(session_dir)
+
+
+def test_validate_and_stats(tmp_path, capsys):
+    package, path = write_package(tmp_path)
+    broken = tmp_path / "broken.json"
+    broken.write_text("{not json", encoding='utf-8')
+
+    assert main(['validate', path, '-j', '1']) == 0
+    assert "Checked 1 packages (0 unchanged), 0 with errors" in capsys.readouterr().out
+
+    assert main(['validate', path, str(broken), '-j', '1', '--json']) == 1
+    report = json.loads(capsys.readouterr().out)
+    assert [entry['ok'] for entry in report['packages']] == [True, False]
+
+    assert main(['validate', path, '--rules', 'nope']) == 1
+    error = capsys.readouterr().err
+    assert error.startswith("validate: unknown validation rule(s): nope; known rules: ") and error.count('\n') == 1
+
+    assert main(['stats', path, '--json']) == 0
+    stats = json.loads(capsys.readouterr().out)['packages'][0]
+    assert stats['package_id'] == "cli" and stats['paragraphs'] == 3
+    assert stats['questions'] == sum(len(qg.questions) for qg in package.question_groups)
+
+
+def test_grade_to_stdout_and_files_then_stats(tmp_path, capsys):
+    package, path = write_package(tmp_path)
+    sessions = write_sessions(tmp_path, package)
+    total = sum(len(qg.questions) for qg in package.question_groups)
+
+    assert main(['grade', sessions, '--packages', path]) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [row['correct_count'] for row in rows] == [0, total]
+
+    assert main(['grade', sessions, '--packages', path, '--format', 'csv']) == 0
+    rows = list(csv.DictReader(capsys.readouterr().out.splitlines()))
+    assert [row['session_id'] for row in rows] == ["s0", "s1"]
+    assert not (tmp_path / "-").exists()
+
+    assert main(['grade', sessions, '--packages', path, '--scoring', 'nope']) == 1
+    assert capsys.readouterr().err.startswith("grade: ")
+    assert main(['regrade', path, path, '--scoring', 'nope']) == 1
+    assert capsys.readouterr().err.startswith("regrade: ")
+
+    results = str(tmp_path / "results.jsonl")
+    assert main(['grade', sessions, '--packages', path, '-o', results]) == 0
+    assert "Graded 2 sessions" in capsys.readouterr().err
+    assert main(['stats', '--results', results, '--json']) == 0
+    assert json.loads(capsys.readouterr().out)['results']['results'] == 2
+
+    # A session for a package that was not given is reported and fails the run
+    AnswerSession(session_id="other", package_id="missing").save_to_file(str(tmp_path / "sessions" / "x.json"))
+    assert main(['grade', sessions, '--packages', path, '-o', results]) == 1
+    assert "skipped" in capsys.readouterr().err
+
+
+def test_convert_round_trips_compressed_packages(tmp_path, capsys):
+    package, path = write_package(tmp_path)
+    compressed = str(tmp_path / "cli.json.gz")
+    assert main(['convert', path, compressed, '--compact']) == 0
+    assert "Converted" in capsys.readouterr().out
+    assert ReadingPackage.load_from_file(compressed).to_dict() == package.to_dict()
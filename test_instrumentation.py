@@ -0,0 +1,57 @@
+"""
+Tests for tracing spans and counters
+Run with: python -m pytest test_instrumentation.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+import instrumentation
+from instrumentation import Tracer, traced, span, count
+from models import ReadingPackage
+
+
+def test_disabled_tracing_leaves_functions_alone(monkeypatch):
+    monkeypatch.setattr(instrumentation, '_tracer', None)
+
+    def load():
+        return 1
+    assert traced()(load) is load
+    assert span('block') is instrumentation.NULL_SPAN
+
+
+def test_nested_spans_and_counters(monkeypatch):
+    tracer = Tracer()
+    monkeypatch.setattr(instrumentation, '_tracer', tracer)
+
+    @traced()
+    def render(widgets):
+        with span('render.cells', rows=widgets):
+            count('widgets_created', widgets)
+
+    render(3)
+    render(2)
+    events = [event for event in tracer.to_chrome_trace()['traceEvents'] if event['ph'] == 'X']
+    assert [event['name'] for event in events] == [
+        'render.cells', 'test_nested_spans_and_counters.<locals>.render'] * 2
+    inner, outer = events[:2]
+    assert inner['args'] == {'rows': 3, 'widgets_created': 3}
+    assert outer['args'] == {'widgets_created': 3}
+    assert outer['ts'] <= inner['ts'] and inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+    assert tracer.counters == {'widgets_created': 5}
+
+
+def test_environment_variable_writes_trace(tmp_path):
+    package_path = str(tmp_path / "package.json")
+    ReadingPackage(package_id="traced").save_to_file(package_path)
+    trace_path = str(tmp_path / "trace.json")
+
+    env = dict(os.environ, IELTS_TRACE=trace_path)
+    subprocess.run([sys.executable, '-c', f"from models import ReadingPackage; "
+                                          f"ReadingPackage.load_from_file({package_path!r})"],
+                   cwd=os.path.dirname(os.path.abspath(instrumentation.__file__)), env=env,
+                   check=True, capture_output=True)
+    with open(trace_path, 'r', encoding='utf-8') as f:
+        trace = json.load(f)
+    assert [event['name'] for event in trace['traceEvents']] == ['ReadingPackage.load_from_file']
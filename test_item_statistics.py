@@ -0,0 +1,86 @@
+"""
+Tests for streaming item analysis
+Run with: python -m pytest test_item_statistics.py
+"""
+import math
+import random
+
+import pytest
+
+from models import ReadingPackage, QuestionGroup, Question, QuestionType, AnswerRecord
+from grading import evaluate_answers
+from item_statistics import ItemStatistics
+
+
+def make_choice_package():
+    package = ReadingPackage(package_id="items")
+    package.question_groups = [
+        QuestionGroup(type=QuestionType.TYPE1,
+                      questions=[Question(answer="ABCD"[n % 4], question_id=f"mc{n}") for n in range(4)]),
+        QuestionGroup(type=QuestionType.TYPE2,
+                      questions=[Question(answer="TRUE", question_id=f"tf{n}") for n in range(4)]),
+    ]
+    return package
+
+
+def batch_correlation(xs, ys):
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    return cov / math.sqrt(sum((x - mean_x) ** 2 for x in xs) * sum((y - mean_y) ** 2 for y in ys))
+
+
+def test_streaming_matches_batch_statistics(tmp_path):
+    package = make_choice_package()
+    rng = random.Random(7)
+    statistics = ItemStatistics()
+    results = []
+    for _ in range(300):
+        ability = rng.random()
+        answers = []
+        for qg in package.question_groups:
+            for q in qg.questions:
+                if rng.random() < ability:
+                    answers.append(AnswerRecord(q.question_id, q.answer))
+                else:
+                    answers.append(AnswerRecord(q.question_id, rng.choice(["A", "B", "C", "D", "FALSE"])))
+        result = evaluate_answers(package, answers)
+        results.append(result)
+        statistics.update(result, package)
+
+    xs = [1.0 if r.per_question_feedback[0].is_correct else 0.0 for r in results]
+    ys = [r.correct_count - x for r, x in zip(results, xs)]
+    stat = statistics.get(package, "mc0")
+    assert stat.count == 300
+    assert stat.facility == pytest.approx(sum(xs) / len(xs))
+    assert stat.discrimination == pytest.approx(batch_correlation(xs, ys))
+    assert sum(stat.options.values()) == 300
+    assert statistics.get(package, "tf0").options is None
+
+    path = str(tmp_path / "items.json")
+    statistics.save(path)
+    loaded = ItemStatistics.load(path)
+    assert loaded.results == 300
+    assert loaded.get(package, "mc0").discrimination == pytest.approx(stat.discrimination)
+    rows = list(loaded.report(package))
+    assert [row['question_id'] for row in rows][:2] == ["mc0", "mc1"]
+    assert all(option != "A" for option, _ in rows[0]['distractors'])
+    assert ItemStatistics.load(str(tmp_path / "missing.json")).results == 0
+
+
+def test_edited_packages_do_not_share_statistics():
+    package = make_choice_package()
+    statistics = ItemStatistics()
+    answers = [AnswerRecord(q.question_id, q.answer) for qg in package.question_groups for q in qg.questions]
+    statistics.update(evaluate_answers(package, answers), package)
+
+    # Same question ids with a corrected answer, and the same ids in another package
+    edited = make_choice_package()
+    edited.question_groups[0].questions[0].answer = "D"
+    other = make_choice_package()
+    other.package_id = "other"
+    statistics.update(evaluate_answers(edited, answers), edited)
+
+    assert statistics.get(package, "mc0").count == 1 and statistics.get(package, "mc0").facility == 1.0
+    assert statistics.get(edited, "mc0").count == 1 and statistics.get(edited, "mc0").facility == 0.0
+    assert statistics.get(other, "mc0") is None
+    assert ItemStatistics.from_dict({'version': 1, 'results': 5, 'items': {'mc0': [1, 1, 0, 0, 0, 0]}}).items == {}
@@ -0,0 +1,26 @@
+"""
+Tests for model persistence helpers
+Run with: python -m pytest test_models.py
+"""
+import os
+
+import pytest
+
+from models import ReadingPackage, atomic_write
+from test_grading import make_package
+
+
+def test_atomic_write_keeps_old_file_on_failure(tmp_path):
+    target = tmp_path / "package.json.gz"
+    make_package("old").save_to_file(str(target))
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(target)) as f:
+            f.write('{"package_id": "half-writ')
+            raise RuntimeError("crash mid-write")
+
+    assert ReadingPackage.load_from_file(str(target)).package_id == "old"
+    assert os.listdir(tmp_path) == ["package.json.gz"]
+
+    make_package("new").save_to_file(str(target))
+    assert ReadingPackage.load_from_file(str(target)).package_id == "new"
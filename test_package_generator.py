@@ -0,0 +1,39 @@
+"""
+Tests for the synthetic package generator
+Run with: python -m pytest test_package_generator.py
+"""
+from models import QuestionType
+from blank_index import BlankIndex
+from package_validation import validate_package
+from package_generator import generate_package, split_groups
+from benchmarks import find_regressions
+
+
+def test_generated_package_is_valid_and_sized_as_asked():
+    counts = {QuestionType.TYPE2: 12, QuestionType.TYPE5: 3, QuestionType.TYPE9: 25, QuestionType.TYPE10: 4}
+    package = generate_package(paragraphs=9, questions_per_type=counts, table_rows=6, flowchart_steps=12,
+                               diagram_strokes=5, seed=3)
+
+    assert validate_package(package) == []
+    assert len(package.reading_content.paragraphs) == 9
+    by_type = {}
+    for qg in package.question_groups:
+        assert 2 <= len(qg.questions) <= 10
+        by_type[qg.type] = by_type.get(qg.type, 0) + len(qg.questions)
+    assert by_type == counts
+
+    # Every completion question has exactly one gap in its summary, table or flow-chart
+    index = BlankIndex.from_package(package)
+    completion = [q for qg in package.question_groups if qg.type == QuestionType.TYPE9 for q in qg.questions]
+    assert all(index.for_question(q.question_id) is not None for q in completion)
+    assert {loc.container for loc in index.locations} == {'summary', 'table', 'flowchart'}
+
+    assert generate_package(seed=3).to_dict() == generate_package(seed=3).to_dict()
+    assert split_groups(25) == [9, 8, 8]
+
+
+def test_find_regressions_ignores_noise_and_new_figures():
+    baseline = {'grade/cohort/seconds': 1.0, 'io/.json/load_seconds': 0.0005, 'store/query/ms_per_query': 2.0}
+    figures = {'grade/cohort/seconds': 1.4, 'io/.json/load_seconds': 0.0012,
+               'store/query/ms_per_query': 2.2, 'new/variant/seconds': 9.0}
+    assert find_regressions(figures, baseline, 0.25) == ["grade/cohort/seconds: 1.4 (baseline 1.0, +40%)"]
@@ -0,0 +1,97 @@
+"""
+Tests for the package validation engine
+Run with: python -m pytest test_package_validation.py
+"""
+import json
+
+from models import AdditionalInput, AnswerSession, Question, QuestionGroup, QuestionType
+from package_validation import (
+    VALIDATION_RULES, ValidationIssue, validate_package, validate_paths, validation_rule
+)
+from test_grading import make_package
+
+
+def rules_hit(issues):
+    return sorted({issue.rule for issue in issues})
+
+
+def test_clean_package_has_no_issues():
+    assert validate_package(make_package()) == []
+
+
+def test_detects_duplicates_blanks_options_and_images():
+    package = make_package()
+    package.question_groups[1].questions[1].question_id = "pkg_q3"
+    package.question_groups.append(QuestionGroup(
+        type=QuestionType.TYPE9,
+        questions=[Question(text="a", answer="x", question_id="t1"),
+                   Question(text="b", answer="y", question_id="t2")],
+        additional_inputs=AdditionalInput(data={'summaryData': "Gap [1], gap [2] and gap [9]."})
+    ))
+    package.question_groups.append(QuestionGroup(
+        type=QuestionType.TYPE5,
+        questions=[Question(text="Para A", answer="ii", question_id="h1"),
+                   Question(text="Para B", answer="vii", question_id="h2")],
+        additional_inputs=AdditionalInput(data={'headingList': ["i. One", "ii. Two", "A heading without key"]})
+    ))
+    package.question_groups.append(QuestionGroup(
+        type=QuestionType.TYPE10,
+        questions=[Question(text="Label 1", answer="x", question_id="d1"),
+                   Question(text="Label 2", answer="y", question_id="d2")],
+        additional_inputs=AdditionalInput(data={'diagramImage': "missing_diagram.png"})
+    ))
+
+    issues = validate_package(package)
+    assert rules_hit(issues) == ['blanks', 'diagram-image', 'matching-options', 'questions']
+    messages = [issue.message for issue in issues]
+    assert any("[9]" in message for message in messages)
+    assert any("'vii'" in message for message in messages)
+
+
+def test_plugin_rules_and_cache(tmp_path):
+    @validation_rule('test-title')
+    def require_title(ctx):
+        if not ctx.package.reading_content.title:
+            yield ValidationIssue('test-title', "missing title", severity='warning')
+
+    try:
+        repo = tmp_path / "packages"
+        repo.mkdir()
+        make_package().save_to_file(str(repo / "a.json"))
+        cache = str(tmp_path / "cache.json")
+        first = validate_paths([str(repo)], cache_path=cache)
+        assert first['checked'] == 1 and first['cached'] == 0 and first['failed'] == 0
+        assert first['packages'][0]['issues'][0]['rule'] == 'test-title'
+
+        second = validate_paths([str(repo)], cache_path=cache)
+        assert second['cached'] == 1
+
+        with open(repo / "a.json", 'w', encoding='utf-8') as f:
+            json.dump({'question_groups': {}}, f)
+        third = validate_paths([str(repo)], cache_path=cache)
+        assert third['cached'] == 0 and third['failed'] == 1
+    finally:
+        VALIDATION_RULES.pop('test-title', None)
+
+
+def test_cache_report_and_other_json_files_are_not_packages(tmp_path):
+    repo = tmp_path / "packages"
+    (repo / "sessions").mkdir(parents=True)
+    package = make_package()
+    package.question_groups[0].additional_inputs = AdditionalInput(data={'diagramImage': "map.png"})
+    package.save_to_file(str(repo / "a.json"))
+    AnswerSession(session_id="s1", package_id=package.package_id).save_to_file(str(repo / "sessions" / "s1.json"))
+    cache, report = str(repo / "cache.json"), str(repo / "report.json")
+
+    first = validate_paths([str(repo)], cache_path=cache, exclude=[report])
+    with open(report, 'w', encoding='utf-8') as f:
+        json.dump(first, f)
+    assert [entry['path'] for entry in first['packages']] == [str(repo / "a.json")]
+    assert "diagram image not found: map.png" in first['packages'][0]['issues'][0]['message']
+    assert 'files' not in first['packages'][0]
+
+    # Adding the image invalidates the cached "not found" report
+    (repo / "map.png").write_bytes(b"")
+    second = validate_paths([str(repo)], cache_path=cache, exclude=[report])
+    assert second['checked'] == 1 and second['cached'] == 0 and second['failed'] == 0
+    assert validate_paths([str(repo)], cache_path=cache, exclude=[report])['cached'] == 1
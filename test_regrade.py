@@ -0,0 +1,104 @@
+"""
+Tests for answer key diffs and regrading stored results
+Run with: python -m pytest test_regrade.py
+"""
+import copy
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import ReadingPackage, QuestionGroup, Question, QuestionType, AnswerRecord, AnswerSession
+from grading import evaluate_answers
+from results_store import ResultsStore
+from regrade import diff_answer_keys, regrade_package
+
+
+def make_package():
+    package = ReadingPackage(package_id="pkg")
+    package.question_groups = [
+        QuestionGroup(type=QuestionType.TYPE1, questions=[Question(answer="A", question_id="q1"),
+                                                          Question(answer="B", question_id="q2")]),
+        QuestionGroup(type=QuestionType.TYPE11, questions=[Question(answer="colour", question_id="q3")]),
+    ]
+    return package
+
+
+def test_diff_ignores_equivalent_answers():
+    old = make_package()
+    new = copy.deepcopy(old)
+    new.question_groups[1].questions[0].answer = "Colour."
+    assert diff_answer_keys(old, new) == []
+    new.question_groups[0].questions[1].answer = "C"
+    assert diff_answer_keys(old, new) == ["q2"]
+    new.question_groups[0].type = QuestionType.TYPE2
+    with pytest.raises(ValueError):
+        diff_answer_keys(old, new)
+
+
+def test_regrade_rescores_only_changed_questions():
+    old = make_package()
+    new = copy.deepcopy(old)
+    new.question_groups[0].questions[1].answer = "C"
+
+    cohort = [{"q1": "A", "q2": "B", "q3": "color"}, {"q1": "A", "q2": "C", "q3": ""}, {"q1": "D"}]
+    with ResultsStore(':memory:') as store:
+        for number, answers in enumerate(cohort):
+            records = [AnswerRecord(qid, answer) for qid, answer in answers.items()]
+            session = AnswerSession(session_id=f"s{number}", candidate_id="alice", package_id="pkg",
+                                    answers=records, submitted_at=datetime(2024, 1, 1) + timedelta(days=number))
+            store.record(evaluate_answers(old, records), session, old)
+
+        report = regrade_package(store, old, new)
+        assert report.changed_questions == ["q2"]
+        assert (report.answers_checked, report.answers_changed, report.attempts_changed) == (2, 2, 2)
+        assert report.attempts_retagged == 3
+
+        for number, answers in enumerate(cohort):
+            expected = evaluate_answers(new, [AnswerRecord(qid, answer) for qid, answer in answers.items()])
+            correct, incorrect, band, version = store.connection.execute(
+                "SELECT correct, incorrect, band, key_version FROM attempts WHERE session_id = ?",
+                (f"s{number}",)).fetchone()
+            assert (correct, incorrect, band) == (expected.correct_count, expected.incorrect_count,
+                                                  expected.band_score)
+            assert version == report.key_version
+        assert store.accuracy_by_type("alice")[QuestionType.TYPE1] == (3, 6, 50.0)
+
+        history = store.grading_history(1)
+        assert [correct for _, _, correct, _ in history] == [3, 2]
+        assert history[0][0] != history[1][0]
+
+        # Regrading with the same correction again changes nothing
+        again = regrade_package(store, old, new)
+        assert (again.key_version, again.answers_changed, again.attempts_retagged) == (report.key_version, 0, 0)
+
+
+def test_attempts_graded_with_another_key_are_graded_in_full():
+    v1 = make_package()
+    v2 = copy.deepcopy(v1)
+    v2.question_groups[1].questions[0].answer = "flavour"
+    v3 = copy.deepcopy(v2)
+    v3.question_groups[0].questions[0].answer = "C"
+    v3.question_groups[0].questions[1].answer = "D"
+
+    with ResultsStore(':memory:') as store:
+        answers = [AnswerRecord("q1", "C"), AnswerRecord("q2", "D"), AnswerRecord("q3", "colour")]
+        for number, package in enumerate((v1, v2)):
+            session = AnswerSession(session_id=f"s{number}", candidate_id="bob", package_id="pkg",
+                                    answers=answers, submitted_at=datetime(2024, 1, 1))
+            store.record(evaluate_answers(package, answers), session, package)
+        # An attempt of an older edition with a question the package no longer has
+        edition = copy.deepcopy(v1)
+        edition.question_groups[1].questions[0].question_id = "q9"
+        stray = AnswerSession(session_id="stray", package_id="pkg", answers=[AnswerRecord("q9", "colour")])
+        store.record(evaluate_answers(edition, stray.answers), stray, edition)
+
+        report = regrade_package(store, v2, v3)
+        assert report.changed_questions == ["q1", "q2"]
+        assert report.attempts_retagged == 2 and report.attempts_skipped == [3]
+        expected = evaluate_answers(v3, answers)
+        rows = store.connection.execute(
+            "SELECT correct, band, key_version FROM attempts WHERE id IN (1, 2) ORDER BY id").fetchall()
+        assert rows == [(expected.correct_count, expected.band_score, report.key_version)] * 2
+        assert expected.correct_count == 2
+        assert store.connection.execute("SELECT key_version FROM attempts WHERE id = 3").fetchone()[0] != \
+            report.key_version
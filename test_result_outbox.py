@@ -0,0 +1,123 @@
+"""
+Tests for the durable result upload queue
+Run with: python -m pytest test_result_outbox.py
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from models import AnswerRecord, AnswerSession
+from grading import evaluate_answers
+from result_outbox import ResultOutbox
+from test_grading import make_package
+
+
+class StandInEndpoint(BaseHTTPRequestHandler):
+    """Accepts outbox batches; answers with the queued status codes first"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        if status == 200:
+            self.server.batches.append(json.loads(body)['items'])
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def endpoint():
+    server = HTTPServer(('127.0.0.1', 0), StandInEndpoint)
+    server.statuses, server.batches = [], []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_session(session_id):
+    return AnswerSession(session_id=session_id, candidate_id="cand", package_id="pkg",
+                         answers=[AnswerRecord("pkg_q1", "TRUE")])
+
+
+def test_outbox_survives_restart_and_retries_with_backoff(tmp_path, endpoint):
+    url = f"http://127.0.0.1:{endpoint.server_port}/results"
+    package = make_package()
+    offline = ResultOutbox(str(tmp_path), url, batch_size=2)
+    for number in range(5):
+        session = make_session(f"s{number}")
+        assert offline.enqueue_result(evaluate_answers(package, session.answers), session)
+    offline.enqueue_journal(make_session("live"))
+    offline.enqueue_journal(make_session("live"))  # replaces the pending journal
+    assert offline.pending_count() == 6
+
+    endpoint.statuses = [503]
+    outbox = ResultOutbox(str(tmp_path), url, batch_size=2, base_delay=0.01)
+    assert outbox.pending_count() == 6
+    outbox.start()
+    try:
+        assert outbox.flush(timeout=5)
+    finally:
+        outbox.stop()
+
+    assert [len(batch) for batch in endpoint.batches] == [2, 2, 2]
+    items = [item for batch in endpoint.batches for item in batch]
+    assert [item['kind'] for item in items] == ['result'] * 5 + ['journal']
+    assert items[0]['payload']['session']['session_id'] == "s0"
+    assert outbox.uploaded == 6 and outbox.failures == 0
+    assert sorted(tmp_path.iterdir()) == []
+
+
+def test_outbox_parks_rejected_batches_and_stays_bounded(tmp_path, endpoint):
+    url = f"http://127.0.0.1:{endpoint.server_port}/results"
+    outbox = ResultOutbox(str(tmp_path), url, max_pending=2)
+    assert outbox.enqueue_journal(make_session("a"))
+    assert outbox.enqueue_journal(make_session("b"))
+    assert not outbox.enqueue_journal(make_session("c"))
+    assert outbox.enqueue_journal(make_session("a"))  # replacing never grows the queue
+
+    endpoint.statuses = [400]
+    assert outbox.upload_once() == 2
+    assert outbox.rejected == 2 and outbox.pending_count() == 0
+    assert len(list((tmp_path / 'rejected').iterdir())) == 2
+    assert outbox.upload_once() == 0
+
+
+def test_deferred_items_are_written_by_the_uploader_thread(tmp_path, endpoint):
+    url = f"http://127.0.0.1:{endpoint.server_port}/results"
+    endpoint.statuses = [503] * 3
+    outbox = ResultOutbox(str(tmp_path), url, base_delay=60)
+    outbox.defer_journal(make_session("live"))
+    outbox.defer_journal(make_session("live"))  # only the latest snapshot is kept
+    assert outbox.pending_count() == 0 and list(tmp_path.iterdir()) == []
+
+    outbox.start()
+    try:
+        # The first upload fails; a journal handed over during the backoff is still written
+        deadline = time.monotonic() + 5
+        while outbox.failures == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        outbox.defer_journal(make_session("other"))
+        while outbox.pending_count() < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert outbox.pending_count() == 2
+        session = make_session("other")
+        assert outbox.defer_result(evaluate_answers(make_package(), session.answers), session)
+        outbox.defer_journal(session)  # a late snapshot of a finished session is ignored
+        while outbox._deferred and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert outbox.pending_count() == 2  # the result replaced the journal
+        kinds = sorted(path.name.split('-')[1] for path in tmp_path.iterdir())
+        assert kinds == ['journal', 'result']
+    finally:
+        outbox.stop()
+
+    outbox = ResultOutbox(str(tmp_path), url, max_pending=2)
+    assert not outbox.defer_result(evaluate_answers(make_package(), session.answers), make_session("late"))
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import (ReadingPackage, QuestionGroup, Question, QuestionType, AnswerRecord,
+                    AnswerSession)
+from grading import evaluate_answers
+import results_store
+from results_store import ResultsStore, SCHEMA_VERSION
+
+
+def make_package():
+    package = ReadingPackage(package_id="pkg")
+    package.question_groups = [
+        QuestionGroup(type=QuestionType.TYPE1, questions=[Question(answer="A", question_id="q1"),
+                                                          Question(answer="B", question_id="q2")]),
+        QuestionGroup(type=QuestionType.TYPE2, questions=[Question(answer="TRUE", question_id="q3")]),
+    ]
+    return package
+
+
+def record_attempt(store, package, number, answers, candidate="alice"):
+    records = [AnswerRecord(qid, answer) for qid, answer in answers.items()]
+    session = AnswerSession(session_id=f"s{number}", candidate_id=candidate, package_id=package.package_id,
+                            answers=records, submitted_at=datetime(2024, 1, 1) + timedelta(days=number))
+    return store.record(evaluate_answers(package, records), session, package)
+
+
+def test_accuracy_by_type_over_recent_attempts():
+    package = make_package()
+    with ResultsStore(':memory:') as store:
+        assert store.schema_version == SCHEMA_VERSION
+        record_attempt(store, package, 0, {"q1": "C", "q2": "C", "q3": "FALSE"})
+        record_attempt(store, package, 1, {"q1": "A", "q2": "C", "q3": "TRUE"})
+        record_attempt(store, package, 2, {"q1": "A", "q2": "B", "q3": "TRUE"})
+        record_attempt(store, package, 3, {"q1": "A"}, candidate="bob")
+        # Re-recording a session is a no-op
+        assert record_attempt(store, package, 2, {"q1": "A", "q2": "B", "q3": "TRUE"}) is None
+
+        assert store.attempt_count("alice") == 3
+        assert store.accuracy_by_type("alice", last=2) == {
+            QuestionType.TYPE1: (3, 4, 75.0),
+            QuestionType.TYPE2: (2, 2, 100.0),
+        }
+        assert store.accuracy_by_type("alice", last=10)[QuestionType.TYPE2] == (2, 3, 66.7)
+        trend = store.band_trend("alice", last=2)
+        assert [submitted_at.day for submitted_at, _ in trend] == [2, 3]
+        assert trend[0][1] < trend[1][1]
+        assert store.question_accuracy("q1") == (3, 4)
+
+        plan = " ".join(row[-1] for row in store.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT type_code, SUM(correct), SUM(total) FROM attempt_types WHERE attempt_id IN"
+            " (SELECT id FROM attempts WHERE candidate_id = ? ORDER BY submitted_at DESC LIMIT ?)"
+            " GROUP BY type_code", ("alice", 10)))
+        assert "attempts_candidate_time" in plan
+
+
+def test_migrates_and_refuses_newer_schema(tmp_path, monkeypatch):
+    path = str(tmp_path / "results.sqlite3")
+    with ResultsStore(path) as store:
+        assert store.schema_version == SCHEMA_VERSION
+
+    monkeypatch.setattr(results_store, 'MIGRATIONS', results_store.MIGRATIONS +
+                        ["CREATE TABLE notes (attempt_id INTEGER, text TEXT);"])
+    monkeypatch.setattr(results_store, 'SCHEMA_VERSION', SCHEMA_VERSION + 1)
+    with ResultsStore(path) as store:
+        assert store.schema_version == SCHEMA_VERSION + 1
+        store.connection.execute("SELECT * FROM notes")
+
+    monkeypatch.undo()
+    with pytest.raises(ValueError):
+        ResultsStore(path)
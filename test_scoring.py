@@ -0,0 +1,54 @@
+"""
+Tests for band score tables
+Run with: python -m pytest test_scoring.py
+"""
+import pytest
+
+from models import IELTSScoringRules, AnswerRecord
+from grading import band_for_score, evaluate_answers
+from scoring import BandTable, get_scoring_table, load_scoring_table
+from test_grading import make_package
+
+
+def test_registered_tables():
+    academic = get_scoring_table('academic')
+    assert academic.max_score == 40
+    assert academic.to_mapping() == IELTSScoringRules.get_academic_rules().mapping
+    general = get_scoring_table('general')
+    assert [general.band(raw) for raw in (40, 39, 37, 30, 15, 6)] == [9.0, 8.5, 8.0, 6.0, 4.0, 2.5]
+    assert band_for_score(45, IELTSScoringRules.get_academic_rules()) == 9.0
+    with pytest.raises(ValueError):
+        get_scoring_table('missing')
+
+
+def test_bands_for_matches_scalar_lookup():
+    academic = get_scoring_table()
+    raw_scores = list(range(-2, 45))
+    assert list(academic.bands_for(raw_scores)) == [academic.band(raw) for raw in raw_scores]
+    assert list(academic.bands_for([12])) == [5.5]
+    assert len(academic.bands_for([])) == 0
+
+
+def test_scaled_tables_for_short_tests():
+    academic = get_scoring_table()
+    thirteen = academic.for_test(13)
+    assert thirteen is academic.for_test(13)
+    assert thirteen.max_score == 13
+    assert thirteen.band(13) == 9.0 and thirteen.band(0) == 0.0
+    assert thirteen.band(7) == academic.band(22)  # 7/13 of 40 rounds to 22
+    assert academic.for_test(13, 'linear').band(13) == 9.0
+    assert academic.for_test(13, 'raw').band(13) == academic.band(13)
+    assert academic.for_test(40) is academic
+
+    custom = load_scoring_table('practice', {"0": 0, "5": 5.0, "10": 9.0})
+    assert custom.band(7) == 5.0
+    assert isinstance(custom, BandTable)
+
+
+def test_evaluate_answers_prorates_short_packages():
+    package = make_package()  # four questions
+    answers = [AnswerRecord("pkg_q1", "TRUE"), AnswerRecord("pkg_q2", "NOT GIVEN"),
+               AnswerRecord("pkg_q3", "John Boyd Dunlop"), AnswerRecord("pkg_q4", "wood")]
+    assert evaluate_answers(package, answers).band_score == 9.0
+    assert evaluate_answers(package, answers[:2]).band_score == get_scoring_table().band(20)
+    assert evaluate_answers(package, answers[:2], scaling='raw').band_score == 2.0
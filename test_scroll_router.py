@@ -0,0 +1,93 @@
+"""
+Tests for mouse wheel routing to the nearest scrollable widget
+Run with: python -m pytest test_scroll_router.py
+"""
+from types import SimpleNamespace
+
+from scroll_router import ScrollRouter, parent_path
+
+
+class FakeTk:
+    """Answers the Tcl commands the router uses from a table of widget views"""
+
+    def __init__(self, views, classes=None):
+        self.views = views
+        self.classes = classes or {}
+        self.pointer = ''
+        self.scrolls = []
+
+    def call(self, *args):
+        if args == ('tk', 'windowingsystem'):
+            return 'x11'
+        if args[:2] == ('winfo', 'containing'):
+            return self.pointer
+        if args[:2] == ('winfo', 'class'):
+            return self.classes.get(args[2], 'Frame')
+        path, command = args[:2]
+        if len(args) == 2:
+            return self.views[path]
+        self.scrolls.append((path, args[3]))
+
+    def splitlist(self, value):
+        return value
+
+
+class FakeRoot:
+    def __init__(self, tk):
+        self.tk = tk
+        self.jobs = []
+        self.bound = []
+
+    def bind(self, sequence, callback, add=None):
+        self.bound.append(sequence)
+
+    def after(self, ms, callback):
+        self.jobs.append(callback)
+        return f'after#{len(self.jobs)}'
+
+    def after_cancel(self, job):
+        pass
+
+
+def wheel(router, pointer, **fields):
+    router.root.tk.pointer = pointer
+    router.on_wheel(SimpleNamespace(widget=router.root, x_root=0, y_root=0, **{'delta': 0, 'num': None, **fields}))
+
+
+def test_touchpad_deltas_coalesce_into_one_scroll_of_the_nearest_target():
+    tk = FakeTk({'.exam.questions': (0.2, 0.5), '.exam.questions.frame.table': (0.0, 1.0)})
+    root = FakeRoot(tk)
+    router = ScrollRouter(root)
+    router.attach()
+    router.register('.exam.questions')
+    router.register('.exam.questions.frame.table')
+    assert root.bound == ['<MouseWheel>', '<Button-4>', '<Button-5>']
+
+    # Ten small touchpad deltas over a label inside the question frame: one flush, one scroll
+    for _ in range(10):
+        wheel(router, '.exam.questions.frame.label', delta=-30)
+    assert len(root.jobs) == 1
+    root.jobs.pop()()
+    assert tk.scrolls == [('.exam.questions', 2)]
+    assert router._remainder == {'.exam.questions': 0.5}
+
+    # The table fits its view, so the scroll is handed to the question canvas above it
+    wheel(router, '.exam.questions.frame.table.cell', num=4)
+    root.jobs.pop()()
+    assert tk.scrolls[-1] == ('.exam.questions', -1)
+
+    wheel(router, '.other', num=5)
+    assert root.jobs == []
+
+
+def test_self_scrolling_text_is_left_to_its_class_bindings():
+    tk = FakeTk({'.exam.summary': (0.1, 0.4), '.exam': (0.0, 0.5)}, classes={'.exam.summary': 'Text'})
+    root = FakeRoot(tk)
+    router = ScrollRouter(root)
+    router.register('.exam')
+    router.register('.exam.summary')
+
+    tk.pointer = '.exam.summary'
+    router.on_wheel(SimpleNamespace(widget='.exam.summary', x_root=0, y_root=0, delta=0, num=5))
+    assert root.jobs == []
+    assert parent_path('.exam.summary') == '.exam' and parent_path('.!frame') == '.' and parent_path('.') is None
@@ -0,0 +1,53 @@
+import json
+import time
+
+from stall_watchdog import StallWatchdog, LagHistogram
+
+
+class FakeRoot:
+    """Stands in for a Tk root: heartbeats are driven by the test instead of the event loop"""
+
+    def after(self, ms, callback):
+        return 'after#1'
+
+    def after_cancel(self, job):
+        pass
+
+    def bind(self, sequence, callback, add=None):
+        pass
+
+
+def blocking_render(seconds):
+    time.sleep(seconds)
+
+
+def test_stall_captures_blocked_stack_and_logs_histogram(tmp_path):
+    log_path = str(tmp_path / "stalls.jsonl")
+    watchdog = StallWatchdog(FakeRoot(), 'exam', 'session-1', interval_ms=10, threshold_ms=40, log_path=log_path)
+    watchdog.start()
+
+    watchdog.record_beat(time.monotonic())
+    watchdog.record_beat(watchdog._expected)  # on time
+    blocking_render(0.2)
+    watchdog.record_beat(time.monotonic())
+    watchdog.stop()
+
+    assert watchdog.stall_count == 1
+    stall = watchdog.stalls[0]
+    assert stall['ms'] >= 150
+    assert any(frame.endswith(" blocking_render") for frame in stall['stack'])
+
+    with open(log_path, 'r', encoding='utf-8') as f:
+        summary = json.loads(f.read())
+    assert summary['session_id'] == 'session-1'
+    assert summary['beats'] == 3
+    assert summary['stall_count'] == 1
+    assert sum(summary['histogram'].values()) == 3
+
+
+def test_lag_histogram_buckets():
+    histogram = LagHistogram()
+    for lag in (0, 5, 6, 16, 40, 6000):
+        histogram.add(lag)
+    assert histogram.to_dict() == {'<=5': 2, '<=16': 2, '<=50': 1, '>5000': 1}
+    assert histogram.max_ms == 6000
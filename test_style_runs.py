@@ -0,0 +1,30 @@
+"""
+Tests for style run serialization
+Run with: python -m pytest test_style_runs.py
+"""
+from models import Paragraph
+from style_runs import STYLE_IDS, index_to_offset, line_start_offsets, make_runs, split_runs
+
+BOLD = STYLE_IDS['bold']
+ITALIC = STYLE_IDS['italic']
+
+
+def test_make_runs_orders_and_merges():
+    spans = [(10, 14, ITALIC), (0, 4, BOLD), (4, 6, BOLD), (8, 8, BOLD)]
+    assert make_runs(spans) == [0, 6, BOLD, 10, 4, ITALIC]
+
+
+def test_split_runs_clips_to_segments():
+    content = "Title\nBody line one\nline two\n"
+    starts = line_start_offsets(content)
+    assert index_to_offset(starts, "3.4") == 24
+    segments = [(0, 5), (6, 27)]
+    runs = split_runs([(3, 10, BOLD), (20, 24, ITALIC)], segments)
+    assert runs == [[3, 2, BOLD], [0, 4, BOLD, 14, 4, ITALIC]]
+
+
+def test_paragraph_runs_round_trip_and_stay_optional():
+    plain = Paragraph(title="A", body="Text")
+    assert plain.to_dict() == {'title': "A", 'body': "Text"}
+    styled = Paragraph(title="A", body="Bold text", body_runs=[0, 4, BOLD])
+    assert Paragraph.from_dict(styled.to_dict()) == styled
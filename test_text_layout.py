@@ -0,0 +1,76 @@
+"""
+Tests for measured text wrapping and reflow
+Run with: python -m pytest test_text_layout.py
+"""
+from text_layout import TextLayout, wrap_line_count, WIDTH_BUCKET_PX
+
+
+def monospace(word):
+    return 7 * len(word)
+
+
+class FakeText:
+    def __init__(self, width):
+        self.width = width
+        self.height = 1
+        self.configured = 0
+
+    def winfo_width(self):
+        return self.width
+
+    def cget(self, option):
+        return self.height
+
+    def configure(self, height):
+        self.height = height
+        self.configured += 1
+
+
+class FakeFont:
+    def __init__(self):
+        self.calls = 0
+
+    def measure(self, word):
+        self.calls += 1
+        return monospace(word)
+
+
+class MonospaceLayout(TextLayout):
+    """Measures without a Tk interpreter"""
+
+    def __init__(self):
+        super().__init__(root=None)
+        self.fake_font = FakeFont()
+
+    def font(self, spec):
+        return self.fake_font
+
+
+def test_wrap_line_count_wraps_words_and_breaks_long_ones():
+    # 10 characters per 70px line
+    assert wrap_line_count("", 70, monospace) == 1
+    assert wrap_line_count("aaaa bbbb", 70, monospace) == 1
+    assert wrap_line_count("aaaa bbbb c", 70, monospace) == 2
+    assert wrap_line_count("aaaa\n\nbbbb", 70, monospace) == 3
+    assert wrap_line_count("x" * 25 + " y", 70, monospace) == 3
+
+
+def test_reflow_only_touches_widgets_whose_width_bucket_changed():
+    layout = MonospaceLayout()
+    text = "word " * 40  # 200 characters
+    widgets = [FakeText(0), FakeText(0)]
+    for widget in widgets:
+        assert layout.track(widget, text, ('Arial', 10), 620) == 3
+
+    widgets[0].width, widgets[1].width = 352, 352
+    layout.reflow()
+    assert [w.height for w in widgets] == [4, 4]
+
+    widgets[0].width = 352 + WIDTH_BUCKET_PX - 1   # same bucket: nothing is re-measured or configured
+    widgets[1].width = 176
+    layout.reflow()
+    assert [w.configured for w in widgets] == [1, 2]
+    assert widgets[1].height == 8
+    # One wrap per distinct width bucket; the space and "word" were measured once each
+    assert layout.line_count.cache_info().misses == 3
+    assert layout.fake_font.calls == 2
@@ -0,0 +1,116 @@
+"""
+Text Layout
+Size read-only Text widgets from measured word wrapping, and reflow them when their width changes
+
+Line counts come from tkinter.font.Font metrics: one Font per font spec, word widths
+memoized per font and the wrapped line count memoized per (text, font, width). Widths
+are rounded down to WIDTH_BUCKET_PX buckets, so small resizes reuse earlier results and
+reflow() only reconfigures widgets whose bucket changed. The window debounces reflow()
+on resize by REFLOW_DEBOUNCE_MS.
+"""
+import math
+import tkinter as tk
+import tkinter.font as tkfont
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+WIDTH_BUCKET_PX = 16
+REFLOW_DEBOUNCE_MS = 120
+MAX_CACHED_LAYOUTS = 8192
+
+
+def wrap_line_count(text: str, width: int, measure: Callable[[str], int]) -> int:
+    """Lines text takes when word-wrapped to width pixels; measure(s) is the pixel width of s"""
+    width = max(1, width)
+    space = measure(' ')
+    lines = 0
+    for paragraph in text.split('\n'):
+        lines += 1
+        line = None  # pixel width of the current line
+        for word in paragraph.split(' '):
+            word_width = measure(word) if word else 0
+            if line is None:
+                line = word_width
+            elif line + space + word_width <= width:
+                line += space + word_width
+                continue
+            else:
+                lines += 1
+                line = word_width
+            if line > width:
+                # A word wider than the line is broken between characters
+                lines += math.ceil(line / width) - 1
+                line = line % width or width
+    return lines
+
+
+class _Tracked:
+    __slots__ = ('widget', 'text', 'font', 'bucket')
+
+    def __init__(self, widget, text: str, font: tuple):
+        self.widget = widget
+        self.text = text
+        self.font = font
+        self.bucket: Optional[int] = None
+
+
+class TextLayout:
+    """Measured line counts and the Text widgets sized with them, for one window"""
+
+    def __init__(self, root):
+        self.root = root
+        self._fonts: Dict[tuple, tkfont.Font] = {}
+        self._word_widths: Dict[tuple, Dict[str, int]] = {}
+        self._tracked: Dict[str, _Tracked] = {}
+        self.line_count = lru_cache(maxsize=MAX_CACHED_LAYOUTS)(self._line_count)
+
+    def font(self, spec: tuple) -> tkfont.Font:
+        font = self._fonts.get(spec)
+        if font is None:
+            font = self._fonts[spec] = tkfont.Font(root=self.root, font=spec)
+        return font
+
+    def measure(self, spec: tuple, word: str) -> int:
+        widths = self._word_widths.setdefault(spec, {})
+        width = widths.get(word)
+        if width is None:
+            width = widths[word] = self.font(spec).measure(word)
+        return width
+
+    def _line_count(self, text: str, spec: tuple, width: int) -> int:
+        return wrap_line_count(text, width, lambda word: self.measure(spec, word))
+
+    def lines_for_width(self, text: str, spec: tuple, width: int) -> int:
+        """Line count at width rounded down to its bucket"""
+        bucket = max(1, width // WIDTH_BUCKET_PX)
+        return self.line_count(text, tuple(spec), bucket * WIDTH_BUCKET_PX)
+
+    def track(self, widget, text: str, spec: tuple, width: int) -> int:
+        """Size widget for width now and keep it sized by reflow(); returns its height in lines"""
+        spec = tuple(spec)
+        self._tracked[str(widget)] = _Tracked(widget, text, spec)
+        return self.lines_for_width(text, spec, width)
+
+    def reflow(self):
+        """Re-measure tracked widgets whose width moved to another bucket"""
+        for path, tracked in list(self._tracked.items()):
+            try:
+                width = tracked.widget.winfo_width()
+                if width <= 1:  # not laid out yet
+                    continue
+                bucket = width // WIDTH_BUCKET_PX
+                if bucket == tracked.bucket:
+                    continue
+                tracked.bucket = bucket
+                height = self.lines_for_width(tracked.text, tracked.font, width)
+                if height != int(tracked.widget.cget('height')):
+                    tracked.widget.configure(height=height)
+            except tk.TclError:  # destroyed with its question group
+                del self._tracked[path]
+
+    def clear(self):
+        """Forget tracked widgets, fonts and cached measurements"""
+        self._tracked.clear()
+        self._word_widths.clear()
+        self._fonts.clear()
+        self.line_count.cache_clear()